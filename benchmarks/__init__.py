@@ -0,0 +1 @@
+"""Offline benchmarks; run the scripts as modules, e.g. `python -m benchmarks.run`."""
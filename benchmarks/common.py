@@ -0,0 +1,24 @@
+"""Helpers shared by the benchmark scripts."""
+
+import os
+import subprocess
+
+__all__ = [
+    "RESULTS_FOLDER",
+    "git_commit",
+]
+
+RESULTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
@@ -0,0 +1,171 @@
+"""
+Deterministic local stand-ins for the chat model and the embeddings, so the tasks
+can be benchmarked without provider credentials.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+from fcoverage.utils.vdb import VectorDBHelper
+
+__all__ = [
+    "CallStats",
+    "ScriptedChatModel",
+    "HashEmbeddings",
+    "BenchmarkVectorDB",
+]
+
+
+class CallStats:
+    """Thread-safe counters shared by a fake and the copies `bind_tools` makes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+
+    def add(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self.counts = {}
+
+
+def _stable_choice(key: str, options: List[str]) -> str:
+    digest = hashlib.sha1(key.encode("utf-8")).digest()
+    return options[int.from_bytes(digest[:4], "big") % len(options)]
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    A chat model that sleeps `latency` seconds per call, then follows a script:
+    `tool_rounds` calls to the exploring tools (grep_string, find_symbol), then a
+    `final_answer` call when that tool is bound, otherwise a markdown answer.
+    Answers are derived from the prompt, so the same input always gets the same one.
+    """
+
+    latency: float = 0.0
+    tool_rounds: int = 1
+    stats: CallStats = Field(default_factory=CallStats)
+    tools: List[Dict[str, Any]] = Field(default_factory=list)
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(
+            update={"tools": [convert_to_openai_tool(t)["function"] for t in tools]}
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = "\n".join(str(m.content) for m in messages)
+        self.stats.add("llm_calls")
+        self.stats.add("llm_prompt_chars", len(prompt))
+
+        tool_names = {t["name"] for t in self.tools}
+        # Prompts built from a string template carry the scratchpad as text.
+        rounds = max(
+            sum(1 for m in messages if getattr(m, "tool_calls", None)),
+            prompt.count("ToolMessage("),
+        )
+        explore = [n for n in ("grep_string", "find_symbol") if n in tool_names]
+        if explore and rounds < self.tool_rounds:
+            name = explore[rounds % len(explore)]
+            args = (
+                {"searches": ["def run"]} if name == "grep_string" else {"name": "run"}
+            )
+            message = self._tool_call(name, args, rounds)
+        elif "final_answer" in tool_names:
+            message = self._tool_call("final_answer", self._final_answer(prompt), 0)
+        else:
+            message = AIMessage(content=self._markdown_answer(prompt))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _tool_call(self, name: str, args: Dict[str, Any], index: int) -> AIMessage:
+        self.stats.add("tool_calls")
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": name, "args": args, "id": f"call-{name}-{index}"}],
+        )
+
+    def _final_answer(self, prompt: str) -> Dict[str, Any]:
+        # Only the feature list section: test code may contain "'name': '...'" too.
+        section = re.search(
+            r"^## List of features$(.*?)^## ", prompt, flags=re.MULTILINE | re.DOTALL
+        )
+        features = re.findall(
+            r"'name': '([^']+)'", section.group(1) if section else ""
+        ) or ["Unknown"]
+        schema = next(t for t in self.tools if t["name"] == "final_answer")
+        filenames = re.findall(r"^File: (\S+)$", prompt, flags=re.MULTILINE)
+        if "test_files" in schema["parameters"]["properties"]:
+            return {
+                "test_files": [
+                    {"filename": f, "related_features": [_stable_choice(f, features)]}
+                    for f in filenames
+                ]
+            }
+        key = filenames[0] if filenames else prompt
+        return {"related_features": [_stable_choice(key, features)]}
+
+    def _markdown_answer(self, prompt: str) -> str:
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+        return f"# Answer {digest}\n\n- A scripted answer to a {len(prompt)} character prompt.\n"
+
+
+class HashEmbeddings(Embeddings):
+    """Unit vectors seeded by the sha1 of the text, after an optional `latency` per call."""
+
+    def __init__(self, size: int = 64, latency: float = 0.0, stats: CallStats = None):
+        self.size = size
+        self.latency = latency
+        self.stats = stats or CallStats()
+
+    def _embed(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "big")
+        vector = np.random.default_rng(seed).standard_normal(self.size)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        self.stats.add("embedding_calls")
+        self.stats.add("embedded_texts", len(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class BenchmarkVectorDB(VectorDBHelper):
+    """A VectorDBHelper embedding with HashEmbeddings instead of a provider."""
+
+    def __init__(self, *args, embeddings: HashEmbeddings, **kwargs):
+        self._fake_embeddings = embeddings
+        super().__init__(*args, **kwargs)
+
+    def init_embeddings(self):
+        self.embeddings = self._fake_embeddings
@@ -0,0 +1,146 @@
+"""
+Import-time benchmark of the CLI: `python -X importtime` of the given modules,
+and the wall time of `fcoverage --help`.
+
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --max-ms 300   # exit 1 above 300 ms, for CI
+
+Results are written as JSON to benchmarks/results/ like run.py's, so --compare
+of run.py works on them too.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from .common import RESULTS_FOLDER, git_commit
+
+MODULES = [
+    "fcoverage.main",
+    "fcoverage.tasks.feature_extraction",
+    "fcoverage.tasks.feature_design",
+    "fcoverage.tasks.feature_coverage",
+]
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(module: str) -> Dict[str, int]:
+    """Cumulative microseconds of each module imported by `import module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            times[match.group(4)] = int(match.group(2))
+    return times
+
+
+def best_of(runs: int, fn) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(modules: List[str], runs: int, top: int) -> List[dict]:
+    results = []
+    for module in modules:
+        samples = [import_times(module) for _ in range(runs)]
+        best = min(samples, key=lambda times: times.get(module, 0))
+        heaviest = sorted(
+            ((name, us) for name, us in best.items() if name != module),
+            key=lambda item: -item[1],
+        )[:top]
+        results.append(
+            {
+                "scenario": f"import {module}",
+                "files": 0,
+                "wall_seconds": round(best.get(module, 0) / 1e6, 4),
+                "peak_memory_mb": 0,
+                "modules": len(best),
+                "heaviest": dict(heaviest),
+            }
+        )
+        print(f"import {module}: {best.get(module, 0) / 1000:.0f} ms")
+
+    help_seconds = best_of(
+        runs,
+        lambda: subprocess.run(
+            [sys.executable, "-m", "fcoverage.main", "--help"],
+            capture_output=True,
+            check=True,
+        ),
+    )
+    results.append(
+        {
+            "scenario": "fcoverage --help",
+            "files": 0,
+            "wall_seconds": round(help_seconds, 4),
+            "peak_memory_mb": 0,
+        }
+    )
+    print(f"fcoverage --help: {help_seconds * 1000:.0f} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modules", default=",".join(MODULES))
+    parser.add_argument(
+        "--runs", help="Runs per measurement; the best is kept.", type=int, default=3
+    )
+    parser.add_argument(
+        "--top", help="The heaviest imports listed per module.", type=int, default=10
+    )
+    parser.add_argument(
+        "--max-ms",
+        help="Fail when `import fcoverage.main` takes longer than this.",
+        type=float,
+        default=0,
+    )
+    parser.add_argument("--output", help="The JSON file to write the results to.")
+    args = parser.parse_args()
+
+    results = measure(args.modules.split(","), args.runs, args.top)
+    commit = git_commit()
+    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    output = args.output or os.path.join(
+        RESULTS_FOLDER, f"importtime-{timestamp}-{commit}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "commit": commit,
+                "timestamp": timestamp,
+                "python": sys.version.split()[0],
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"results written to {output}")
+
+    main_ms = results[0]["wall_seconds"] * 1000
+    if args.max_ms and results[0]["scenario"] == "import fcoverage.main":
+        if main_ms > args.max_ms:
+            print(f"import fcoverage.main took {main_ms:.0f} ms > {args.max_ms} ms")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Synthetic Python projects for the benchmarks: `n_files` modules spread over
+packages, a third of them with a test file, plus a README and feature manifests.
+"""
+
+import json
+import os
+from typing import List
+
+from fcoverage.models import FeatureManifest
+
+__all__ = [
+    "generate_project",
+    "write_manifests",
+]
+
+MODULES_PER_PACKAGE = 100
+
+MODULE_TEMPLATE = '''"""Module {i} of feature {feature}."""
+from pkg{package}.base import run
+
+
+class Handler{i}:
+    """Handles requests of kind {i}."""
+
+    def __init__(self, limit={i}):
+        self.limit = limit
+
+    def process(self, items):
+        return [run(item) for item in items[: self.limit]]
+
+
+def compute_{i}(value):
+    if value > {i}:
+        return value - {i}
+    return value + {i}
+'''
+
+TEST_TEMPLATE = """from pkg{package}.module_{i} import Handler{i}, compute_{i}
+
+
+def test_compute_{i}():
+    assert compute_{i}({i}) == {double}
+
+
+def test_handler_{i}():
+    assert Handler{i}(limit=1).process([1, 2]) == [1]
+"""
+
+
+def generate_project(
+    root: str, n_files: int, n_features: int = 10, test_ratio: int = 3
+) -> List[FeatureManifest]:
+    """
+    Writes the project under `root` (src/, tests/, README.md) and returns one
+    manifest per feature; module i belongs to feature i % n_features.
+    """
+    src, tests = os.path.join(root, "src"), os.path.join(root, "tests")
+    os.makedirs(tests, exist_ok=True)
+    features = [
+        FeatureManifest(
+            name=f"Feature {f}",
+            description=f"Processes requests of group {f}.",
+            entry_point=f"compute_* of group {f}",
+            core_code_files=[],
+            related_test_files=[],
+        )
+        for f in range(n_features)
+    ]
+
+    for package in range((n_files - 1) // MODULES_PER_PACKAGE + 1):
+        folder = os.path.join(src, f"pkg{package}")
+        os.makedirs(folder, exist_ok=True)
+        for name, content in [
+            ("__init__.py", ""),
+            ("base.py", "def run(item):\n    return item\n"),
+        ]:
+            with open(os.path.join(folder, name), "w") as f:
+                f.write(content)
+
+    for i in range(n_files):
+        package = i // MODULES_PER_PACKAGE
+        feature = features[i % n_features]
+        module = os.path.join("src", f"pkg{package}", f"module_{i}.py")
+        with open(os.path.join(root, module), "w") as f:
+            f.write(MODULE_TEMPLATE.format(i=i, package=package, feature=feature.name))
+        feature.core_code_files.append(module)
+        if i % test_ratio == 0:
+            test = os.path.join("tests", f"test_module_{i}.py")
+            with open(os.path.join(root, test), "w") as f:
+                f.write(TEST_TEMPLATE.format(i=i, package=package, double=2 * i))
+            feature.related_test_files.append(test)
+
+    with open(os.path.join(root, "README.md"), "w") as f:
+        f.write("# Synthetic project\n\n")
+        for feature in features:
+            f.write(f"## {feature.name}\n\n{feature.description}\n\n")
+    return features
+
+
+def write_manifests(folder: str, features: List[FeatureManifest]) -> List[str]:
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for feature in features:
+        path = os.path.join(
+            folder, f"features-definition-{feature.name.replace(' ', '_')}.json"
+        )
+        with open(path, "w") as f:
+            json.dump(feature.model_dump(mode="json"), f, indent=2)
+        paths.append(path)
+    return paths
@@ -0,0 +1,288 @@
+"""
+Offline benchmarks of indexing, search and the three tasks on synthetic projects.
+
+    python -m benchmarks.run --sizes 100,10000
+    python -m benchmarks.run --compare benchmarks/results/a.json benchmarks/results/b.json
+
+Each scenario reports wall time, peak Python memory (tracemalloc, main process
+only) and the number of llm, tool and embedding calls. Results are written as JSON
+to benchmarks/results/ named after the timestamp and the git commit.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from .common import RESULTS_FOLDER, git_commit
+from .fakes import BenchmarkVectorDB, CallStats, HashEmbeddings, ScriptedChatModel
+from .project import generate_project, write_manifests
+
+from fcoverage.models import FeatureItem, ProjectFeatures
+from fcoverage.tasks.base import TasksBase
+from fcoverage.tasks.feature_coverage import FeatureCoverageTask
+from fcoverage.tasks.feature_design import FeatureDesignTask
+from fcoverage.tasks.feature_extraction import FeatureExtractionTask
+from fcoverage.utils.vdb import index_all_project
+
+SCENARIOS = [
+    "index_all_project",
+    "grep_string",
+    "extract_test_files",
+    "design",
+    "coverage",
+]
+# Scenarios that read the outputs of another; when that one is not selected, it is
+# run first without being measured.
+PREREQUISITES = {"coverage": "design"}
+GREP_QUERIES = ["def compute_", "Handler1", "return value", "limit", "no such text"]
+
+
+def measure(name: str, size: int, stats: CallStats, fn: Callable[[], Any]):
+    stats.reset()
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = {
+        "scenario": name,
+        "files": size,
+        "wall_seconds": round(wall, 4),
+        "peak_memory_mb": round(peak / 2**20, 2),
+        "calls": dict(stats.counts),
+    }
+    print(json.dumps(result))
+    return result
+
+
+def task_args(root: str, out: str, args) -> Dict[str, Any]:
+    return {
+        "project_name": "synthetic",
+        "project_description": "A synthetic project for benchmarks.",
+        "project": root,
+        "src_path": "src",
+        "test_path": "tests",
+        "docs": os.path.join(root, "README.md"),
+        "out": out,
+        "feature_definition": os.path.join(out, "features"),
+        "llm_model": "scripted",
+        "max_concurrency": args.max_concurrency,
+        "index_workers": args.index_workers,
+        "shortlist_size": 0,
+        "context_token_budget": args.context_token_budget,
+    }
+
+
+def run_size(size: int, args) -> List[Dict[str, Any]]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root, out = os.path.join(tmp, "project"), os.path.join(tmp, "out")
+        print(f"generating {size} files in {root}")
+        manifests = generate_project(root, size, n_features=args.features)
+        write_manifests(os.path.join(out, "features"), manifests)
+
+        stats = CallStats()
+        embeddings = HashEmbeddings(latency=args.embedding_latency, stats=stats)
+        vdb = BenchmarkVectorDB(
+            os.path.join(out, "vdb"),
+            "benchmark",
+            "hash",
+            "fake",
+            embeddings=embeddings,
+        )
+        model = ScriptedChatModel(
+            latency=args.llm_latency, tool_rounds=args.tool_rounds, stats=stats
+        )
+        settings = task_args(root, out, args)
+
+        def make_task(cls):
+            task = cls(settings)
+            task.model, task.vdb = model, vdb
+            return task
+
+        def index():
+            index_all_project(
+                vdb,
+                [os.path.join(root, "src"), os.path.join(root, "tests")],
+                "**/*.py",
+                [".py"],
+                workers=args.index_workers or os.cpu_count(),
+            )
+
+        if "index_all_project" in args.scenarios:
+            results.append(measure("index_all_project", size, stats, index))
+            results.append(measure("index_all_project:unchanged", size, stats, index))
+
+        if "grep_string" in args.scenarios:
+            task = make_task(TasksBase)
+            results.append(
+                measure("search_index:build", size, stats, lambda: task.search_index)
+            )
+            results.append(
+                measure(
+                    "grep_string",
+                    size,
+                    stats,
+                    lambda: [task.grep_string(q, page_size=50) for q in GREP_QUERIES],
+                )
+            )
+
+        if "extract_test_files" in args.scenarios:
+            task = make_task(FeatureExtractionTask)
+            features = ProjectFeatures(
+                features=[
+                    FeatureItem(
+                        name=m.name,
+                        description=m.description,
+                        entry_point=m.entry_point,
+                        keywords=[],
+                        queries=[m.description],
+                    )
+                    for m in manifests
+                ]
+            )
+            code_files = {m.name: m.core_code_files for m in manifests}
+            results.append(
+                measure(
+                    "extract_test_files",
+                    size,
+                    stats,
+                    lambda: task.extract_test_files(features, code_files),
+                )
+            )
+
+        for name, cls in [
+            ("design", FeatureDesignTask),
+            ("coverage", FeatureCoverageTask),
+        ]:
+            needed_by = [
+                s for s, p in PREREQUISITES.items() if p == name and s in args.scenarios
+            ]
+            if name not in args.scenarios and not needed_by:
+                continue
+            task = make_task(cls)
+            task.feature_items = task.load_feature_items()
+            if name in args.scenarios:
+                results.append(measure(f"{name}:run", size, stats, task.run))
+            else:
+                print(f"running {name} for {', '.join(needed_by)}, not measured")
+                task.run()
+    return results
+
+
+def compare(before_path: str, after_path: str):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    previous = {(r["scenario"], r["files"]): r for r in before["results"]}
+    print(f"{before['commit']} -> {after['commit']}")
+    for result in after["results"]:
+        old = previous.get((result["scenario"], result["files"]))
+        if old is None:
+            continue
+        ratio = result["wall_seconds"] / max(old["wall_seconds"], 1e-9)
+        print(
+            f"{result['scenario']:<30} {result['files']:>7} files  "
+            f"{old['wall_seconds']:>9.3f}s -> {result['wall_seconds']:>9.3f}s "
+            f"({ratio:.2f}x)  "
+            f"{old['peak_memory_mb']:>8.1f}MB -> {result['peak_memory_mb']:>8.1f}MB"
+        )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        help="Comma separated numbers of source files of the synthetic projects (e.g. 100,10000,100000).",
+        default="100",
+    )
+    parser.add_argument(
+        "--scenarios",
+        help=f"Comma separated scenarios to run, of: {', '.join(SCENARIOS)}.",
+        default=",".join(SCENARIOS),
+    )
+    parser.add_argument(
+        "--features", help="The number of features.", type=int, default=10
+    )
+    parser.add_argument(
+        "--llm-latency",
+        help="Seconds the fake chat model sleeps per call.",
+        type=float,
+        default=0.0,
+    )
+    parser.add_argument(
+        "--embedding-latency",
+        help="Seconds the fake embeddings sleep per call.",
+        type=float,
+        default=0.0,
+    )
+    parser.add_argument(
+        "--tool-rounds",
+        help="Tool calls the fake chat model makes before answering.",
+        type=int,
+        default=1,
+    )
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--index-workers", type=int, default=0)
+    parser.add_argument("--context-token-budget", type=int, default=100000)
+    parser.add_argument("--output", help="The JSON file to write the results to.")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BEFORE", "AFTER"),
+        help="Compare two result files instead of running the benchmarks.",
+    )
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",")]
+    unknown = [s for s in args.scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(
+            f"unknown scenarios {', '.join(unknown)}; of {', '.join(SCENARIOS)}"
+        )
+    return args
+
+
+def main():
+    args = parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        results.extend(run_size(size, args))
+
+    commit = git_commit()
+    timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    output = args.output or os.path.join(RESULTS_FOLDER, f"{timestamp}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    settings = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    with open(output, "w") as f:
+        json.dump(
+            {
+                "commit": commit,
+                "timestamp": timestamp,
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "settings": settings,
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
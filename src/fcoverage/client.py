@@ -0,0 +1,79 @@
+import json
+import os
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Iterator
+
+__all__ = [
+    "submit",
+    "stream_events",
+    "resolve_paths",
+    "run_remote",
+]
+
+
+def submit(server: str, task: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    request = urllib.request.Request(
+        f"{server.rstrip('/')}/jobs",
+        data=json.dumps({"task": task, "args": args}).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        raise ValueError(json.load(e).get("error", str(e)))
+
+
+def stream_events(server: str, job_id: str) -> Iterator[Dict[str, Any]]:
+    url = f"{server.rstrip('/')}/jobs/{job_id}/events"
+    with urllib.request.urlopen(url) as response:
+        for line in response:
+            if line.strip():
+                yield json.loads(line)
+
+
+def resolve_paths(args: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Makes the path options of `args` absolute, since the server may run elsewhere.
+    Paths within --project (e.g. --docs) stay relative when they exist there, as the
+    server resolves them against its project.
+    """
+    from fcoverage.main import PATH_ARGS
+
+    project = os.path.abspath(args["project"])
+    resolved = dict(args)
+    for key, kind in PATH_ARGS.items():
+        value = args.get(key)
+        # `--coverage-contexts run` is a keyword, not a path.
+        if not value or (key == "coverage_contexts" and value == "run"):
+            continue
+        if kind == "project_paths":
+            resolved[key] = ",".join(
+                (
+                    path
+                    if os.path.exists(os.path.join(project, path))
+                    else os.path.abspath(path)
+                )
+                for path in (path.strip() for path in value.split(","))
+            )
+        else:
+            resolved[key] = os.path.abspath(value)
+    return resolved
+
+
+def run_remote(args: Dict[str, Any]) -> int:
+    """Runs the task of `args` on the server at args["server"], printing its output."""
+    args = resolve_paths(args)
+    job = submit(args["server"], args["task"], args)
+    print(f"job {job['id']} submitted to {args['server']}")
+    status = job["status"]
+    for event in stream_events(args["server"], job["id"]):
+        if event["type"] == "log":
+            print(event["line"])
+        elif event["type"] == "status":
+            status = event["status"]
+            if event.get("error"):
+                print(f"job {job['id']} {status}: {event['error']}")
+    return 0 if status == "succeeded" else 1
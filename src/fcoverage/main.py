@@ -1,26 +1,50 @@
 import os
 import sys
 import argparse
-from fcoverage.tasks import (
-    FeatureExtractionTask,
-    FeatureDesignTask,
-    FeatureCoverageTask,
-)
+
+from fcoverage.tasks import TASKS, load_task
+
+# The options naming files or folders, which a client resolves before submitting a
+# task to a server: "path" options are made absolute, while the comma separated
+# "project_paths" are kept relative to --project when they exist there.
+PATH_ARGS = {
+    "project": "path",
+    "out": "path",
+    "vector_db_persist": "path",
+    "cache_dir": "path",
+    "docs": "project_paths",
+    "feature_definition": "path",
+    "feature_design": "path",
+    "feature_test_cases": "path",
+    "features_list": "path",
+    "coverage_contexts": "path",
+}
 
 
 def main():
     args = vars(get_args())
+    if args["server"]:
+        from fcoverage.client import run_remote
+
+        return run_remote(args)
     os.makedirs(args["out"], exist_ok=True)
     print(f"args = {args}")
 
-    if args["task"] == "extract":
-        task = FeatureExtractionTask(args=args)
-    elif args["task"] == "design":
-        task = FeatureDesignTask(args=args)
-    elif args["task"] == "coverage":
-        task = FeatureCoverageTask(args=args)
-    task.prepare()
-    success = task.run()
+    if args["task"] == "serve":
+        from fcoverage.server import serve
+
+        return serve(args, load_task)
+
+    from fcoverage.utils.telemetry import tracer
+
+    task = load_task(args["task"])(args=args)
+    try:
+        task.prepare()
+        with tracer.span("run", "task", task=args["task"]):
+            success = task.run()
+    finally:
+        task.close()
+    task.report_stats()
     if success:
         return 0
     else:
@@ -28,6 +52,10 @@ def main():
 
 
 def get_args():
+    return build_parser().parse_args()
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Feature Coverage Analysis Tool")
     parser.add_argument(
         "--project-name",
@@ -49,12 +77,8 @@ def get_args():
     )
     parser.add_argument(
         "--task",
-        choices=[
-            "extract",
-            "design",
-            "coverage",
-        ],
-        help="Task to run.",
+        choices=list(TASKS) + ["serve"],
+        help="Task to run. `serve` keeps the model, vector db and indexes of the project loaded and runs the tasks submitted to it with --server.",
         required=True,
     )
     parser.add_argument(
@@ -67,6 +91,40 @@ def get_args():
         help="The path to store the vector database.",
         default="vector-db",
     )
+    parser.add_argument(
+        "--resume",
+        help="Skip the units of work already completed by an interrupted run, as recorded in the journal in --out.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="The path to store persistent caches (llm responses and embeddings).",
+        default="cache",
+    )
+    parser.add_argument(
+        "--no-llm-cache",
+        dest="llm_cache",
+        help="Always call the llm instead of reusing cached responses.",
+        action="store_false",
+    )
+    parser.add_argument(
+        "--no-embedding-cache",
+        dest="embedding_cache",
+        help="Always call the embedding model instead of reusing cached vectors.",
+        action="store_false",
+    )
+    parser.add_argument(
+        "--llm-cache-max-age-days",
+        help="Cached llm responses older than this are discarded (0 = never).",
+        type=float,
+        default=30,
+    )
+    parser.add_argument(
+        "--llm-cache-max-size-mb",
+        help="Least recently used llm responses are evicted above this size (0 = unbounded).",
+        type=float,
+        default=512,
+    )
     parser.add_argument(
         "--src-path",
         help="The folder containing source codes within the project root.",
@@ -104,17 +162,17 @@ def get_args():
     )
     parser.add_argument(
         "--feature-definition",
-        help="The path of feature definition file. Required in design and coverage tasks.",
+        help="The path of feature definition file, a folder of features-definition-*.json files or a glob. Required in design and coverage tasks.",
         default="",
     )
     parser.add_argument(
         "--feature-design",
-        help="The path of feature design file. Required in coverage task.",
+        help="The path of feature design file, or a folder laid out like --out (default: --out). Used in coverage task.",
         default="",
     )
     parser.add_argument(
         "--feature-test-cases",
-        help="The path of feature test-case file. Required in coverage task.",
+        help="The path of feature test-case file, or a folder laid out like --out (default: --out). Used in coverage task.",
         default="",
     )
     parser.add_argument(
@@ -123,9 +181,152 @@ def get_args():
         type=int,
         default=10,
     )
+    parser.add_argument(
+        "--max-concurrency",
+        help="The max number of LLM requests (e.g. test files being classified) in flight at once.",
+        type=int,
+        default=4,
+    )
+    parser.add_argument(
+        "--llm-rpm",
+        help="Requests per minute allowed for the llm model (0 = unlimited).",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "--llm-tpm",
+        help="Tokens per minute allowed for the llm model (0 = unlimited).",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "--embedding-rpm",
+        help="Requests per minute allowed for the embedding model (0 = unlimited).",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "--embedding-tpm",
+        help="Tokens per minute allowed for the embedding model (0 = unlimited).",
+        type=float,
+        default=0,
+    )
+    parser.add_argument(
+        "--embedding-concurrency",
+        help="The max number of embedding requests in flight while indexing.",
+        type=int,
+        default=4,
+    )
+    parser.add_argument(
+        "--embedding-batch-tokens",
+        help="The max number of (estimated) tokens sent in one embedding request.",
+        type=int,
+        default=50000,
+    )
+    parser.add_argument(
+        "--index-workers",
+        help="The number of processes parsing source files while indexing (0 = one per CPU).",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--max-retries",
+        help="The max number of attempts of an llm or embedding call, including the first one; values below 1 mean a single attempt.",
+        type=int,
+        default=5,
+    )
+    parser.add_argument(
+        "--shortlist-size",
+        help="The number of candidate features shown to the llm per test file, ranked by static analysis and embedding similarity; test files the static analysis is confident about are related without asking the llm (default: 0, off: all features are shown).",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--shortlist-confidence",
+        help="The share of a test's imports and calls into a feature's core files above which the test is related to it without asking the llm.",
+        type=float,
+        default=0.9,
+    )
+    parser.add_argument(
+        "--tool-memo-size",
+        help="The number of tool results (searches, file sections, listings) kept for reuse by all agents of a run (0 = no reuse).",
+        type=int,
+        default=2048,
+    )
+    parser.add_argument(
+        "--llm-input-price",
+        help="USD per million input tokens of the llm, for the cost column of the run summary.",
+        type=float,
+        default=0.0,
+    )
+    parser.add_argument(
+        "--llm-output-price",
+        help="USD per million output tokens of the llm, for the cost column of the run summary.",
+        type=float,
+        default=0.0,
+    )
+    parser.add_argument(
+        "--context-token-budget",
+        help="The max tokens of project files (docs, code and tests) put in one prompt; the least relevant files are cut to their relevant symbols, then to an outline, then dropped (0 = no limit).",
+        type=int,
+        default=100000,
+    )
+    parser.add_argument(
+        "--pack-token-budget",
+        help="Relate several small test files to features in one llm call, packing test code up to this many estimated tokens per call (0 = one test file per call).",
+        type=int,
+        default=0,
+    )
+    parser.add_argument(
+        "--shard",
+        help="Run only the part INDEX of COUNT (e.g. 3/20) of the task: the test files of extract, or the features of design and coverage, split by a stable hash. Partial results go to --out/shards, and the merge task combines them. Extract first needs a planning run with --shard 0/COUNT, which writes features-list.json for --features-list.",
+        default="",
+    )
+    parser.add_argument(
+        "--features-list",
+        help="The features-list.json (features and their code files) written by an earlier extract run; extract reuses it instead of extracting features again. Required with --shard in extract.",
+        default="",
+    )
+    parser.add_argument(
+        "--since",
+        help="A git ref (e.g. origin/main): only the work impacted by the files changed since it is redone. Extract relates the changed test files and keeps the previous relations (from --features-list and --feature-definition, by default in --out); design and coverage run for the features whose core code or related test files changed.",
+        default="",
+    )
+    parser.add_argument(
+        "--coverage-contexts",
+        help="Relate test files to features by the lines they execute in each feature's core code files, asking the llm only about the rest: `run` runs the project's tests under coverage.py (pytest-cov) with per-test contexts; a path names a coverage data file recorded with `--cov-context=test`, or a coverage-index.json written by an earlier run (default: off).",
+        default="",
+    )
+    parser.add_argument(
+        "--server",
+        help="Submit the task to the server started with `--task serve` at this URL (e.g. http://127.0.0.1:8765) and stream its output, instead of running it here.",
+        default="",
+    )
+    parser.add_argument(
+        "--host",
+        help="The address the server listens on.",
+        default="127.0.0.1",
+    )
+    parser.add_argument(
+        "--port",
+        help="The port the server listens on.",
+        type=int,
+        default=8765,
+    )
+    parser.add_argument(
+        "--max-jobs",
+        help="The max number of tasks the server runs at once.",
+        type=int,
+        default=2,
+    )
+    parser.add_argument(
+        "--watch-interval",
+        help="Seconds between checks of the project files for changes: the server re-indexes them, a run clears its tool memo (0 = no server watching, and a run checks before every agent call).",
+        type=float,
+        default=2.0,
+    )
 
-    args = parser.parse_args()
-    return args
+    return parser
 
 
 if __name__ == "__main__":
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 from pydantic import BaseModel, Field
 
 
@@ -32,7 +32,29 @@ class ProjectFeatures(BaseModel):
     )
 
 
+class FeaturesList(ProjectFeatures):
+    code_files: Dict[str, List[str]]
+
+
 class TestToFeatures(BaseModel):
     related_features: List[str] = Field(
         description="The list of feature names (exact name according the List of features) that the test tries to cover. Leave it empty if you couldn't relate the test to any feature."
     )
+
+
+class TestFileToFeatures(TestToFeatures):
+    filename: str = Field(
+        description="The test file path, exactly as given after 'File:' in the input."
+    )
+
+
+class TestFilesToFeatures(BaseModel):
+    test_files: List[TestFileToFeatures] = Field(
+        description="One entry per given test file."
+    )
+
+
+class FileSection(BaseModel):
+    path: str = Field(description="The file path, relative to the project root.")
+    start: int = Field(description="The first line to load, starting from 1.")
+    end: int = Field(description="The last line to load (inclusive).")
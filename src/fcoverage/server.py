@@ -0,0 +1,341 @@
+import contextvars
+import io
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+__all__ = [
+    "Job",
+    "JobServer",
+    "serve",
+]
+
+# Arguments that describe the runtime the server keeps warm (project, models, vector
+# db, caches); jobs always use the server's values for them.
+RUNTIME_ARGS = {
+    "project",
+    "src_path",
+    "test_path",
+    "vector_db_persist",
+    "cache_dir",
+    "llm_cache",
+    "embedding_cache",
+    "llm_cache_max_age_days",
+    "llm_cache_max_size_mb",
+    "llm_model",
+    "llm_provider",
+    "embedding_model",
+    "embedding_provider",
+    "llm_rpm",
+    "llm_tpm",
+    "embedding_rpm",
+    "embedding_tpm",
+    "embedding_concurrency",
+    "embedding_batch_tokens",
+    "index_workers",
+    "max_retries",
+    "tool_memo_size",
+}
+
+# The job whose events the output of the current thread goes to.
+current_job: contextvars.ContextVar[Optional["Job"]] = contextvars.ContextVar(
+    "current_job", default=None
+)
+
+
+class Job:
+    """
+    A task submitted to the server. Its output lines, status changes and result are
+    kept as events that any number of clients can stream, from the first one.
+    """
+
+    def __init__(self, id: str, task: str, args: Dict[str, Any]):
+        self.id = id
+        self.task = task
+        self.args = args
+        self.status = "queued"
+        self.error = None
+        self.submitted = time.time()
+        self.events: List[Dict[str, Any]] = []
+        self._changed = threading.Condition()
+        self.emit("status", status=self.status)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def emit(self, type: str, **fields):
+        with self._changed:
+            self.events.append({"type": type, "job": self.id, **fields})
+            self._changed.notify_all()
+
+    def set_status(self, status: str, error: str = None):
+        self.status = status
+        self.error = error
+        if error is None:
+            self.emit("status", status=status)
+        else:
+            self.emit("status", status=status, error=error)
+
+    def stream(self) -> Iterator[Dict[str, Any]]:
+        """Yields the events of the job until it is done."""
+        i = 0
+        while True:
+            with self._changed:
+                while i >= len(self.events) and not self.done:
+                    self._changed.wait()
+                events = self.events[i:]
+                finished = self.done
+            yield from events
+            i += len(events)
+            if finished and i >= len(self.events):
+                return
+
+    def describe(self) -> Dict[str, Any]:
+        description = {
+            "id": self.id,
+            "task": self.task,
+            "status": self.status,
+            "submitted": self.submitted,
+            "out": self.args.get("out"),
+        }
+        if self.error is not None:
+            description["error"] = self.error
+        return description
+
+
+class JobOutput(io.TextIOBase):
+    """
+    Replaces sys.stdout while serving: lines printed on behalf of a job (in its
+    thread or the workers it starts) become "log" events of the job, and are echoed
+    to the server's output with the job id.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._partial = threading.local()
+
+    def write(self, text: str) -> int:
+        job = current_job.get()
+        if job is None:
+            return self.stream.write(text)
+        buffer = getattr(self._partial, "text", "") + text
+        *lines, self._partial.text = buffer.split("\n")
+        for line in lines:
+            job.emit("log", line=line)
+            self.stream.write(f"[{job.id}] {line}\n")
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class JobServer:
+    """
+    Keeps one prepared runtime (chat model, vector db, search and symbol indexes,
+    tool memo) and runs the submitted tasks on it, at most `max_jobs` at a time.
+    Each job gets its own task object, journal and output folder; jobs writing to
+    the same output folder run one after another.
+
+    A watcher re-indexes the project and resets the search indexes and the tool
+    memo when its files change.
+    """
+
+    def __init__(self, args: Dict[str, Any], load_task: Callable[[str], type]):
+        self.args = args
+        self.load_task = load_task
+        self.runtime = None
+        self.jobs: Dict[str, Job] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._out_locks = defaultdict(threading.Lock)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(self.args.get("max_jobs", 2), 1)
+        )
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def start(self):
+        """Builds the runtime and starts watching the project files."""
+        from fcoverage.tasks.base import TasksBase
+
+        runtime = TasksBase(self.args)
+        runtime.prepare()
+        self.runtime = runtime
+        interval = self.args.get("watch_interval", 2.0)
+        if interval:
+            # The watcher clears the tool memo on changes; jobs need not check.
+            runtime.tool_memo.fingerprint = None
+            self._watcher = threading.Thread(
+                target=self.watch, args=(interval,), daemon=True
+            )
+            self._watcher.start()
+
+    def watch(self, interval: float):
+        fingerprint = self.runtime.project_fingerprint()
+        while not self._stop.wait(interval):
+            current = self.runtime.project_fingerprint()
+            if current == fingerprint:
+                continue
+            fingerprint = current
+            print("project files changed, re-indexing")
+            self.runtime.tool_memo.invalidate()
+            self.runtime.reset_search_index()
+            try:
+                self.runtime.index_source_code()
+            except Exception as e:
+                print(f"re-indexing failed: {e}")
+
+    def submit(self, task: str, args: Dict[str, Any] = None) -> Job:
+        args = dict(args or {})
+        project = args.get("project")
+        if project and os.path.abspath(project) != self.runtime.project_root:
+            raise ValueError(
+                f"the server runs on {self.runtime.project_root}, not {project}"
+            )
+        try:
+            self.load_task(task)
+        except KeyError:
+            raise ValueError(f"unknown task: {task}")
+        job_args = {
+            **self.args,
+            **{k: v for k, v in args.items() if k not in RUNTIME_ARGS},
+            "task": task,
+        }
+        with self._lock:
+            job = Job(str(next(self._ids)), task, job_args)
+            self.jobs[job.id] = job
+        self._executor.submit(self.run_job, job)
+        return job
+
+    def run_job(self, job: Job):
+        from fcoverage.utils.telemetry import Tracer, tracer, use_tracer
+
+        out = os.path.abspath(job.args["out"])
+        with self._lock:
+            out_lock = self._out_locks[out]
+        with out_lock:
+            token = current_job.set(job)
+            job.set_status("running")
+            task = None
+            # The job's spans go to its own trace in its --out, not the server's.
+            job_tracer = Tracer()
+            try:
+                job_tracer.start(out)
+                with use_tracer(job_tracer):
+                    task = self.load_task(job.task)(args=job.args)
+                    task.share_runtime(self.runtime)
+                    with tracer.span("run", "task", task=job.task, job=job.id):
+                        success = task.run()
+                print(job_tracer.format_summary())
+                print(f"tool_memo: {task.tool_memo.stats()}")
+                job.emit("result", success=bool(success), out=out)
+                job.set_status("succeeded" if success else "failed")
+            except Exception as e:
+                job.set_status("failed", error=f"{type(e).__name__}: {e}")
+            finally:
+                if task is not None:
+                    task.close()
+                job_tracer.export()
+                sys.stdout.flush()
+                current_job.reset(token)
+
+    def shutdown(self):
+        self._stop.set()
+        self._executor.shutdown(wait=True)
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /jobs {"task": ..., "args": {...}}  submits a job
+    GET  /jobs                              lists the jobs
+    GET  /jobs/<id>                         describes a job
+    GET  /jobs/<id>/events                  streams its events as JSON lines
+    """
+
+    server: "ThreadingHTTPServer"
+
+    def send_json(self, status: int, body: Any):
+        data = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def find_job(self, id: str) -> Optional[Job]:
+        job = self.server.jobs.jobs.get(id)
+        if job is None:
+            self.send_json(404, {"error": f"no job {id}"})
+        return job
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self.send_json(404, {"error": f"no such path: {self.path}"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            job = self.server.jobs.submit(request["task"], request.get("args"))
+        except (KeyError, ValueError) as e:
+            return self.send_json(400, {"error": str(e)})
+        self.send_json(202, job.describe())
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts == ["jobs"]:
+            jobs = list(self.server.jobs.jobs.values())
+            return self.send_json(200, [job.describe() for job in jobs])
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self.find_job(parts[1])
+            if job is not None:
+                self.send_json(200, job.describe())
+            return
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events":
+            job = self.find_job(parts[1])
+            if job is None:
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            for event in job.stream():
+                self.wfile.write((json.dumps(event, default=str) + "\n").encode())
+                self.wfile.flush()
+            return
+        self.send_json(404, {"error": f"no such path: {self.path}"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_http_server(jobs: JobServer, host: str, port: int) -> ThreadingHTTPServer:
+    http_server = ThreadingHTTPServer((host, port), JobRequestHandler)
+    http_server.daemon_threads = True
+    http_server.jobs = jobs
+    return http_server
+
+
+def serve(args: Dict[str, Any], load_task: Callable[[str], type]) -> int:
+    jobs = JobServer(args, load_task)
+    jobs.start()
+    http_server = make_http_server(jobs, args["host"], args["port"])
+    host, port = http_server.server_address[:2]
+    print(f"serving on http://{host}:{port}")
+    stdout = sys.stdout
+    sys.stdout = JobOutput(stdout)
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.server_close()
+        jobs.shutdown()
+        sys.stdout = stdout
+        jobs.runtime.report_stats()
+    return 0
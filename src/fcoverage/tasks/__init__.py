@@ -1,9 +1,31 @@
-from .feature_extraction import FeatureExtractionTask
-from .feature_design import FeatureDesignTask
-from .feature_coverage import FeatureCoverageTask
+import importlib
 
 __all__ = [
+    "TASKS",
+    "load_task",
     "FeatureExtractionTask",
     "FeatureDesignTask",
     "FeatureCoverageTask",
+    "MergeTask",
 ]
+
+# Task name -> (module, class). The modules pull in langchain, Chroma and the
+# parsers, so they are imported on first use, e.g. once the CLI parsed its args.
+TASKS = {
+    "extract": ("fcoverage.tasks.feature_extraction", "FeatureExtractionTask"),
+    "design": ("fcoverage.tasks.feature_design", "FeatureDesignTask"),
+    "coverage": ("fcoverage.tasks.feature_coverage", "FeatureCoverageTask"),
+    "merge": ("fcoverage.tasks.merge", "MergeTask"),
+}
+
+
+def load_task(name: str):
+    module, class_name = TASKS[name]
+    return getattr(importlib.import_module(module), class_name)
+
+
+def __getattr__(name):
+    for module, class_name in TASKS.values():
+        if class_name == name:
+            return getattr(importlib.import_module(module), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,15 +1,37 @@
+import glob
+import hashlib
 import json
 import os
+import threading
 from pathlib import Path
-import time
-from typing import Any, Dict, List
-from fcoverage.models import FeatureManifest
+from typing import Any, Callable, Dict, List, Type
+from fcoverage.models import FeatureManifest, FileSection
 from fcoverage.utils import prompts
-from langchain.chat_models import init_chat_model
-from langchain.agents import create_tool_calling_agent, AgentExecutor
-from langchain_core.tools import tool
-
-from fcoverage.utils.vdb import VectorDBHelper, index_all_project
+from fcoverage.utils.code.search import CodeSearchIndex, find_source_files
+from fcoverage.utils.code.symbols import SymbolIndex
+from langchain_core.runnables import Runnable
+from langchain_core.tools import StructuredTool, tool
+from pydantic import BaseModel
+
+from fcoverage.utils.context import (
+    ContextItem,
+    fit_to_budget,
+    markdown_outline,
+    relevant_symbols,
+)
+from fcoverage.utils.journal import RunJournal
+from fcoverage.utils.manifest import file_sha1
+from fcoverage.utils.changes import changed_files, impacted_features
+from fcoverage.utils.memo import ToolMemo
+from fcoverage.utils.shard import parse_shard
+from fcoverage.utils.telemetry import TelemetryCallbackHandler, tracer
+from fcoverage.utils.llm_cache import LLMResponseCache
+from fcoverage.utils.ratelimit import (
+    RateLimitCallbackHandler,
+    call_with_retry,
+    get_rate_limiter,
+)
+from fcoverage.utils.vdb import VectorDBHelper, best_by_source, index_all_project
 
 
 class TasksBase:
@@ -21,18 +43,125 @@ class TasksBase:
         self.project_src = os.path.join(self.project_root, self.args["src_path"])
         self.project_tests = os.path.join(self.project_root, self.args["test_path"])
         self.model = None
+        self.llm_rate_limiter = None
+        self.llm_cache = None
         self.vdb = None
+        self._search_index = None
+        self._search_index_lock = threading.Lock()
+        self._symbol_index = None
+        self.journal = None
+        self.shard = parse_shard(self.args.get("shard"))
+        self.changes = None
+        # Set by share_runtime when a server runs this task on its warm runtime.
+        self.runtime = None
+        # Tool results are shared by every agent of the run, until the project changes.
+        self.tool_memo = ToolMemo(
+            max_entries=self.args.get("tool_memo_size", 2048),
+            fingerprint=self.project_fingerprint,
+            on_change=self.reset_search_index,
+            check_interval=self.args.get("watch_interval", 2.0),
+        )
+        self.telemetry = TelemetryCallbackHandler(
+            tracer,
+            input_price=self.args.get("llm_input_price", 0.0),
+            output_price=self.args.get("llm_output_price", 0.0),
+        )
 
     def prepare(self):
-        self.load_llm_model()
-        self.load_vector_db_helper()
-        self.index_source_code()
+        tracer.start(self.args["out"])
+        for step in [
+            self.load_journal,
+            self.load_llm_model,
+            self.load_vector_db_helper,
+            self.index_source_code,
+        ]:
+            with tracer.span(step.__name__, "prepare"):
+                step()
+        self.prepare_inputs()
+
+    def prepare_inputs(self):
+        """Loads the inputs of the task itself (e.g. feature definitions)."""
+
+    def share_runtime(self, runtime: "TasksBase"):
+        """
+        Uses the model, vector db, indexes and tool memo of an already prepared
+        `runtime` instead of building them; only the journal and inputs are loaded.
+        """
+        self.runtime = runtime
+        self.model = runtime.model
+        self.llm_rate_limiter = runtime.llm_rate_limiter
+        self.llm_cache = runtime.llm_cache
+        self.vdb = runtime.vdb
+        self.tool_memo = runtime.tool_memo
+        self.load_journal()
+        self.prepare_inputs()
 
     def run(self):
         raise NotImplementedError("Subclasses must implement this method")
 
-    def zzz(self, seconds: int = 5):
-        time.sleep(seconds)
+    def report_stats(self):
+        tracer.export()
+        print(tracer.format_summary())
+        print(f"tool_memo: {self.tool_memo.stats()}")
+        if self.llm_cache is not None:
+            print(f"llm_cache: {self.llm_cache.stats()}")
+        if self.vdb is not None and self.vdb.embedding_cache is not None:
+            print(f"embedding_cache: {self.vdb.embedding_cache.stats()}")
+
+    def load_journal(self):
+        print("load_journal")
+        filename = RunJournal.filename(
+            self.args.get("task") or type(self).__name__,
+            self.shard.name if self.shard is not None else None,
+        )
+        self.journal = RunJournal(
+            os.path.join(self.args["out"], filename),
+            resume=self.args.get("resume", False),
+        )
+
+    def close(self):
+        """Releases what the run holds open; called once `run` returned or failed."""
+        if self.journal is not None:
+            self.journal.close()
+
+    def checkpoint(
+        self,
+        unit: str,
+        compute: Callable[[], Any],
+        dump: Callable[[Any], Any] = None,
+        load: Callable[[Any], Any] = None,
+    ):
+        """
+        Returns the journaled result of `unit` when resuming, otherwise computes and
+        journals it. `dump`/`load` convert the result to and from JSON-able values.
+        """
+        if self.journal is None:
+            return compute()
+        if unit in self.journal:
+            value = self.journal.get(unit)
+            return load(value) if load else value
+        result = compute()
+        self.journal.record(unit, dump(result) if dump else result)
+        return result
+
+    def inputs_sha1(
+        self, feature_item: FeatureManifest, files: List[str], *texts: str
+    ) -> str:
+        """
+        Hash of what a feature's unit of work reads: its definition, the content of
+        `files` and other inputs `texts`. Part of the unit's journal key, so that a
+        resumed run redoes the units whose inputs changed since.
+        """
+        digest = hashlib.sha1(feature_item.model_dump_json().encode("utf-8"))
+        for path in files:
+            path_abs = os.path.join(self.project_root, path)
+            if os.path.isfile(path_abs):
+                digest.update(file_sha1(path_abs).encode("utf-8"))
+            else:
+                digest.update(b"-")
+        for text in texts:
+            digest.update(text.encode("utf-8"))
+        return digest.hexdigest()[:12]
 
     def relative_path(self, path_str):
         _path = Path(path_str)
@@ -50,9 +179,30 @@ class TasksBase:
         model_name = self.args.get("llm_model")
         model_provider = self.args.get("llm_provider")
 
+        self.llm_rate_limiter = get_rate_limiter(
+            model_provider,
+            model_name,
+            requests_per_minute=self.args.get("llm_rpm", 0),
+            tokens_per_minute=self.args.get("llm_tpm", 0),
+        )
+        if self.args.get("llm_cache", True):
+            self.llm_cache = LLMResponseCache(
+                os.path.join(self.args.get("cache_dir", "cache"), "llm.sqlite"),
+                namespace=f"{model_provider}:{model_name}",
+                max_age_days=self.args.get("llm_cache_max_age_days", 30),
+                max_size_mb=self.args.get("llm_cache_max_size_mb", 512),
+            )
+        from langchain.chat_models import init_chat_model
+
         self.model = init_chat_model(
             model_name,
             model_provider=model_provider,
+            rate_limiter=self.llm_rate_limiter,
+            # invoke_with_retry is the only retry layer; the client's own retries
+            # would multiply its attempts and ignore the shared limiter.
+            max_retries=0,
+            callbacks=[RateLimitCallbackHandler(self.llm_rate_limiter)],
+            cache=self.llm_cache if self.llm_cache is not None else False,
         )
 
     def load_vector_db_helper(self):
@@ -62,15 +212,14 @@ class TasksBase:
             collection_name="fcoverage",
             embedding_model=self.args["embedding_model"],
             embedding_provider=self.args["embedding_provider"],
-        )
-
-    def model_with_retry(self, model=None):
-        if model is None:
-            model = self.model
-        return model.with_retry(
-            wait_exponential_jitter=True,
-            stop_after_attempt=5,  # 2, 4, 8, 16, 32 seconds
-            exponential_jitter_params={"initial": 2},
+            requests_per_minute=self.args.get("embedding_rpm", 0),
+            tokens_per_minute=self.args.get("embedding_tpm", 0),
+            max_retries=self.args.get("max_retries", 5),
+            embedding_cache_path=(
+                os.path.join(self.args.get("cache_dir", "cache"), "embeddings.sqlite")
+                if self.args.get("embedding_cache", True)
+                else None
+            ),
         )
 
     def get_tool_calling_llm(
@@ -81,12 +230,15 @@ class TasksBase:
         verbose=False,
     ):
         print("get_tool_calling_llm")
+        from langchain.agents import create_tool_calling_agent
+        from fcoverage.utils.agents import FinalAnswerAgentExecutor
+
         agent = create_tool_calling_agent(
             llm=self.model,
             tools=tools,
             prompt=prompt_template,
         )
-        executor = AgentExecutor(
+        executor = FinalAnswerAgentExecutor(
             agent=agent, tools=tools, verbose=verbose, memory=memory
         )
 
@@ -94,63 +246,164 @@ class TasksBase:
 
     def invoke_with_retry(
         self,
-        executor: AgentExecutor,
+        executor: Runnable,
         input_dict,
         config=None,
-        max_retries=3,
+        max_retries=None,
         initial_retry_delay=2,
     ):
-        retry_delay = initial_retry_delay
-        for attempt in range(max_retries):
-            try:
-                return executor.invoke(input_dict, config=config)
-            except Exception as e:
-                print(f"[Retry {attempt+1}/{max_retries}] Agent execution failed: {e}")
-                if attempt < max_retries - 1:
-                    print(f"Sleep {retry_delay} seconds.")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                else:
-                    raise e
+        if max_retries is None:
+            max_retries = self.args.get("max_retries", 5)
+        # The handler reaches every llm and tool call made inside this invoke.
+        config = dict(config or {})
+        config["callbacks"] = list(config.get("callbacks") or []) + [self.telemetry]
+        # Tool results memoized before the project files changed are dropped here,
+        # once per invocation rather than on every tool call.
+        self.tool_memo.refresh()
+        with tracer.span(type(executor).__name__, "invoke"):
+            return call_with_retry(
+                lambda: executor.invoke(input_dict, config=config),
+                self.llm_rate_limiter,
+                max_retries=max_retries,
+                initial_retry_delay=initial_retry_delay,
+            )
 
     def search_vector_db(self, query: str, k: int = 5) -> List[str]:
-        results = self.vdb.search(query, k=k)
+        return self.search_vector_db_many([query], k)[0]
+
+    def search_vector_db_many(self, queries: List[str], k: int = 5) -> List[List[str]]:
         return [
-            f"[{doc.metadata.get('source')}]\n{doc.page_content}" for doc in results
+            [f"[{doc.metadata.get('source')}]\n{doc.page_content}" for doc, _ in hits]
+            for hits in self.vdb.search_many(queries, k=k)
         ]
 
     def load_file_section(self, path: str, start: int, end: int) -> str:
         try:
-            with open(path, "r") as f:
+            with open(os.path.join(self.project_root, path), "r") as f:
                 lines = f.readlines()
             return "".join(lines[start - 1 : end])
         except Exception as e:
             return f"Error reading file: {e}"
 
-    def grep_string(
-        self, search: str, page_size: int = 10, page: int = 1
-    ) -> List[Dict[str, Any]]:
-        result = []
-        for file in Path(self.project_root).rglob("*.py"):
+    def project_fingerprint(self) -> int:
+        state = []
+        for path in find_source_files(self.project_root):
             try:
-                with open(file, "r", errors="ignore") as f:
-                    for lineno, line in enumerate(f, start=1):
-                        if search in line:
-                            result.append(
-                                {
-                                    "file": str(file),
-                                    "line": lineno,
-                                    "text": line.strip(),
-                                }
-                            )
-            except Exception as e:
-                result.append(
-                    {"file": str(file), "line": -1, "text": f"Error reading file: {e}"}
+                stat = os.stat(path)
+            except OSError:
+                continue
+            state.append((path, stat.st_mtime_ns, stat.st_size))
+        return hash(tuple(state))
+
+    def reset_search_index(self):
+        with self._search_index_lock:
+            self._search_index = None
+            self._symbol_index = None
+
+    @property
+    def search_index(self) -> CodeSearchIndex:
+        if self.runtime is not None:
+            return self.runtime.search_index
+        with self._search_index_lock:
+            if self._search_index is None:
+                print("build_search_index")
+                self._search_index = CodeSearchIndex(self.project_root)
+            return self._search_index
+
+    @property
+    def symbol_index(self) -> SymbolIndex:
+        if self.runtime is not None:
+            return self.runtime.symbol_index
+        search_index = self.search_index
+        with self._search_index_lock:
+            if self._symbol_index is None:
+                print("build_symbol_index")
+                self._symbol_index = SymbolIndex(
+                    zip(search_index.files, search_index.contents)
                 )
+            return self._symbol_index
+
+    def find_symbol(self, name: str, limit: int = 20) -> List[Dict[str, Any]]:
+        symbols = self.symbol_index.find(name)
+        if not symbols:
+            return [{"error": f"No symbol matches '{name}'."}]
+        return [s.to_dict(self.relative_path(s.path)) for s in symbols[:limit]]
+
+    def get_symbol_source(self, name: str) -> str:
+        symbols = self.symbol_index.find(name)
+        if not symbols:
+            return f"No symbol matches '{name}'."
+        if len(symbols) > 1 and len({s.full_name for s in symbols}) > 1:
+            candidates = ", ".join(s.full_name for s in symbols[:20])
+            return f"'{name}' is ambiguous, use one of: {candidates}"
+        symbol = symbols[0]
+        return (
+            f"File: {self.relative_path(symbol.path)} "
+            f"(lines {symbol.start}-{symbol.end})\n{self.symbol_index.source(symbol)}"
+        )
 
-        start_index = (page - 1) * page_size
-        end_index = start_index + page_size
-        return result[start_index:end_index]
+    def grep_string(
+        self,
+        search: str,
+        page_size: int = 10,
+        page: int = 1,
+        regex: bool = False,
+        whole_word: bool = False,
+    ) -> List[Dict[str, Any]]:
+        return self.search_index.search(
+            search, page_size=page_size, page=page, regex=regex, whole_word=whole_word
+        )
+
+    def build_context(
+        self,
+        paths: List[str],
+        query: str,
+        render: Callable[[str, str], str],
+        required: bool = False,
+    ) -> str:
+        """
+        Renders files, in their order, for a prompt within --context-token-budget.
+        Files are ranked by their vector db distance to `query` and the symbols whose
+        names it mentions; the lowest ranked are cut down to their relevant symbols,
+        then to an outline, then dropped. Missing files are skipped, or raise
+        FileNotFoundError when `required`.
+        """
+        distances = {}
+        if self.vdb is not None and query:
+            distances = best_by_source(self.vdb.search_many([query], k=20))
+        items = []
+        for path in paths:
+            path_abs = os.path.abspath(os.path.join(self.project_root, path))
+            if not os.path.isfile(path_abs) and os.path.isfile(path):
+                path_abs = os.path.abspath(path)
+            if not os.path.isfile(path_abs):
+                if required:
+                    raise FileNotFoundError(f"File not found: {path}")
+                print(f"File not found: {path}")
+                continue
+            with open(path_abs, "r") as f:
+                content = f.read()
+            item = ContextItem(label=path, content=content)
+            module = self.symbol_index.modules.get(path_abs)
+            if module is not None:
+                symbols = relevant_symbols(module.symbols, query)
+                item.symbols = "\n\n".join(
+                    f"# lines {s.start}-{s.end}\n{self.symbol_index.source(s)}"
+                    for s in symbols
+                )
+                item.outline = self.symbol_index.outline(path_abs)
+                item.score = min(len(symbols), 10) / 10
+            elif path_abs.endswith(".md"):
+                item.outline = markdown_outline(content)
+            if path_abs in distances:
+                item.score += 1 / (1 + distances[path_abs])
+            items.append(item)
+        return fit_to_budget(
+            items,
+            render,
+            self.args.get("context_token_budget", 0),
+            model=self.args.get("llm_model"),
+        )
 
     def list_directory(self, path: str) -> List[Dict[str, str]]:
         path_abs = os.path.join(self.project_root, path)
@@ -188,55 +441,203 @@ class TasksBase:
 
     def tool_search_vector_db(self):
         @tool
-        def search_vector_db(query: str, k: int = 5) -> List[str]:
-            """Search the vector DB for chunks related to a natural language query."""
-            return self.search_vector_db(query, k)
+        def search_vector_db(queries: List[str], k: int = 5) -> Dict[str, List[str]]:
+            """Search the vector DB for chunks related to natural language queries. Pass several queries at once to search them in one call; returns the chunks of each query."""
+            queries = [query.strip() for query in queries]
+            results = self.tool_memo.get_many(
+                "search_vector_db",
+                [[query, k] for query in queries],
+                lambda args: self.search_vector_db_many([q for q, _ in args], k),
+            )
+            return dict(zip(queries, results))
 
         return search_vector_db
 
     def tool_load_file_section(self):
         @tool
-        def load_file_section(path: str, start: int, end: int) -> str:
-            """Load specific lines from a file."""
-            return self.load_file_section(path, start, end)
+        def load_file_section(sections: List[FileSection]) -> List[Dict[str, Any]]:
+            """Load specific lines from files. Pass several sections (path, start and end lines) at once to load them in one call."""
+            sections = [
+                FileSection.model_validate(section, from_attributes=True)
+                for section in sections
+            ]
+            contents = self.tool_memo.get_many(
+                "load_file_section",
+                [[os.path.normpath(s.path), s.start, s.end] for s in sections],
+                lambda args: [self.load_file_section(*arg) for arg in args],
+            )
+            return [
+                {**section.model_dump(), "content": content}
+                for section, content in zip(sections, contents)
+            ]
 
         return load_file_section
 
     def tool_grep_string(self):
         @tool
         def grep_string(
-            search: str, page_size: int = 10, page: int = 1
-        ) -> List[Dict[str, str]]:
-            """Search for a string in code files and return matching lines with file name and line number. Supports pagination."""
-            return self.grep_string(search, page_size, page)
+            searches: List[str],
+            page_size: int = 10,
+            page: int = 1,
+            regex: bool = False,
+            whole_word: bool = False,
+        ) -> Dict[str, List[Dict[str, Any]]]:
+            """Search for strings in code files and return matching lines with file name and line number, for each string. Pass several strings at once to search them in one call. Set regex to search with regular expressions and whole_word to match whole words only. Supports pagination."""
+            results = self.tool_memo.get_many(
+                "grep_string",
+                [[search, page_size, page, regex, whole_word] for search in searches],
+                lambda args: [self.grep_string(*arg) for arg in args],
+            )
+            return dict(zip(searches, results))
 
         return grep_string
 
+    def tool_find_symbol(self):
+        @tool
+        def find_symbol(name: str) -> List[Dict[str, Any]]:
+            """Find classes, functions and methods by name (e.g. 'bar', 'Foo.bar' or 'package.module.Foo.bar'). Returns file, start/end lines, signature and docstring of each match."""
+            name = name.strip()
+            return self.tool_memo.get(
+                "find_symbol", name, lambda: self.find_symbol(name)
+            )
+
+        return find_symbol
+
+    def tool_get_symbol_source(self):
+        @tool
+        def get_symbol_source(name: str) -> str:
+            """Return the full source code of a class, function or method by name (e.g. 'Foo.bar'), with its file and line range."""
+            name = name.strip()
+            return self.tool_memo.get(
+                "get_symbol_source", name, lambda: self.get_symbol_source(name)
+            )
+
+        return get_symbol_source
+
     def tool_list_directory(self):
         @tool
-        def list_directory(path: str) -> List[Dict[str, str]]:
-            """List files and folders in a directory with metadata (type file or dir, size in kb if it's file, children count if a dir)."""
-            return self.list_directory(path)
+        def list_directory(paths: List[str]) -> Dict[str, List[Dict[str, str]]]:
+            """List files and folders in directories with metadata (type file or dir, size in kb if it's file, children count if a dir). Pass several directories at once to list them in one call."""
+            results = self.tool_memo.get_many(
+                "list_directory",
+                [os.path.normpath(path) for path in paths],
+                lambda args: [self.list_directory(path) for path in args],
+            )
+            return dict(zip(paths, results))
 
         return list_directory
 
-    def load_feature_item(self):
-        print("load_feature_item")
-        definition_filepath = self.args["feature_definition"]
+    def tool_final_answer(self, schema: Type[BaseModel]):
+        """
+        A tool whose arguments are `schema`; the agent calls it to give its final
+        answer, and the executor returns the validated object as its "output"
+        instead of free text that would need another llm call to parse.
+        """
+        return StructuredTool.from_function(
+            func=lambda **kwargs: schema(**kwargs),
+            name="final_answer",
+            description=f"Submit your final answer ({schema.__name__}). Call it once, when you are done; the arguments are the answer.",
+            args_schema=schema,
+            return_direct=True,
+            # Malformed arguments are shown to the agent, which answers again.
+            handle_validation_error=lambda e: (
+                f"Invalid final_answer arguments: {e}\n"
+                "Call final_answer again with arguments matching its schema."
+            ),
+        )
+
+    def feature_definition_files(self, definition: str = None) -> List[str]:
+        """
+        Resolves --feature-definition: a single file, a directory holding
+        features-definition-*.json files, or a glob pattern.
+        """
+        if definition is None:
+            definition = self.args["feature_definition"]
+        if os.path.isdir(definition):
+            return sorted(
+                glob.glob(os.path.join(definition, "features-definition-*.json"))
+            )
+        if glob.has_magic(definition):
+            return sorted(glob.glob(definition))
+        return [definition]
+
+    def load_feature_items(self, definition: str = None) -> List[FeatureManifest]:
+        return [
+            self.load_feature_item(path)
+            for path in self.feature_definition_files(definition)
+        ]
+
+    def load_feature_item(self, definition_filepath=None):
+        print(f"load_feature_item: {definition_filepath}")
+        if definition_filepath is None:
+            definition_filepath = self.args["feature_definition"]
         with open(definition_filepath, "r") as f:
             feature_item_json = json.load(f)
         return FeatureManifest(**feature_item_json)
 
-    def load_feature_implementation(self):
-        print("load_feature_implementation")
-        design = self.args["feature_design"]
+    def in_shard(self, key: str) -> bool:
+        return self.shard is None or self.shard.owns(key)
+
+    def load_changes(self):
+        """With --since, the files changed since that git ref."""
+        if self.changes is None and self.args.get("since"):
+            self.changes = changed_files(self.project_root, self.args["since"])
+        return self.changes
+
+    def load_feature_items_to_run(self) -> List[FeatureManifest]:
+        """
+        The features of the shard; with --since, only those whose core code or
+        related test files changed. The outputs of the others are left as they are.
+        """
+        if self.shard is not None and self.shard.index == 0:
+            raise ValueError(
+                "shard 0 only plans the extract task; other tasks use shards 1..COUNT"
+            )
+        items = [item for item in self.load_feature_items() if self.in_shard(item.name)]
+        if self.load_changes() is None:
+            return items
+        impacted = impacted_features(items, self.changes)
+        for item in items:
+            if item.name in impacted:
+                print(f"{item.name}: impacted by {', '.join(impacted[item.name])}")
+            else:
+                print(f"{item.name}: unchanged since {self.changes.since}, skipped")
+        return [item for item in items if item.name in impacted]
+
+    def write_feature_manifest(self, feature_manifest: FeatureManifest):
+        print(f"write_feature_manifest: {feature_manifest.name}")
+        name = feature_manifest.name.replace(" ", "_")
+        filename = f"features-definition-{name}.json"
+        with open(os.path.join(self.args["out"], filename), "w") as file:
+            file.write(json.dumps(feature_manifest.model_dump(mode="json"), indent=2))
+
+    def feature_folder(self, feature_item: FeatureManifest):
+        return os.path.join(self.args["out"], feature_item.name.replace(" ", "_"))
+
+    def feature_output_path(self, feature_item: FeatureManifest, arg_name, filename):
+        """
+        The path of a file produced for a feature by an earlier task. The argument may
+        name the file itself (when a single feature is run), or a folder laid out like
+        --out; by default --out is used.
+        """
+        path = self.args.get(arg_name) or ""
+        if os.path.isfile(path):
+            return path
+        folder = path or self.args["out"]
+        return os.path.join(folder, feature_item.name.replace(" ", "_"), filename)
+
+    def load_feature_implementation(self, feature_item: FeatureManifest):
+        print(f"load_feature_implementation: {feature_item.name}")
+        design = self.feature_output_path(feature_item, "feature_design", "design.md")
         with open(design, "r") as f:
             content = f.read()
         return content
 
-    def load_test_cases(self):
-        print("load_test_cases")
-        test_cases = self.args["feature_test_cases"]
+    def load_test_cases(self, feature_item: FeatureManifest):
+        print(f"load_test_cases: {feature_item.name}")
+        test_cases = self.feature_output_path(
+            feature_item, "feature_test_cases", "test_cases.md"
+        )
         with open(test_cases, "r") as f:
             content = f.read()
         return content
@@ -249,5 +650,7 @@ class TasksBase:
             "**/*.py",
             [".py"],
             batch_size=250,
-            sleep_seconds=1,
+            max_batch_tokens=self.args.get("embedding_batch_tokens", 50000),
+            concurrency=self.args.get("embedding_concurrency", 4),
+            workers=self.args.get("index_workers") or os.cpu_count() or 1,
         )
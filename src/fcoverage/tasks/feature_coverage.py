@@ -1,9 +1,12 @@
 import os
-import uuid
+from typing import List
 
+from fcoverage.models import FeatureManifest
+from fcoverage.utils.concurrency import bounded_map
+from fcoverage.utils.shard import write_shard_result
 from fcoverage.utils.prompts import escape_markdown, wrap_in_code_block
 from .base import TasksBase
-from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from langchain_core.prompts import SystemMessagePromptTemplate, ChatPromptTemplate
 
 
@@ -11,57 +14,81 @@ class FeatureCoverageTask(TasksBase):
 
     def __init__(self, args):
         super().__init__(args)
-        self.feature_item = None
-        self.feature_implementation = None
-        self.test_cases = None
+        self.feature_items: List[FeatureManifest] = []
 
-    def prepare(self):
-        super().prepare()
-        self.feature_item = self.load_feature_item()
-        self.feature_implementation = self.load_feature_implementation()
-        self.test_cases = self.load_test_cases()
+    def prepare_inputs(self):
+        self.feature_items = self.load_feature_items_to_run()
+        for arg_name in ["feature_design", "feature_test_cases"]:
+            path = self.args.get(arg_name) or ""
+            if os.path.isfile(path) and len(self.feature_items) > 1:
+                raise ValueError(
+                    f"--{arg_name.replace('_', '-')} names the single file {path}, "
+                    f"but {len(self.feature_items)} features are covered; "
+                    "give a folder laid out like --out instead"
+                )
 
     def run(self):
-        report = self.create_testing_report()
-        self.write_to_file(report)
+        bounded_map(
+            self.cover_feature,
+            self.feature_items,
+            max_workers=self.args.get("max_concurrency", 1),
+            desc="coverage",
+            label=lambda feature_item: feature_item.name,
+        )
+        if self.shard is not None:
+            write_shard_result(
+                self.args["out"],
+                "coverage",
+                self.shard,
+                {
+                    "features": [
+                        feature_item.name for feature_item in self.feature_items
+                    ]
+                },
+            )
+        return True
 
-    def write_to_file(self, report):
-        folder_name = os.path.join(
-            self.args["out"], self.feature_item.name.replace(" ", "_")
+    def cover_feature(self, feature_item: FeatureManifest):
+        feature_implementation = self.load_feature_implementation(feature_item)
+        test_cases = self.load_test_cases(feature_item)
+        report = self.create_testing_report(
+            feature_item, feature_implementation, test_cases
         )
+        self.write_to_file(feature_item, report)
+
+    def write_to_file(self, feature_item: FeatureManifest, report):
+        folder_name = self.feature_folder(feature_item)
         os.makedirs(folder_name, exist_ok=True)
 
         with open(os.path.join(folder_name, "test_coverage.md"), "w") as file:
             file.write(report)
 
-    def build_related_tests_chunk(self):
-        result = []
-        for test_file in self.feature_item.related_test_files:
-            with open(test_file, "r") as f:
-                test_code = f.read()
-            result.append(f"Test file: {test_file}")
-            result.append("```python")
-            result.append(escape_markdown(test_code))
-            result.append("```")
-            result.append("")
-
-        return "\n".join(result)
+    def build_related_tests_chunk(self, feature_item: FeatureManifest):
+        return self.build_context(
+            feature_item.related_test_files,
+            f"{feature_item.name}\n{feature_item.description}",
+            lambda test_file, test_code: (
+                f"Test file: {test_file}\n```python\n{escape_markdown(test_code)}\n```\n"
+            ),
+        )
 
-    def create_testing_report(self) -> str:
+    def create_testing_report(
+        self, feature_item: FeatureManifest, feature_implementation, test_cases
+    ) -> str:
         feature_coverage_system_message_template = (
             SystemMessagePromptTemplate.from_template(
                 self.load_prompt("feature_tests_system.txt")
             )
         )
-        str_related_tests = self.build_related_tests_chunk()
+        str_related_tests = self.build_related_tests_chunk(feature_item)
         system_message = feature_coverage_system_message_template.format(
             project_name=self.project_name,
             project_description=self.project_description,
-            feature_definition=self.feature_item.name,
-            feature_description=self.feature_item.description,
-            feature_entry_point=self.feature_item.entry_point,
-            feature_implementation=wrap_in_code_block(self.feature_implementation),
-            ideal_test_cases=wrap_in_code_block(self.test_cases),
+            feature_definition=feature_item.name,
+            feature_description=feature_item.description,
+            feature_entry_point=feature_item.entry_point,
+            feature_implementation=wrap_in_code_block(feature_implementation),
+            ideal_test_cases=wrap_in_code_block(test_cases),
             actual_related_tests=str_related_tests,
         )
 
@@ -74,32 +101,35 @@ class FeatureCoverageTask(TasksBase):
             ]
         )
 
-        memory = MemorySaver()
         agent_executor = self.get_tool_calling_llm(
             tools=[
                 self.tool_search_vector_db(),
                 self.tool_grep_string(),
                 self.tool_load_file_section(),
+                self.tool_find_symbol(),
+                self.tool_get_symbol_source(),
             ],
             prompt_template=prompt,
-            checkpointer=memory,
         )
-        thread_id = uuid.uuid4()
-        config = {"configurable": {"thread_id": thread_id}}
 
-        self.invoke_with_retry(
-            agent_executor,
-            {"input": self.load_prompt("feature_tests_coverage.txt")},
-            config=config,
-        )
-        self.invoke_with_retry(
-            agent_executor,
-            {"input": self.load_prompt("feature_tests_improvements.txt")},
-            config=config,
+        inputs = self.inputs_sha1(
+            feature_item,
+            feature_item.core_code_files + feature_item.related_test_files,
+            feature_implementation,
+            test_cases,
         )
-        response = self.invoke_with_retry(
-            agent_executor,
-            {"input": self.load_prompt("feature_tests_report.txt")},
-            config=config,
-        )
-        return response["output"]
+        # Each feature keeps its own conversation across the three steps: the
+        # input and journaled output of every finished step, replayed on resume.
+        chat_history: List[BaseMessage] = []
+        output = None
+        for step in ["coverage", "improvements", "report"]:
+            step_input = self.load_prompt(f"feature_tests_{step}.txt")
+            output = self.checkpoint(
+                f"coverage:{feature_item.name}:{inputs}:{step}",
+                lambda: self.invoke_with_retry(
+                    agent_executor,
+                    {"input": step_input, "chat_history": list(chat_history)},
+                )["output"],
+            )
+            chat_history += [HumanMessage(step_input), AIMessage(output)]
+        return output
@@ -1,7 +1,10 @@
 import os
+from typing import List
 from .base import TasksBase
 from fcoverage.models import FeatureManifest
 from langchain_core.prompts import PromptTemplate
+from fcoverage.utils.concurrency import bounded_map
+from fcoverage.utils.shard import write_shard_result
 from fcoverage.utils.prompts import escape_markdown
 
 
@@ -9,23 +12,49 @@ class FeatureDesignTask(TasksBase):
 
     def __init__(self, args):
         super().__init__(args)
-        self.feature_item: None | FeatureManifest = None
+        self.feature_items: List[FeatureManifest] = []
 
-    def prepare(self):
-        super().prepare()
-        self.feature_item = self.load_feature_item()
+    def prepare_inputs(self):
+        self.feature_items = self.load_feature_items_to_run()
 
     def run(self):
-        feature_implementation = self.explain_feature_implementaion()
-        feature_testcases = self.identify_feature_testcases(feature_implementation)
-
-        self.write_to_file(feature_implementation, feature_testcases)
+        bounded_map(
+            self.design_feature,
+            self.feature_items,
+            max_workers=self.args.get("max_concurrency", 1),
+            desc="design",
+            label=lambda feature_item: feature_item.name,
+        )
+        if self.shard is not None:
+            write_shard_result(
+                self.args["out"],
+                "design",
+                self.shard,
+                {
+                    "features": [
+                        feature_item.name for feature_item in self.feature_items
+                    ]
+                },
+            )
         return True
 
-    def write_to_file(self, feature_implementation, feature_testcases):
-        folder_name = os.path.join(
-            self.args["out"], self.feature_item.name.replace(" ", "_")
+    def design_feature(self, feature_item: FeatureManifest):
+        inputs = self.inputs_sha1(feature_item, feature_item.core_code_files)
+        feature_implementation = self.checkpoint(
+            f"design:{feature_item.name}:{inputs}:implementation",
+            lambda: self.explain_feature_implementaion(feature_item),
+        )
+        feature_testcases = self.checkpoint(
+            f"design:{feature_item.name}:{inputs}:test_cases",
+            lambda: self.identify_feature_testcases(
+                feature_item, feature_implementation
+            ),
         )
+
+        self.write_to_file(feature_item, feature_implementation, feature_testcases)
+
+    def write_to_file(self, feature_item, feature_implementation, feature_testcases):
+        folder_name = self.feature_folder(feature_item)
         os.makedirs(folder_name, exist_ok=True)
 
         for filename, content in [
@@ -35,27 +64,29 @@ class FeatureDesignTask(TasksBase):
             with open(os.path.join(folder_name, filename), "w") as file:
                 file.write(content)
 
-    def explain_feature_implementaion(self):
+    def explain_feature_implementaion(self, feature_item: FeatureManifest):
         feature_implementaion_prompt_template = self.load_prompt("feature_design.txt")
         agent_executor = self.get_tool_calling_llm(
             [
                 self.tool_search_vector_db(),
                 self.tool_grep_string(),
                 self.tool_load_file_section(),
+                self.tool_find_symbol(),
+                self.tool_get_symbol_source(),
                 self.tool_list_directory(),
             ],
             PromptTemplate.from_template(feature_implementaion_prompt_template),
         )
         ls_output = self.get_ls_output()
-        core_files = self.get_core_files_context()
+        core_files = self.get_core_files_context(feature_item)
         response = self.invoke_with_retry(
             agent_executor,
             {
                 "project_name": self.project_name,
                 "project_description": self.project_description,
-                "feature_definition": self.feature_item.name,
-                "feature_description": self.feature_item.description,
-                "feature_entry_point": self.feature_item.entry_point,
+                "feature_definition": feature_item.name,
+                "feature_description": feature_item.description,
+                "feature_entry_point": feature_item.entry_point,
                 "core_files": core_files,
                 "ls_output": ls_output,
             },
@@ -69,22 +100,16 @@ class FeatureDesignTask(TasksBase):
 {self.list_directory(self.project_src)}
 """
 
-    def get_core_files_context(self):
-        result = []
-        for file in self.feature_item.core_code_files:
-            if not os.path.exists(file):
-                print(f"File not found: {file}")
-                continue
-            result.append(f"File: {file}")
-            with open(file, "r") as f:
-                content = f.read()
-            result.append("```")
-            result.append(escape_markdown(content))
-            result.append("```")
-
-        return "\n".join(result)
-
-    def identify_feature_testcases(self, feature_implementation):
+    def get_core_files_context(self, feature_item: FeatureManifest):
+        return self.build_context(
+            feature_item.core_code_files,
+            f"{feature_item.name}\n{feature_item.description}",
+            lambda file, content: f"File: {file}\n```\n{escape_markdown(content)}\n```",
+        )
+
+    def identify_feature_testcases(
+        self, feature_item: FeatureManifest, feature_implementation
+    ):
         feature_implementaion_prompt_template = self.load_prompt(
             "feature_generate_ideal_test_cases.txt"
         )
@@ -93,19 +118,22 @@ class FeatureDesignTask(TasksBase):
                 self.tool_search_vector_db(),
                 self.tool_grep_string(),
                 self.tool_load_file_section(),
+                self.tool_find_symbol(),
+                self.tool_get_symbol_source(),
                 self.tool_list_directory(),
             ],
             PromptTemplate.from_template(feature_implementaion_prompt_template),
         )
-        response = agent_executor.invoke(
+        response = self.invoke_with_retry(
+            agent_executor,
             {
                 "project_name": self.project_name,
                 "project_description": self.project_description,
-                "feature_definition": self.feature_item.name,
-                "feature_description": self.feature_item.description,
-                "feature_entry_point": self.feature_item.entry_point,
+                "feature_definition": feature_item.name,
+                "feature_description": feature_item.description,
+                "feature_entry_point": feature_item.entry_point,
                 "feature_implementation": feature_implementation,
-            }
+            },
         )
 
         return response["output"]
@@ -1,64 +1,194 @@
 import json
 import os
-from typing import Any, Dict, List, Set
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Type
+
+import numpy as np
+
 from fcoverage.models import (
     FeatureItem,
+    FeaturesList,
     ProjectFeatures,
     TestToFeatures,
+    TestFilesToFeatures,
     FeatureManifest,
 )
-from tqdm import tqdm
+from fcoverage.utils.code.coverage_index import CoverageIndex, run_test_coverage
 from fcoverage.utils.code.pytest_utils import get_test_files
+from fcoverage.utils.code.shortlist import (
+    MAX_CONFIDENT_FEATURES,
+    FeatureShortlist,
+    cosine_similarity,
+    find_test_references,
+    rank_features,
+    static_scores,
+)
+from fcoverage.utils.concurrency import bounded_map
+from fcoverage.utils.manifest import file_sha1
 from fcoverage.utils.prompts import escape_markdown
+from fcoverage.utils.ratelimit import estimate_tokens
+from fcoverage.utils.shard import write_shard_result
+from fcoverage.utils.telemetry import tracer
+from fcoverage.utils.vdb import best_by_source
 from .base import TasksBase
 from langchain_core.prompts import PromptTemplate
+from pydantic import BaseModel
+
+MISSING_TEST_FILE_CHARS = 8000
+FEATURES_LIST_FILENAME = "features-list.json"
 
 
 class FeatureExtractionTask(TasksBase):
 
     def __init__(self, args):
         super().__init__(args)
+        self._executors: Dict[str, Any] = {}
+        self._executor_lock = threading.Lock()
+        self._coverage_index = None
 
     def run(self):
         print("FeatureExtractionTask starts:")
-        features_list = self.extract_features()
-        test_to_features = self.extract_test_files(features_list)
-        for feature in features_list.features:
-            code_files = self.extract_code_files(feature)
-            feature_manifest = FeatureManifest(
-                name=feature.name,
-                description=feature.description,
-                entry_point=feature.entry_point,
-                core_code_files=code_files,
-                related_test_files=test_to_features[feature.name],
+        if self.args.get("since"):
+            return self.run_incremental()
+        sharded = self.shard is not None and self.shard.index > 0
+        if self.args.get("features_list"):
+            features_list, code_files = self.load_features_list()
+        elif sharded:
+            raise ValueError(
+                "--shard needs --features-list, written by the planning shard "
+                "(--shard 0/COUNT), so every shard uses the same features"
             )
-            self.write_to_file(feature_manifest)
+        else:
+            features_list, code_files = self.extract_features_and_code_files()
+            self.write_features_list(features_list, code_files)
+        if self.shard is not None and self.shard.index == 0:
+            print("FeatureExtractionTask planned the shards.")
+            return True
+
+        test_to_features = self.relate_test_files(features_list, code_files)
+        if sharded:
+            write_shard_result(
+                self.args["out"],
+                "extract",
+                self.shard,
+                {"test_to_features": test_to_features},
+            )
+            print("FeatureExtractionTask finished its shard.")
+            return True
+
+        self.write_manifests(
+            features_list,
+            code_files,
+            self.tests_by_feature(features_list, test_to_features),
+        )
         print("FeatureExtractionTask finished.")
         return True
 
-    def write_to_file(self, feature_manifest: FeatureManifest):
-        print(f"write_to_file: {feature_manifest.name}")
+    def run_incremental(self):
+        """
+        Relates only the test files changed since --since to the features, and
+        keeps the relations of the other test files from the previous feature
+        definitions (--feature-definition, or those in --out). The features and
+        their code files come from the previous features-list.json.
+        """
+        if self.shard is not None:
+            raise ValueError("--since and --shard can not be combined in extract")
+        changes = self.load_changes()
+        features_list, code_files = self.load_features_list()
+        previous = self.load_feature_items(
+            self.args.get("feature_definition") or self.args["out"]
+        )
+        test_to_features: Dict[str, List[str]] = {}
+        for feature_item in previous:
+            for test in feature_item.related_test_files:
+                if os.path.normpath(test) not in changes.paths:
+                    test_to_features.setdefault(test, []).append(feature_item.name)
+        test_to_features.update(
+            self.relate_test_files(features_list, code_files, only=changes.modified)
+        )
+        code_files = {
+            name: [
+                path for path in files if os.path.normpath(path) not in changes.deleted
+            ]
+            for name, files in code_files.items()
+        }
+        self.write_manifests(
+            features_list,
+            code_files,
+            self.tests_by_feature(
+                features_list, dict(sorted(test_to_features.items()))
+            ),
+        )
+        print("FeatureExtractionTask finished.")
+        return True
 
-        name = feature_manifest.name.replace(" ", "_")
-        filename = f"features-definition-{name}.json"
-        with open(os.path.join(self.args["out"], filename), "w") as file:
-            file.write(json.dumps(feature_manifest.model_dump(mode="json"), indent=2))
+    def extract_features_and_code_files(self):
+        features_list = self.checkpoint(
+            "features",
+            self.extract_features,
+            dump=lambda features: features.model_dump(mode="json"),
+            load=lambda value: ProjectFeatures(**value),
+        )
+        pending = [
+            feature
+            for feature in features_list.features
+            if self.code_files_unit(feature) not in (self.journal or ())
+        ]
+        vector_db_files = self.look_up_features_by_vector_db(pending)
+        code_files = {
+            feature.name: self.checkpoint(
+                self.code_files_unit(feature),
+                lambda: self.extract_code_files(feature, vector_db_files[feature.name]),
+            )
+            for feature in features_list.features
+        }
+        return features_list, code_files
 
-    def load_documents(self):
-        result = []
-        docs = [d.strip() for d in self.args["docs"].split(",")]
-        for doc in docs:
-            filename = doc
-            with open(filename, "r") as file:
-                content = file.read()
+    def write_features_list(
+        self, features_list: ProjectFeatures, code_files: Dict[str, List[str]]
+    ):
+        """Saves the features and their code files, the input of sharded runs."""
+        path = os.path.join(self.args["out"], FEATURES_LIST_FILENAME)
+        features = FeaturesList(features=features_list.features, code_files=code_files)
+        with open(path, "w") as file:
+            file.write(json.dumps(features.model_dump(mode="json"), indent=2))
 
-            result.append(f"File: {filename}")
-            result.append("Content:")
-            result.append("```")
-            result.append(escape_markdown(content))
-            result.append("```")
+    def load_features_list(self):
+        path = self.args.get("features_list") or os.path.join(
+            self.args["out"], FEATURES_LIST_FILENAME
+        )
+        print(f"load_features_list: {path}")
+        with open(path, "r") as f:
+            features = FeaturesList(**json.load(f))
+        return ProjectFeatures(features=features.features), features.code_files
 
-        return "\n".join(result)
+    def write_manifests(
+        self,
+        features_list: ProjectFeatures,
+        code_files: Dict[str, List[str]],
+        feature_to_test: Dict[str, List[str]],
+    ):
+        for feature in features_list.features:
+            self.write_feature_manifest(
+                FeatureManifest(
+                    name=feature.name,
+                    description=feature.description,
+                    entry_point=feature.entry_point,
+                    core_code_files=code_files[feature.name],
+                    related_test_files=feature_to_test[feature.name],
+                )
+            )
+
+    def load_documents(self):
+        docs = [d.strip() for d in self.args["docs"].split(",")]
+        return self.build_context(
+            docs,
+            self.project_description,
+            lambda filename, content: (
+                f"File: {filename}\nContent:\n```\n{escape_markdown(content)}\n```"
+            ),
+            required=True,
+        )
 
     def extract_features(self) -> ProjectFeatures:
         print("extract_features")
@@ -74,23 +204,100 @@ class FeatureExtractionTask(TasksBase):
                 "n_features": self.args["max_features"],
             }
         )
-        structured_llm = self.model_with_retry(
-            self.model.with_structured_output(ProjectFeatures)
-        )
-        return structured_llm.invoke(prompt_feature_extraction)
+        structured_llm = self.model.with_structured_output(ProjectFeatures)
+        return self.invoke_with_retry(structured_llm, prompt_feature_extraction)
 
     def extract_test_files(
-        self, features_list: ProjectFeatures
+        self,
+        features_list: ProjectFeatures,
+        code_files: Optional[Dict[str, List[str]]] = None,
     ) -> Dict[str, List[str]]:
-        test_to_feature = dict()
+        return self.tests_by_feature(
+            features_list, self.relate_test_files(features_list, code_files)
+        )
+
+    def relate_test_files(
+        self,
+        features_list: ProjectFeatures,
+        code_files: Optional[Dict[str, List[str]]] = None,
+        only: Optional[Set[str]] = None,
+    ) -> Dict[str, List[str]]:
+        """
+        The related features of each test file of the shard (or of `only`, given
+        as paths relative to the project root), by relative path.
+        """
         features_list_minimized = self.get_features_list_minimized(features_list)
-        for test_file in tqdm(get_test_files(self.project_tests)):
-            relation = self.realte_test_file_to_features(
-                test_file, features_list_minimized
-            )
-            test_to_feature[self.relative_path(test_file)] = relation.related_features
-            self.zzz()
+        test_files = [
+            test_file
+            for test_file in sorted(get_test_files(self.project_tests))
+            if self.in_shard(self.relative_path(test_file))
+            and (only is None or self.relative_path(test_file) in only)
+        ]
+        pending = [
+            test_file
+            for test_file in test_files
+            if self.test_file_unit(test_file) not in (self.journal or ())
+        ]
+        covered = self.relate_by_coverage(pending, code_files or {})
+        shortlists = self.shortlist_features(
+            [test_file for test_file in pending if test_file not in covered],
+            features_list,
+            code_files or {},
+        )
+
+        def candidates(test_file: str) -> List[Dict[str, Any]]:
+            shortlist = shortlists.get(test_file)
+            if shortlist is None:
+                return features_list_minimized
+            return [
+                feature
+                for feature in features_list_minimized
+                if feature["name"] in shortlist.features
+            ]
 
+        def confident(test_file: str) -> List[str]:
+            if test_file in covered:
+                return covered[test_file]
+            shortlist = shortlists.get(test_file)
+            return shortlist.confident if shortlist is not None else []
+
+        packed = self.relate_packed_test_files(
+            [test_file for test_file in pending if not confident(test_file)],
+            candidates,
+        )
+
+        def relate(test_file: str) -> List[str]:
+            if test_file in packed:
+                return packed[test_file]
+            if confident(test_file):
+                source = "test coverage" if test_file in covered else "static analysis"
+                print(
+                    f"realte_test_file_to_features: {test_file} -> "
+                    f"{confident(test_file)} ({source})"
+                )
+                return confident(test_file)
+            return self.realte_test_file_to_features(
+                test_file, candidates(test_file)
+            ).related_features
+
+        relations = bounded_map(
+            lambda test_file: self.checkpoint(
+                self.test_file_unit(test_file), lambda: relate(test_file)
+            ),
+            test_files,
+            max_workers=self.args.get("max_concurrency", 1),
+            desc="extract_test_files",
+            label=self.relative_path,
+        )
+        test_to_feature = dict()
+        for test_file, related_features in zip(test_files, relations):
+            test_to_feature[self.relative_path(test_file)] = related_features
+        return test_to_feature
+
+    @staticmethod
+    def tests_by_feature(
+        features_list: ProjectFeatures, test_to_feature: Dict[str, List[str]]
+    ) -> Dict[str, List[str]]:
         feature_to_test: Dict[str, List[str]] = dict()
         for feature in features_list.features:
             feature_to_test[feature.name] = []
@@ -104,6 +311,192 @@ class FeatureExtractionTask(TasksBase):
 
         return feature_to_test
 
+    def coverage_index(self) -> Optional[CoverageIndex]:
+        """
+        With --coverage-contexts, the lines of the project each test file executed:
+        recorded by running the test suite ("run"), read from a coverage data file
+        recorded with `--cov-context=test`, or loaded from a coverage-index.json.
+        """
+        source = self.args.get("coverage_contexts")
+        if not source:
+            return None
+        if self._coverage_index is None:
+            with tracer.span("coverage_index", "prepare"):
+                if source.endswith(".json"):
+                    index = CoverageIndex.load(source)
+                else:
+                    data_file = source
+                    if source == "run":
+                        data_file = run_test_coverage(
+                            self.project_root,
+                            self.args["test_path"],
+                            self.args["src_path"],
+                            os.path.join(
+                                os.path.abspath(self.args["out"]), ".coverage"
+                            ),
+                        )
+                    index = CoverageIndex.from_coverage_data(
+                        data_file, self.project_root
+                    )
+                    index.save(os.path.join(self.args["out"], CoverageIndex.FILENAME))
+            print(f"coverage_index: {len(index.tests)} test files")
+            self._coverage_index = index
+        return self._coverage_index
+
+    def relate_by_coverage(
+        self, test_files: List[str], code_files: Dict[str, List[str]]
+    ) -> Dict[str, List[str]]:
+        """
+        Relates the test files whose executed lines fall in the core code files of
+        one or two features to those, most executed lines first. Test files not
+        measured, executing no core file, or spread over more features are left to
+        the other means.
+        """
+        index = self.coverage_index()
+        if index is None or not test_files:
+            return {}
+        core_files = {
+            name: {os.path.normpath(path) for path in paths}
+            for name, paths in code_files.items()
+        }
+        related = {}
+        for test_file in test_files:
+            executed = index.features_of(self.relative_path(test_file), core_files)
+            if executed and len(executed) <= MAX_CONFIDENT_FEATURES:
+                related[test_file] = sorted(executed, key=lambda name: -executed[name])
+        print(f"relate_by_coverage: {len(related)} of {len(test_files)} test files")
+        return related
+
+    def shortlist_features(
+        self,
+        test_files: List[str],
+        features_list: ProjectFeatures,
+        code_files: Dict[str, List[str]],
+    ) -> Dict[str, FeatureShortlist]:
+        """
+        Ranks the features for each test file by the imports and calls it makes into
+        each feature's core code files, blended with the cosine similarity between the
+        test file's embedding and the feature description's.
+        """
+        size = self.args.get("shortlist_size", 0)
+        features = features_list.features
+        if not test_files or not size or size >= len(features):
+            return {}
+        print(f"shortlist_features: {len(test_files)} test files")
+
+        core_files = [
+            {
+                os.path.normpath(os.path.join(self.project_root, path))
+                for path in code_files.get(feature.name, [])
+            }
+            for feature in features
+        ]
+        feature_vectors = self.vdb.embeddings.embed_documents(
+            [f"{feature.name}: {feature.description}" for feature in features]
+        )
+        test_vectors = self.test_file_embeddings(test_files)
+        similarity = cosine_similarity(test_vectors, feature_vectors)
+
+        names = [feature.name for feature in features]
+        confidence = self.args.get("shortlist_confidence", 1.0)
+        shortlists = {}
+        for i, test_file in enumerate(test_files):
+            references = find_test_references(test_file, self.symbol_index)
+            static = (
+                static_scores(references, core_files)
+                if references is not None
+                else np.zeros(len(features))
+            )
+            shortlists[test_file] = rank_features(
+                names, static, similarity[i], size, confidence
+            )
+        return shortlists
+
+    def test_file_embeddings(self, test_files: List[str]) -> np.ndarray:
+        # Reuses the chunks indexed in the vector db; files missing from it are
+        # embedded directly, cut to the size of an indexed chunk.
+        vectors = self.vdb.source_embeddings(test_files)
+        missing = [path for path in test_files if path not in vectors]
+        if missing:
+            texts = []
+            for path in missing:
+                with open(path, "r") as f:
+                    texts.append(f.read()[:MISSING_TEST_FILE_CHARS])
+            vectors.update(zip(missing, self.vdb.embeddings.embed_documents(texts)))
+        return np.array([vectors[path] for path in test_files])
+
+    def pack_test_files(self, test_files: List[str], budget: int) -> List[List[str]]:
+        """Greedily groups consecutive test files while their code fits in `budget` tokens."""
+        packs, pack, pack_tokens = [], [], 0
+        for test_file in test_files:
+            with open(test_file, "r") as f:
+                tokens = estimate_tokens(f.read())
+            if pack and pack_tokens + tokens > budget:
+                packs.append(pack)
+                pack, pack_tokens = [], 0
+            pack.append(test_file)
+            pack_tokens += tokens
+        if pack:
+            packs.append(pack)
+        return packs
+
+    def relate_packed_test_files(
+        self,
+        test_files: List[str],
+        candidates: Callable[[str], List[Dict[str, Any]]],
+    ) -> Dict[str, List[str]]:
+        """
+        With --pack-token-budget, relates small test files to features several per
+        llm call, sharing the prompt and the feature list between them. Files left
+        out of a packed answer, or in a pack whose answer is invalid, are not in the
+        result and get related one file per call.
+        """
+        budget = self.args.get("pack_token_budget", 0)
+        if not budget:
+            return {}
+        packs = [p for p in self.pack_test_files(test_files, budget) if len(p) > 1]
+        if not packs:
+            return {}
+
+        def relate_pack(pack: List[str]) -> Dict[str, List[str]]:
+            # the union of the files' candidates
+            features = {}
+            for test_file in pack:
+                for feature in candidates(test_file):
+                    features.setdefault(feature["name"], feature)
+            try:
+                related = self.realte_test_files_to_features(
+                    pack, list(features.values())
+                )
+            except ValueError as e:
+                print(f"realte_test_files_to_features: invalid answer ({e})")
+                return {}
+            for test_file in related:
+                self.checkpoint(
+                    self.test_file_unit(test_file), lambda: related[test_file]
+                )
+            return related
+
+        packed = {}
+        for related in bounded_map(
+            relate_pack,
+            packs,
+            max_workers=self.args.get("max_concurrency", 1),
+            desc="relate_packed_test_files",
+            label=lambda pack: f"{len(pack)} files",
+        ):
+            packed.update(related)
+        return packed
+
+    def test_file_unit(self, test_file: str) -> str:
+        # The content hash makes a resumed run re-classify test files edited since.
+        return (
+            f"test-to-features:{self.relative_path(test_file)}:{file_sha1(test_file)}"
+        )
+
+    def code_files_unit(self, feature: FeatureItem) -> str:
+        return f"code-files:{feature.name}"
+
     def get_features_list_minimized(self, features_list: ProjectFeatures):
         items = []
         for feature in features_list.features:
@@ -118,22 +511,11 @@ class FeatureExtractionTask(TasksBase):
         self, test_path: str, features_list_minimized: List[Dict[str, Any]]
     ) -> TestToFeatures:
         print(f"realte_test_file_to_features: {test_path}")
-        test_to_feature_prompt_template = self.load_prompt("test_to_feature.txt")
-        agent_executor = self.get_tool_calling_llm(
-            [
-                self.tool_search_vector_db(),
-                self.tool_grep_string(),
-                self.tool_load_file_section(),
-                self.tool_list_directory(),
-            ],
-            PromptTemplate.from_template(test_to_feature_prompt_template),
-        )
-
         with open(test_path, "r") as f:
             test_code = f.read()
 
         response = self.invoke_with_retry(
-            agent_executor,
+            self.test_to_feature_executor("test_to_feature.txt", TestToFeatures),
             {
                 "project_name": self.project_name,
                 "project_description": self.project_description,
@@ -144,12 +526,66 @@ class FeatureExtractionTask(TasksBase):
         )
 
         result = response["output"]
-        structured_llm = self.model_with_retry(
-            self.model.with_structured_output(TestToFeatures)
+        if isinstance(result, TestToFeatures):
+            return result
+        # The agent answered in plain text instead of calling final_answer.
+        structured_llm = self.model.with_structured_output(TestToFeatures)
+        return self.invoke_with_retry(structured_llm, result)
+
+    def realte_test_files_to_features(
+        self, test_paths: List[str], features_list_minimized: List[Dict[str, Any]]
+    ) -> Dict[str, List[str]]:
+        """
+        Relates several test files in one call. Returns the related features of the
+        files the answer covers; raises ValueError when the answer is invalid.
+        """
+        print(f"realte_test_files_to_features: {len(test_paths)} files")
+        by_filename = {self.relative_path(path): path for path in test_paths}
+        test_files = []
+        for filename, path in by_filename.items():
+            with open(path, "r") as f:
+                test_code = f.read()
+            test_files += [f"File: {filename}", "```python", test_code, "```", ""]
+
+        response = self.invoke_with_retry(
+            self.test_to_feature_executor(
+                "test_to_feature_batch.txt", TestFilesToFeatures
+            ),
+            {
+                "project_name": self.project_name,
+                "project_description": self.project_description,
+                "test_files": "\n".join(test_files),
+                "features_list": features_list_minimized,
+            },
         )
-        self.zzz()
-        test_to_features = structured_llm.invoke(result)
-        return test_to_features
+
+        result = response["output"]
+        if not isinstance(result, TestFilesToFeatures):
+            raise ValueError(f"expected a final_answer call, got: {str(result)[:200]}")
+        related = {}
+        for item in result.test_files:
+            path = by_filename.get(os.path.normpath(item.filename.strip()))
+            if path is not None:
+                related[path] = item.related_features
+        return related
+
+    def test_to_feature_executor(self, prompt_filename: str, schema: Type[BaseModel]):
+        # Built once per run and shared by the workers; it holds no per-call state.
+        with self._executor_lock:
+            if prompt_filename not in self._executors:
+                self._executors[prompt_filename] = self.get_tool_calling_llm(
+                    [
+                        self.tool_search_vector_db(),
+                        self.tool_grep_string(),
+                        self.tool_load_file_section(),
+                        self.tool_find_symbol(),
+                        self.tool_get_symbol_source(),
+                        self.tool_list_directory(),
+                        self.tool_final_answer(schema),
+                    ],
+                    PromptTemplate.from_template(self.load_prompt(prompt_filename)),
+                )
+            return self._executors[prompt_filename]
 
     def look_up_by_keywords_and_grep(self, keywords: List[str]) -> Set[str]:
         output = set()
@@ -160,16 +596,25 @@ class FeatureExtractionTask(TasksBase):
         return output
 
     def look_up_by_vector_db(self, queries: List[str]) -> Set[str]:
-        output = set()
-        for query in queries:
-            results = self.vdb.search(query, k=5)
-            for item in results:
-                output.add(item.metadata.get("source"))
+        return set(best_by_source(self.vdb.search_many(queries, k=5)))
+
+    def look_up_features_by_vector_db(
+        self, features: List[FeatureItem]
+    ) -> Dict[str, Set[str]]:
+        print("look_up_features_by_vector_db")
+        queries = [q for feature in features for q in feature.queries]
+        results = iter(self.vdb.search_many(queries, k=5))
+        output = dict()
+        for feature in features:
+            feature_results = [next(results) for _ in feature.queries]
+            output[feature.name] = set(best_by_source(feature_results))
         return output
 
-    def extract_code_files(self, feature: FeatureItem):
+    def extract_code_files(self, feature: FeatureItem, vector_db_files=None):
         print(f"extract_code_files: {feature.name}")
         files_1 = self.look_up_by_keywords_and_grep(feature.keywords)
-        files_2 = self.look_up_by_vector_db(feature.queries)
+        if vector_db_files is None:
+            vector_db_files = self.look_up_by_vector_db(feature.queries)
+        files_2 = vector_db_files
         files = [self.relative_path(f) for f in files_1.union(files_2)]
         return files
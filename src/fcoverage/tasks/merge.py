@@ -0,0 +1,64 @@
+import os
+from typing import Any, Dict, List
+
+from fcoverage.utils.shard import load_shard_results
+from fcoverage.utils.telemetry import tracer
+from .base import TasksBase
+from .feature_extraction import FeatureExtractionTask
+
+
+class MergeTask(TasksBase):
+    """
+    Combines the partial results of sharded runs, found in --out/shards, into the
+    outputs a single run would have written. Design and coverage shards write
+    their per-feature files directly, so only their completeness is checked.
+    """
+
+    def prepare(self):
+        # Nothing to index or ask the llm; the shards did that.
+        tracer.start(self.args["out"])
+
+    def run(self):
+        print("MergeTask starts:")
+        results = load_shard_results(self.args["out"])
+        if not results:
+            print(f"No shard results in {os.path.join(self.args['out'], 'shards')}")
+            return False
+        success = True
+        for task, shards in sorted(results.items()):
+            if not self.check_complete(task, shards):
+                success = False
+            elif task == "extract":
+                self.merge_extract(shards)
+            else:
+                features = sum(len(shard["features"]) for shard in shards)
+                print(f"{task}: {len(shards)} shards, {features} features")
+        print("MergeTask finished.")
+        return success
+
+    def check_complete(self, task: str, shards: List[Dict[str, Any]]) -> bool:
+        counts = {shard["count"] for shard in shards}
+        if len(counts) > 1:
+            print(f"{task}: shards of different counts {sorted(counts)}")
+            return False
+        (count,) = counts
+        missing = set(range(1, count + 1)) - {shard["index"] for shard in shards}
+        if missing:
+            print(f"{task}: missing shards {sorted(missing)} of {count}")
+            return False
+        return True
+
+    def merge_extract(self, shards: List[Dict[str, Any]]):
+        extraction = FeatureExtractionTask(self.args)
+        features_list, code_files = extraction.load_features_list()
+        test_to_features = {}
+        for shard in shards:
+            test_to_features.update(shard["test_to_features"])
+        # the order of a single run, which relates the test files sorted by path
+        test_to_features = dict(sorted(test_to_features.items()))
+        print(f"extract: {len(shards)} shards, {len(test_to_features)} test files")
+        extraction.write_manifests(
+            features_list,
+            code_files,
+            extraction.tests_by_feature(features_list, test_to_features),
+        )
@@ -0,0 +1,30 @@
+from typing import Optional
+
+from langchain.agents import AgentExecutor
+from langchain_core.agents import AgentAction, AgentFinish
+from pydantic import BaseModel
+
+__all__ = [
+    "FINAL_ANSWER_TOOL",
+    "FinalAnswerAgentExecutor",
+]
+
+FINAL_ANSWER_TOOL = "final_answer"
+
+
+class FinalAnswerAgentExecutor(AgentExecutor):
+    """
+    Ends the run with the validated object returned by the `final_answer` tool.
+    When the arguments did not validate, the tool returns the error instead, and
+    the agent is shown it to answer again rather than the error being the output.
+    """
+
+    def _get_tool_return(
+        self, next_step_output: tuple[AgentAction, str]
+    ) -> Optional[AgentFinish]:
+        agent_action, observation = next_step_output
+        if agent_action.tool == FINAL_ANSWER_TOOL and not isinstance(
+            observation, BaseModel
+        ):
+            return None
+        return super()._get_tool_return(next_step_output)
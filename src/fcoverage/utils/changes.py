@@ -0,0 +1,81 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Set
+
+from fcoverage.models import FeatureManifest
+
+__all__ = [
+    "ChangeSet",
+    "changed_files",
+    "impacted_features",
+]
+
+
+@dataclass
+class ChangeSet:
+    """Files changed since a git ref, relative to the project root."""
+
+    since: str
+    modified: Set[str] = field(default_factory=set)  # added or modified
+    deleted: Set[str] = field(default_factory=set)
+
+    @property
+    def paths(self) -> Set[str]:
+        return self.modified | self.deleted
+
+
+def changed_files(project_root: str, since: str) -> ChangeSet:
+    """
+    The files of the project that differ between `since` and the working tree:
+    committed, staged and unstaged changes, and untracked files. A rename counts
+    as the deletion of the old path and the addition of the new one.
+    """
+    import git
+
+    repo = git.Repo(project_root, search_parent_directories=True)
+    repo_root = os.path.realpath(repo.working_tree_dir)
+    changes = ChangeSet(since)
+
+    def relative(path: str) -> str:
+        return os.path.relpath(
+            os.path.join(repo_root, path), os.path.realpath(project_root)
+        )
+
+    # -z: NUL separated "status, path" (or "status, old path, new path" for renames)
+    fields = repo.git.diff("--name-status", "-M", "-z", since, "--").split("\0")
+    fields = iter(value for value in fields if value)
+    for status in fields:
+        if status.startswith(("R", "C")):
+            old, new = next(fields), next(fields)
+            if status.startswith("R"):
+                changes.deleted.add(relative(old))
+            changes.modified.add(relative(new))
+        elif status.startswith("D"):
+            changes.deleted.add(relative(next(fields)))
+        else:
+            changes.modified.add(relative(next(fields)))
+    changes.modified.update(relative(path) for path in repo.untracked_files)
+    # files outside the project (e.g. the project is a subfolder of the repo)
+    changes.modified = {p for p in changes.modified if not p.startswith("..")}
+    changes.deleted = {p for p in changes.deleted if not p.startswith("..")}
+    print(
+        f"changed_files since {since}: "
+        f"{len(changes.modified)} added or modified, {len(changes.deleted)} deleted"
+    )
+    return changes
+
+
+def impacted_features(
+    feature_items: List[FeatureManifest], changes: ChangeSet
+) -> Dict[str, List[str]]:
+    """The features whose core code or related test files changed, with those files."""
+    impacted = {}
+    for feature_item in feature_items:
+        files = [
+            path
+            for path in feature_item.core_code_files + feature_item.related_test_files
+            if os.path.normpath(path) in changes.paths
+        ]
+        if files:
+            impacted[feature_item.name] = files
+    return impacted
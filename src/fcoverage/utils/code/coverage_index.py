@@ -0,0 +1,121 @@
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional, Set
+
+__all__ = [
+    "CoverageIndex",
+    "run_test_coverage",
+]
+
+
+def run_test_coverage(
+    project_root: str, test_path: str, src_path: str, data_file: str
+) -> str:
+    """
+    Runs the project's pytest suite under coverage.py, recording which test
+    executed each line of `src_path` (pytest-cov's per-test dynamic contexts).
+    Failing tests do not matter: the lines they executed are recorded as well.
+    """
+    print(f"run_test_coverage: {test_path}")
+    command = [
+        sys.executable,
+        "-m",
+        "pytest",
+        test_path,
+        f"--cov={src_path}",
+        "--cov-context=test",
+        "--cov-report=",
+        "-q",
+        "-p",
+        "no:cacheprovider",
+    ]
+    env = {**os.environ, "COVERAGE_FILE": os.path.abspath(data_file)}
+    result = subprocess.run(
+        command, cwd=project_root, env=env, capture_output=True, text=True
+    )
+    summary = (result.stdout.strip().splitlines() or [""])[-1]
+    print(f"run_test_coverage: pytest exited with {result.returncode}: {summary}")
+    if not os.path.exists(data_file):
+        raise RuntimeError(
+            f"pytest did not record coverage data:\n{result.stdout}{result.stderr}"
+        )
+    return data_file
+
+
+class CoverageIndex:
+    """
+    Test file -> project file -> the lines its tests executed, with paths relative
+    to the project root. Built from a coverage data file recorded with
+    `--cov-context=test`, whose contexts are pytest node ids.
+    """
+
+    FILENAME = "coverage-index.json"
+
+    def __init__(self, tests: Dict[str, Dict[str, List[int]]] = None):
+        self.tests = tests or {}
+
+    @classmethod
+    def from_coverage_data(cls, data_file: str, project_root: str) -> "CoverageIndex":
+        from coverage import CoverageData
+
+        data = CoverageData(basename=data_file)
+        data.read()
+        project_root = os.path.realpath(project_root)
+        tests: Dict[str, Dict[str, Set[int]]] = {}
+        for measured in data.measured_files():
+            path = os.path.relpath(os.path.realpath(measured), project_root)
+            if path.startswith(".."):
+                continue
+            for line, contexts in data.contexts_by_lineno(measured).items():
+                for context in contexts:
+                    test_file = cls.context_test_file(context, project_root)
+                    if test_file is None:
+                        continue
+                    tests.setdefault(test_file, {}).setdefault(path, set()).add(line)
+        return cls(
+            {
+                test_file: {
+                    path: sorted(lines) for path, lines in sorted(files.items())
+                }
+                for test_file, files in sorted(tests.items())
+            }
+        )
+
+    @staticmethod
+    def context_test_file(context: str, project_root: str):
+        # "tests/test_login.py::TestLogin::test_ok|run"; the empty context holds
+        # the lines executed outside of any test (e.g. at import time).
+        if "::" not in context:
+            return None
+        path = os.path.normpath(context.split("::", 1)[0])
+        if not os.path.isfile(os.path.join(project_root, path)):
+            return None
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "CoverageIndex":
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.tests, f)
+
+    def features_of(
+        self, test_file: str, core_files: Dict[str, Set[str]]
+    ) -> Optional[Dict[str, int]]:
+        """
+        The features whose core files `test_file` executed, with the number of
+        lines executed in them; None when the test file was not measured.
+        """
+        files = self.tests.get(os.path.normpath(test_file))
+        if files is None:
+            return None
+        executed = {}
+        for feature, paths in core_files.items():
+            lines = sum(len(files.get(path, [])) for path in paths)
+            if lines:
+                executed[feature] = lines
+        return executed
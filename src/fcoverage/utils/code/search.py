@@ -0,0 +1,173 @@
+import os
+import re
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+__all__ = [
+    "CodeSearchIndex",
+    "find_source_files",
+]
+
+EXCLUDED_DIRS = {
+    ".git",
+    ".hg",
+    ".svn",
+    ".venv",
+    "venv",
+    "env",
+    ".env",
+    "__pycache__",
+    "site-packages",
+    "node_modules",
+    ".tox",
+    ".nox",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".ruff_cache",
+    ".eggs",
+}
+
+
+def _is_excluded(parts: Iterable[str]) -> bool:
+    return any(part in EXCLUDED_DIRS or part.endswith(".egg-info") for part in parts)
+
+
+def _git_files(root: str) -> Optional[List[str]]:
+    try:
+        output = subprocess.run(
+            ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+            cwd=root,
+            capture_output=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return [name for name in output.decode("utf-8").split("\0") if name]
+
+
+def find_source_files(root: str, suffixes=(".py",)) -> List[str]:
+    """
+    Lists the source files of a project, sorted. Inside a git work tree this honors
+    .gitignore; otherwise the tree is walked. Virtualenvs, caches and VCS folders
+    are always skipped.
+    """
+    root = os.path.abspath(root)
+    names = _git_files(root)
+    if names is None:
+        names = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [
+                d
+                for d in dirnames
+                if not _is_excluded([d])
+                and not os.path.exists(os.path.join(dirpath, d, "pyvenv.cfg"))
+            ]
+            rel = os.path.relpath(dirpath, root)
+            names.extend(os.path.normpath(os.path.join(rel, f)) for f in filenames)
+
+    files = []
+    for name in names:
+        if not name.endswith(tuple(suffixes)) or _is_excluded(Path(name).parts[:-1]):
+            continue
+        path = os.path.join(root, name)
+        if os.path.isfile(path):
+            files.append(path)
+    return sorted(files)
+
+
+def _trigrams(text: str):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class CodeSearchIndex:
+    """
+    In-memory search over the source files of a project, built once per run.
+
+    A trigram index maps every 3-character substring to the files containing it,
+    so a literal search only scans files that can match. Results are produced in
+    file/line order and scanning stops as soon as the requested page is full.
+    """
+
+    def __init__(self, root: str, suffixes=(".py",)):
+        self.root = os.path.abspath(root)
+        self.files: List[str] = []
+        self.contents: List[str] = []
+        self.postings: Dict[str, List[int]] = {}
+        for path in find_source_files(self.root, suffixes):
+            try:
+                with open(path, "r", errors="ignore") as f:
+                    content = f.read()
+            except OSError as e:
+                print(f"CodeSearchIndex: skipping {path}: {e}")
+                continue
+            file_id = len(self.files)
+            self.files.append(path)
+            self.contents.append(content)
+            for trigram in _trigrams(content):
+                self.postings.setdefault(trigram, []).append(file_id)
+
+    def _candidates(self, literal: str) -> Iterable[int]:
+        if len(literal) < 3:
+            return range(len(self.files))
+        postings = []
+        for trigram in _trigrams(literal):
+            posting = self.postings.get(trigram)
+            if not posting:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                return []
+        return sorted(candidates)
+
+    def search(
+        self,
+        search: str,
+        page_size: int = 10,
+        page: int = 1,
+        regex: bool = False,
+        whole_word: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns one page of matching lines as {"file", "line", "text"} records.
+        `search` is a literal string unless `regex` is set; `whole_word` only
+        matches at word boundaries.
+        """
+        if regex or whole_word:
+            try:
+                pattern = search if regex else re.escape(search)
+                if whole_word:
+                    pattern = rf"\b(?:{pattern})\b"
+                matcher = re.compile(pattern).search
+            except re.error as e:
+                return [{"file": "", "line": -1, "text": f"Invalid regex: {e}"}]
+        else:
+            matcher = None
+
+        start_index = max(page - 1, 0) * page_size
+        end_index = start_index + page_size
+        candidates = range(len(self.files)) if regex else self._candidates(search)
+
+        result = []
+        for file_id in candidates:
+            content = self.contents[file_id]
+            if matcher is None and search not in content:
+                continue
+            for lineno, line in enumerate(content.splitlines(), start=1):
+                found = matcher(line) if matcher else search in line
+                if not found:
+                    continue
+                result.append(
+                    {
+                        "file": self.files[file_id],
+                        "line": lineno,
+                        "text": line.strip(),
+                    }
+                )
+                if len(result) >= end_index:
+                    return result[start_index:end_index]
+        return result[start_index:end_index]
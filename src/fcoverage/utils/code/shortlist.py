@@ -0,0 +1,134 @@
+import ast
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from fcoverage.utils.code.symbols import SymbolIndex
+
+__all__ = [
+    "StaticReferences",
+    "FeatureShortlist",
+    "find_test_references",
+    "static_scores",
+    "cosine_similarity",
+    "rank_features",
+]
+
+# A test whose project references all point into the core files of one or two
+# features is related to those; more than that means it only touches shared code.
+MAX_CONFIDENT_FEATURES = 2
+
+
+@dataclass
+class StaticReferences:
+    """Project files a test imports, and project symbols it calls."""
+
+    files: Set[str] = field(default_factory=set)
+    symbols: Dict[str, str] = field(default_factory=dict)  # called name -> file
+
+    @property
+    def size(self) -> int:
+        return len(self.files) + len(self.symbols)
+
+
+@dataclass
+class FeatureShortlist:
+    features: List[str]  # feature names, best first
+    confident: List[str]  # features related without asking the llm
+    scores: Dict[str, float]
+
+
+def _called_names(tree: ast.AST) -> Set[str]:
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Name):
+                names.add(node.func.id)
+            elif isinstance(node.func, ast.Attribute):
+                names.add(node.func.attr)
+    return names
+
+
+def find_test_references(
+    test_path: str, symbol_index: SymbolIndex
+) -> Optional[StaticReferences]:
+    """
+    Resolves the imports of a test file to project files, and the names it calls to
+    the files defining them. Returns None when the test is not in the index.
+    """
+    module = symbol_index.modules.get(test_path)
+    if module is None:
+        return None
+    path_by_module = symbol_index.path_by_module
+
+    references = StaticReferences()
+    for name in module.imports:
+        while name and name not in path_by_module:
+            name = name.rpartition(".")[0]
+        if name and path_by_module[name] != test_path:
+            references.files.add(path_by_module[name])
+
+    try:
+        tree = ast.parse(symbol_index.contents[test_path])
+    except (SyntaxError, ValueError):
+        return references
+    for name in _called_names(tree):
+        files = {
+            symbol.path
+            for symbol in symbol_index.by_name.get(name, [])
+            if symbol.path != test_path
+        }
+        if len(files) == 1:
+            references.symbols[name] = files.pop()
+    return references
+
+
+def static_scores(
+    references: StaticReferences, core_files: Sequence[Set[str]]
+) -> np.ndarray:
+    """
+    For each feature, the share of the test's project references (imported files
+    and called symbols) that land in the feature's core files.
+    """
+    scores = np.zeros(len(core_files))
+    if not references.size:
+        return scores
+    for i, files in enumerate(core_files):
+        hits = len(references.files & files)
+        hits += sum(1 for path in references.symbols.values() if path in files)
+        scores[i] = hits / references.size
+    return scores
+
+
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise cosine similarity between the rows of `a` and the rows of `b`."""
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+    b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+    return a @ b.T
+
+
+def rank_features(
+    feature_names: Sequence[str],
+    static: np.ndarray,
+    similarity: np.ndarray,
+    size: int,
+    confidence: float,
+    static_weight: float = 0.7,
+) -> FeatureShortlist:
+    """
+    Orders features by a blend of static evidence and embedding similarity, and
+    picks the features the static evidence alone is confident about.
+    """
+    combined = static_weight * static + (1 - static_weight) * np.clip(similarity, 0, 1)
+    order = np.argsort(-combined, kind="stable")
+    confident = [feature_names[i] for i in order if static[i] >= confidence]
+    if len(confident) > MAX_CONFIDENT_FEATURES:
+        confident = []
+    return FeatureShortlist(
+        features=[feature_names[i] for i in order[:size]],
+        confident=confident,
+        scores={feature_names[i]: round(float(combined[i]), 4) for i in order},
+    )
@@ -0,0 +1,193 @@
+import ast
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+__all__ = [
+    "Symbol",
+    "ModuleSymbols",
+    "SymbolIndex",
+    "module_name",
+]
+
+
+def module_name(path: str) -> str:
+    """Dotted module name of a file, walking up through package folders."""
+    directory, filename = os.path.split(os.path.abspath(path))
+    stem = os.path.splitext(filename)[0]
+    parts = [] if stem == "__init__" else [stem]
+    while os.path.exists(os.path.join(directory, "__init__.py")):
+        directory, package = os.path.split(directory)
+        parts.insert(0, package)
+    return ".".join(parts)
+
+
+@dataclass
+class Symbol:
+    name: str  # qualified within the module, e.g. "Foo.bar"
+    kind: str  # "class", "function" or "method"
+    module: str
+    path: str
+    start: int
+    end: int
+    signature: str
+    docstring: str = ""
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.module}.{self.name}" if self.module else self.name
+
+    def to_dict(self, path: Optional[str] = None) -> Dict[str, object]:
+        return {
+            "symbol": self.full_name,
+            "kind": self.kind,
+            "file": path or self.path,
+            "start": self.start,
+            "end": self.end,
+            "signature": self.signature,
+            "docstring": self.docstring,
+        }
+
+
+@dataclass
+class ModuleSymbols:
+    path: str
+    module: str
+    imports: List[str] = field(default_factory=list)
+    symbols: List[Symbol] = field(default_factory=list)
+
+
+def _signature(node: ast.AST) -> str:
+    if isinstance(node, ast.ClassDef):
+        bases = [ast.unparse(b) for b in node.bases + node.keywords]
+        return (
+            f"class {node.name}({', '.join(bases)})" if bases else f"class {node.name}"
+        )
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+    return f"{prefix} {node.name}({ast.unparse(node.args)}){returns}"
+
+
+def _docstring(node: ast.AST) -> str:
+    docstring = ast.get_docstring(node) or ""
+    return " ".join(docstring.strip().split("\n\n")[0].split())
+
+
+def _imports(tree: ast.Module, module: str) -> List[str]:
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                package = module.split(".")[: -node.level]
+                base = ".".join(package + ([base] if base else []))
+            imports.extend(
+                f"{base}.{alias.name}" if base else alias.name for alias in node.names
+            )
+    return imports
+
+
+def parse_module(path: str, content: str) -> ModuleSymbols:
+    module = module_name(path)
+    result = ModuleSymbols(path=path, module=module)
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return result
+    result.imports = _imports(tree, module)
+
+    def visit(body: Iterable[ast.AST], prefix: str, in_class: bool):
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                kind = "class"
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "method" if in_class else "function"
+            else:
+                continue
+            name = f"{prefix}{node.name}"
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+            result.symbols.append(
+                Symbol(
+                    name=name,
+                    kind=kind,
+                    module=module,
+                    path=path,
+                    start=start,
+                    end=node.end_lineno,
+                    signature=_signature(node),
+                    docstring=_docstring(node),
+                )
+            )
+            if kind == "class":
+                visit(node.body, f"{name}.", True)
+
+    visit(tree.body, "", False)
+    return result
+
+
+class SymbolIndex:
+    """
+    Table of the classes, functions and methods of a project, built with `ast`:
+    module -> symbols with line ranges, signatures and docstrings, plus imports.
+    """
+
+    def __init__(self, sources: Iterable[Tuple[str, str]]):
+        self.modules: Dict[str, ModuleSymbols] = {}
+        self.contents: Dict[str, str] = {}
+        self.by_name: Dict[str, List[Symbol]] = {}
+        self.path_by_module: Dict[str, str] = {}
+        for path, content in sources:
+            if not path.endswith(".py"):
+                continue
+            module = parse_module(path, content)
+            self.modules[path] = module
+            self.contents[path] = content
+            self.path_by_module[module.module] = path
+            for symbol in module.symbols:
+                self.by_name.setdefault(symbol.name.split(".")[-1], []).append(symbol)
+
+    def find(self, name: str) -> List[Symbol]:
+        """
+        Symbols matching `name`: a bare name ("bar"), a qualified name ("Foo.bar")
+        or a module-qualified one ("pkg.mod.Foo.bar"). Falls back to a
+        case-insensitive substring match when nothing matches exactly.
+        """
+        name = name.strip()
+        last = name.split(".")[-1]
+        exact = [
+            symbol
+            for symbol in self.by_name.get(last, [])
+            if symbol.full_name == name
+            or symbol.full_name.endswith(f".{name}")
+            or symbol.name == name
+        ]
+        if exact:
+            return exact
+        needle = name.lower()
+        return [
+            symbol
+            for symbols in self.by_name.values()
+            for symbol in symbols
+            if needle in symbol.full_name.lower()
+        ]
+
+    def source(self, symbol: Symbol) -> str:
+        lines = self.contents[symbol.path].splitlines(keepends=True)
+        return "".join(lines[symbol.start - 1 : symbol.end])
+
+    def outline(self, path: str) -> str:
+        """The signatures (and docstring summaries) of a module, indented by nesting."""
+        module = self.modules.get(path)
+        if module is None:
+            return ""
+        lines = []
+        for symbol in module.symbols:
+            indent = "    " * symbol.name.count(".")
+            lines.append(
+                f"{indent}{symbol.signature}:  # lines {symbol.start}-{symbol.end}"
+            )
+            if symbol.docstring:
+                lines.append(f'{indent}    """{symbol.docstring}"""')
+        return "\n".join(lines)
@@ -0,0 +1,55 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Sequence, TypeVar
+from tqdm import tqdm
+
+__all__ = [
+    "bounded_map",
+]
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def bounded_map(
+    fn: Callable[[T], R],
+    items: Sequence[T],
+    max_workers: int = 1,
+    desc: str = None,
+    label: Callable[[T], str] = str,
+) -> List[R]:
+    """
+    Calls `fn` on every item with at most `max_workers` calls in flight.
+    Results are returned in the order of `items`, regardless of completion order.
+    """
+    items = list(items)
+    results: List[R] = [None] * len(items)
+    progress = tqdm(total=len(items), desc=desc)
+    try:
+        if max_workers <= 1:
+            for i, item in enumerate(items):
+                results[i] = fn(item)
+                progress.set_postfix_str(label(item))
+                progress.update(1)
+            return results
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Workers run in a copy of the caller's context, so context variables
+            # (e.g. the job a server routes the output of) carry over.
+            futures = {
+                executor.submit(contextvars.copy_context().run, fn, item): i
+                for i, item in enumerate(items)
+            }
+            try:
+                for future in as_completed(futures):
+                    i = futures[future]
+                    results[i] = future.result()
+                    progress.set_postfix_str(label(items[i]))
+                    progress.update(1)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        return results
+    finally:
+        progress.close()
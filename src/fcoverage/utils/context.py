@@ -0,0 +1,150 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+from fcoverage.utils.code.symbols import Symbol
+from fcoverage.utils.ratelimit import estimate_tokens
+
+__all__ = [
+    "ContextItem",
+    "count_tokens",
+    "fit_to_budget",
+    "relevant_symbols",
+    "markdown_outline",
+]
+
+LEVEL_NOTES = {
+    "full": "",
+    "symbols": " (relevant symbols only)",
+    "outline": " (outline only)",
+}
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: Optional[str]):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model or "")
+    except KeyError:
+        pass
+    except Exception:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # The encoding files are downloaded on first use; offline, estimate instead.
+        return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Tokens of `text` for `model` with tiktoken, or an estimate without it."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+@dataclass
+class ContextItem:
+    """
+    A file offered to a prompt, at up to three levels of detail: the whole content,
+    the relevant symbols only, and an outline. The last two are optional.
+    """
+
+    label: str
+    content: str
+    score: float = 0.0
+    symbols: str = ""
+    outline: str = ""
+
+    def levels(self):
+        yield "full", self.content
+        if self.symbols:
+            yield "symbols", self.symbols
+        if self.outline:
+            yield "outline", self.outline
+
+
+def fit_to_budget(
+    items: List[ContextItem],
+    render: Callable[[str, str], str],
+    budget: int,
+    model: Optional[str] = None,
+) -> str:
+    """
+    Renders `items` in their order with `render(label, text)` within `budget`
+    tokens. While over budget, the lowest scored item is cut down to its next
+    level, and dropped once it has none left. A budget of 0 means no limit.
+    """
+    options = []
+    for item in items:
+        options.append(
+            [
+                (level, render(item.label + LEVEL_NOTES[level], text))
+                for level, text in item.levels()
+            ]
+        )
+    tokens = [[count_tokens(block, model) for _, block in o] for o in options]
+    chosen = [0] * len(items)
+    total = sum(t[0] for t in tokens)
+
+    # lowest score first; among equal scores, the later items go first
+    for i in sorted(range(len(items)), key=lambda i: (items[i].score, -i)):
+        if not budget or total <= budget:
+            break
+        while total > budget and chosen[i] is not None:
+            total -= tokens[i][chosen[i]]
+            if chosen[i] + 1 < len(options[i]):
+                chosen[i] += 1
+                total += tokens[i][chosen[i]]
+            else:
+                chosen[i] = None
+
+    blocks, reduced, dropped = [], [], []
+    for item, option, level in zip(items, options, chosen):
+        if level is None:
+            dropped.append(item.label)
+            continue
+        name, block = option[level]
+        if name != "full":
+            reduced.append(f"{item.label} ({name})")
+        blocks.append(block)
+    if reduced or dropped:
+        print(
+            f"fit_to_budget: {total} tokens of {budget}; "
+            f"reduced {reduced}; dropped {dropped}"
+        )
+    return "\n".join(blocks)
+
+
+def _words(text: str) -> set:
+    # snake_case and CamelCase names are split into lowercase words, plurals folded
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    words = [w for w in re.split(r"[^A-Za-z0-9]+", text.lower()) if len(w) > 2]
+    return {w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words}
+
+
+def relevant_symbols(symbols: List[Symbol], query: str) -> List[Symbol]:
+    """
+    The symbols whose names share a word with `query`, leaving out the ones nested
+    in another relevant symbol.
+    """
+    words = _words(query)
+    hits = [s for s in symbols if _words(s.name.split(".")[-1]) & words]
+    result = []
+    for symbol in sorted(hits, key=lambda s: (s.start, -s.end)):
+        if result and symbol.end <= result[-1].end:
+            continue
+        result.append(symbol)
+    return result
+
+
+def markdown_outline(content: str) -> str:
+    """The headings of a markdown document."""
+    return "\n".join(
+        line for line in content.splitlines() if re.match(r"#{1,6}\s", line)
+    )
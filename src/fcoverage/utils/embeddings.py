@@ -0,0 +1,132 @@
+import hashlib
+import inspect
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Callable, Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+__all__ = [
+    "embed_queries",
+    "EmbeddingCache",
+    "CachedEmbeddings",
+]
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """
+    Embeds several search queries in one batched request.
+
+    `Embeddings` only batches documents, and some providers (e.g. Google) embed
+    documents and queries differently. Wrappers in this package expose their own
+    `embed_queries`; for raw provider embeddings the document endpoint is used,
+    asking for query embeddings when the provider supports a task type.
+    """
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    parameters = inspect.signature(embeddings.embed_documents).parameters
+    if "task_type" in parameters:
+        return embeddings.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+    return embeddings.embed_documents(texts)
+
+
+class EmbeddingCache:
+    """
+    Persistent store of embedding vectors in SQLite, keyed by namespace (provider,
+    model and whether the text was embedded as a document or a query) and the
+    SHA-1 of the text, which is also the id of an indexed chunk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                namespace TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (namespace, hash)
+            )
+            """)
+        self._conn.commit()
+
+    def get_many(self, namespace: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i : i + 500]
+                rows = self._conn.execute(
+                    "SELECT hash, vector FROM embeddings WHERE namespace = ? "
+                    f"AND hash IN ({','.join('?' * len(chunk))})",
+                    [namespace, *chunk],
+                ).fetchall()
+                for hash_, blob in rows:
+                    found[hash_] = array("d", blob).tolist()
+            self.hits += len(found)
+            self.misses += len(set(hashes)) - len(found)
+        return found
+
+    def put_many(self, namespace: str, vectors: Dict[str, List[float]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)",
+                [
+                    (namespace, hash_, array("d", vector).tobytes())
+                    for hash_, vector in vectors.items()
+                ],
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries[0]}
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """Serves embeddings from an `EmbeddingCache`, only embedding unseen texts."""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, namespace: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.namespace = namespace
+
+    def _embed(
+        self,
+        texts: List[str],
+        kind: str,
+        embed: Callable[[List[str]], List[List[float]]],
+    ) -> List[List[float]]:
+        namespace = f"{self.namespace}:{kind}"
+        hashes = [text_hash(text) for text in texts]
+        vectors = self.cache.get_many(namespace, hashes)
+        missing = {}
+        for hash_, text in zip(hashes, texts):
+            if hash_ not in vectors:
+                missing.setdefault(hash_, text)
+        if missing:
+            computed = dict(zip(missing, embed(list(missing.values()))))
+            self.cache.put_many(namespace, computed)
+            vectors.update(computed)
+        return [vectors[hash_] for hash_ in hashes]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "document", self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(
+            [text], "query", lambda t: [self.embeddings.embed_query(t[0])]
+        )[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "query", lambda t: embed_queries(self.embeddings, t))
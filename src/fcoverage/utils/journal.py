@@ -0,0 +1,74 @@
+import json
+import os
+import threading
+from typing import Any, Dict
+
+__all__ = [
+    "RunJournal",
+]
+
+
+class RunJournal:
+    """
+    Append-only JSONL record of the units of work a run has completed
+    (one `{"unit": ..., "value": ...}` object per line).
+
+    With `resume`, entries of the previous run are loaded so finished units can be
+    skipped; otherwise the journal starts empty. Each entry is flushed and fsync'ed
+    before `record` returns, so an interrupted run loses at most the unit in flight.
+    """
+
+    FILENAME = "journal-{task}.jsonl"
+
+    @classmethod
+    def filename(cls, task: str, shard: str = None) -> str:
+        """
+        One journal per task (and shard), so the tasks and shards sharing an output
+        folder do not truncate each other's journal.
+        """
+        return cls.FILENAME.format(task=f"{task}-{shard}" if shard else task)
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.entries: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        if resume and os.path.exists(path):
+            self._load()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a" if resume else "w")
+        if resume and self._file.tell() > 0 and not self._ends_with_newline():
+            self._file.write("\n")
+
+    def _load(self):
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by the interruption; the unit is redone.
+                    continue
+                self.entries[entry["unit"]] = entry["value"]
+        print(f"RunJournal: resuming with {len(self.entries)} completed units")
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def __contains__(self, unit: str) -> bool:
+        return unit in self.entries
+
+    def get(self, unit: str, default=None) -> Any:
+        return self.entries.get(unit, default)
+
+    def record(self, unit: str, value: Any):
+        line = json.dumps({"unit": unit, "value": value})
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.entries[unit] = value
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+__all__ = [
+    "LLMResponseCache",
+    "CACHE_HIT_METADATA_KEY",
+]
+
+# Set in the response metadata of messages served from the cache, so usage
+# accounting (e.g. rate limiting) can tell them apart from real API calls.
+CACHE_HIT_METADATA_KEY = "fcoverage_cache_hit"
+
+
+class LLMResponseCache(BaseCache):
+    """
+    Persistent, content-addressed cache of chat model responses stored in SQLite.
+
+    LangChain calls `lookup`/`update` with the serialized messages (rendered prompt
+    and the tool-call transcript so far) and the llm string (model parameters, bound
+    tools and structured-output schema). The key is a hash of both plus `namespace`,
+    which holds the provider and model name.
+
+    Entries older than `max_age_days` are dropped and, once the stored responses
+    exceed `max_size_mb`, the least recently used ones are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        namespace: str = "",
+        max_age_days: float = 30,
+        max_size_mb: float = 512,
+    ):
+        self.path = path
+        self.namespace = namespace
+        self.max_age_seconds = max_age_days * 24 * 3600 if max_age_days else 0
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb else 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """)
+        self._conn.commit()
+        self.evict()
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        digest = hashlib.sha256()
+        for part in (self.namespace, llm_string, prompt):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (
+                self.max_age_seconds and now - row[1] > self.max_age_seconds
+            ):
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        generations = loads(row[0])
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if message is not None:
+                message.response_metadata = {
+                    **(message.response_metadata or {}),
+                    CACHE_HIT_METADATA_KEY: True,
+                }
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE):
+        key = self._key(prompt, llm_string)
+        value = dumps(list(return_val))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now),
+            )
+            self._conn.commit()
+            self.writes += 1
+        if self.max_size_bytes and self.writes % 50 == 0:
+            self.evict()
+
+    def clear(self, **kwargs: Any):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def evict(self):
+        """Drops expired entries, then least recently used ones above the size cap."""
+        with self._lock:
+            if self.max_age_seconds:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE created < ?",
+                    (time.time() - self.max_age_seconds,),
+                )
+            if self.max_size_bytes:
+                total = self._conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM llm_cache"
+                ).fetchone()[0]
+                if total > self.max_size_bytes:
+                    rows = self._conn.execute(
+                        "SELECT key, size FROM llm_cache ORDER BY last_used"
+                    ).fetchall()
+                    stale = []
+                    for key, size in rows:
+                        if total <= self.max_size_bytes:
+                            break
+                        stale.append((key,))
+                        total -= size
+                    self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", stale)
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "writes": self.writes,
+            "entries": entries,
+            "size_bytes": size,
+        }
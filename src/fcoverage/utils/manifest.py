@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Set, Tuple
+
+__all__ = [
+    "IndexManifest",
+    "file_sha1",
+]
+
+
+def file_sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IndexManifest:
+    """
+    File-level record of what is indexed in the vector database:
+    path -> mtime, size, content hash and the ids of the file's chunks.
+
+    It is stored next to the vector database and tied to a `signature` (collection
+    and embedding model); a manifest written for another signature is ignored.
+    """
+
+    FILENAME = "index-manifest.json"
+
+    def __init__(self, path: str, signature: Dict[str, str]):
+        self.path = path
+        self.signature = signature
+        self.files: Dict[str, Dict] = {}
+        # Ids replaced or found in the database but not deleted yet, e.g. because
+        # indexing was interrupted; the next run deletes those no file still has.
+        self.stale: Set[str] = set()
+        self.exists = False
+
+    @classmethod
+    def load(cls, directory: str, signature: Dict[str, str]) -> "IndexManifest":
+        manifest = cls(os.path.join(directory, cls.FILENAME), signature)
+        if os.path.exists(manifest.path):
+            try:
+                with open(manifest.path, "r") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable index manifest {manifest.path}: {e}")
+                return manifest
+            if data.get("signature") == signature:
+                manifest.files = data.get("files", {})
+                manifest.stale = set(data.get("stale", []))
+                manifest.exists = True
+        return manifest
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "signature": self.signature,
+                    "files": self.files,
+                    "stale": sorted(self.stale),
+                },
+                f,
+            )
+        os.replace(tmp_path, self.path)
+        self.exists = True
+
+    def diff(self, paths: Iterable[str]) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Splits `paths` into (unchanged, changed, removed) against the manifest.
+        New files count as changed. The content hash is only computed when mtime or
+        size differ, and a file whose content did not change is kept as unchanged.
+        """
+        unchanged, changed = [], []
+        seen = set()
+        for path in paths:
+            seen.add(path)
+            entry = self.files.get(path)
+            stat = os.stat(path)
+            if entry is None:
+                changed.append(path)
+            elif entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                unchanged.append(path)
+            elif entry["sha1"] == file_sha1(path):
+                entry["mtime"] = stat.st_mtime_ns
+                entry["size"] = stat.st_size
+                unchanged.append(path)
+            else:
+                changed.append(path)
+        removed = [path for path in self.files if path not in seen]
+        return unchanged, changed, removed
+
+    def update(self, path: str, ids: Iterable[str]):
+        stat = os.stat(path)
+        ids = set(ids)
+        self.stale.update(set(self.files.get(path, {}).get("ids", [])) - ids)
+        self.files[path] = {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha1": file_sha1(path),
+            "ids": sorted(ids),
+        }
+
+    def remove(self, path: str):
+        self.stale.update(self.files.pop(path, {}).get("ids", []))
+
+    def ids(self, paths: Iterable[str] = None) -> Set[str]:
+        if paths is None:
+            paths = self.files.keys()
+        result = set()
+        for path in paths:
+            result.update(self.files.get(path, {}).get("ids", []))
+        return result
@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional
+
+__all__ = [
+    "ToolMemo",
+]
+
+
+class ToolMemo:
+    """
+    Run-scoped LRU memo of tool results shared by all agents, keyed by tool name
+    and normalized arguments, one entry per item of a bulk call.
+
+    `refresh()` checks `fingerprint` (e.g. the mtimes of the project files); when
+    it changed the memo is cleared and `on_change` is called so derived state
+    (search indexes) can be rebuilt too. It is called once per agent invocation,
+    not per tool call, and fingerprints at most once per `check_interval`
+    seconds, since fingerprinting a project lists and stats all of its files.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        fingerprint: Optional[Callable[[], Hashable]] = None,
+        on_change: Optional[Callable[[], None]] = None,
+        check_interval: float = 0.0,
+    ):
+        self.max_entries = max_entries
+        self.fingerprint = fingerprint
+        self.on_change = on_change
+        self.check_interval = check_interval
+        self._last_check = None
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_fingerprint = None
+        self.hits = 0
+        self.misses = 0
+
+    def refresh(self):
+        if self.fingerprint is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if (
+                self._last_check is not None
+                and now - self._last_check < self.check_interval
+            ):
+                return
+            self._last_check = now
+        fingerprint = self.fingerprint()
+        with self._lock:
+            changed = (
+                self._last_fingerprint is not None
+                and fingerprint != self._last_fingerprint
+            )
+            self._last_fingerprint = fingerprint
+            if changed:
+                self._entries.clear()
+        if changed:
+            print("ToolMemo: project files changed, memo cleared")
+            if self.on_change is not None:
+                self.on_change()
+
+    def get_many(
+        self,
+        tool: str,
+        args: List[Any],
+        compute: Callable[[List[Any]], List[Any]],
+    ) -> List[Any]:
+        """
+        The results of `tool` for each item of `args`; the items not memoized are
+        computed with one `compute(missing_args)` call.
+        """
+        if not self.max_entries:
+            return compute(args)
+        keys = [json.dumps([tool, arg], sort_keys=True, default=str) for arg in args]
+        results = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    results[key] = self._entries[key]
+            self.hits += len(results)
+        missing = [(key, arg) for key, arg in zip(keys, args) if key not in results]
+        # The same item twice in one call is computed once.
+        missing = list({key: arg for key, arg in missing}.items())
+        if missing:
+            values = compute([arg for _, arg in missing])
+            with self._lock:
+                self.misses += len(missing)
+                for (key, _), value in zip(missing, values):
+                    results[key] = value
+                    self._entries[key] = value
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return [results[key] for key in keys]
+
+    def get(self, tool: str, arg: Any, compute: Callable[[], Any]) -> Any:
+        return self.get_many(tool, [arg], lambda _: [compute()])[0]
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "entries": len(self._entries),
+            }
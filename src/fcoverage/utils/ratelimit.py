@@ -0,0 +1,393 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langchain_core.outputs import LLMResult
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from fcoverage.utils.embeddings import embed_queries
+from fcoverage.utils.llm_cache import CACHE_HIT_METADATA_KEY
+from fcoverage.utils.telemetry import tracer
+
+__all__ = [
+    "TokenBucket",
+    "RateLimiter",
+    "RateLimitCallbackHandler",
+    "RateLimitedEmbeddings",
+    "get_rate_limiter",
+    "call_with_retry",
+    "retry_after_seconds",
+    "is_rate_limit_error",
+    "is_quota_exhausted",
+    "is_retryable_error",
+    "estimate_tokens",
+]
+
+R = TypeVar("R")
+
+
+class TokenBucket:
+    """
+    A bucket refilled continuously at `per_minute` units per minute, holding at most
+    `per_minute` units. The level may drop below zero when usage is only known after
+    the fact (e.g. tokens reported by the provider); callers then wait for the debt
+    to be paid back. A rate of 0 means unlimited.
+    """
+
+    def __init__(self, per_minute: float = 0):
+        self.capacity = float(per_minute or 0)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units can be taken (capped at the bucket size)."""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float, now: float):
+        if self.unlimited:
+            return
+        self._refill(now)
+        self.level -= amount
+
+
+class RateLimiter(BaseRateLimiter):
+    """
+    Requests-per-minute and tokens-per-minute limits for one provider/model.
+    Thread-safe; shared by every chat model, agent and embeddings wrapper that
+    talks to the same provider/model.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def configure(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        with self._lock:
+            self.requests = TokenBucket(requests_per_minute)
+            self.tokens = TokenBucket(tokens_per_minute)
+
+    def _try_acquire(self, tokens: float) -> float:
+        """Takes a request slot and returns 0, or returns how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            delay = max(
+                self.paused_until - now,
+                self.requests.wait_time(1, now),
+                self.tokens.wait_time(max(tokens, 1e-9), now),
+            )
+            if delay > 0:
+                return delay
+            self.requests.consume(1, now)
+            self.tokens.consume(tokens, now)
+            return 0.0
+
+    def acquire(self, *, blocking: bool = True, tokens: float = 0) -> bool:
+        while True:
+            delay = self._try_acquire(tokens)
+            if delay <= 0:
+                return True
+            if not blocking:
+                return False
+            time.sleep(delay)
+
+    async def aacquire(self, *, blocking: bool = True, tokens: float = 0) -> bool:
+        while True:
+            delay = self._try_acquire(tokens)
+            if delay <= 0:
+                return True
+            if not blocking:
+                return False
+            await asyncio.sleep(delay)
+
+    def record_tokens(self, tokens: float):
+        """Charges tokens reported by the provider after a request finished."""
+        with self._lock:
+            self.tokens.consume(tokens, time.monotonic())
+
+    def back_off(self, seconds: float):
+        """Pauses every caller of this limiter, e.g. after a 429 with Retry-After."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    provider: str,
+    model: str,
+    requests_per_minute: float = 0,
+    tokens_per_minute: float = 0,
+) -> RateLimiter:
+    """
+    Returns the process-wide limiter of a provider/model, creating it on first use.
+    Non-zero limits given later replace the configured ones.
+    """
+    key = (provider or "", model or "")
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+            _limiters[key] = limiter
+        elif requests_per_minute or tokens_per_minute:
+            limiter.configure(requests_per_minute, tokens_per_minute)
+        return limiter
+
+
+class RateLimitCallbackHandler(BaseCallbackHandler):
+    """
+    Charges the token usage reported by the chat model to its limiter.
+    Responses served from the LLM cache cost nothing.
+    """
+
+    def __init__(self, limiter: RateLimiter):
+        self.limiter = limiter
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                metadata = getattr(message, "response_metadata", None) or {}
+                if metadata.get(CACHE_HIT_METADATA_KEY):
+                    return
+                usage = getattr(message, "usage_metadata", None) or {}
+                tokens += usage.get("total_tokens", 0)
+        if not tokens and response.llm_output:
+            usage = response.llm_output.get("token_usage") or {}
+            tokens = usage.get("total_tokens", 0)
+        if tokens:
+            self.limiter.record_tokens(tokens)
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text and code.
+    return len(text) // 4 + 1
+
+
+class RateLimitedEmbeddings(Embeddings):
+    """Routes every embedding request through a `RateLimiter`, retrying on 429s."""
+
+    def __init__(self, embeddings: Embeddings, limiter: RateLimiter, max_retries=5):
+        self.embeddings = embeddings
+        self.limiter = limiter
+        self.max_retries = max_retries
+
+    def _call(self, fn: Callable[[], R], tokens: int) -> R:
+        def attempt():
+            self.limiter.acquire(tokens=tokens)
+            return fn()
+
+        return call_with_retry(attempt, self.limiter, self.max_retries)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        tokens = sum(estimate_tokens(text) for text in texts)
+        return self._call(lambda: self.embeddings.embed_documents(texts), tokens)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._call(
+            lambda: self.embeddings.embed_query(text), estimate_tokens(text)
+        )
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        tokens = sum(estimate_tokens(text) for text in texts)
+        return self._call(lambda: embed_queries(self.embeddings, texts), tokens)
+
+
+_RETRY_DELAY_PATTERNS = [
+    re.compile(r"retry[_ ]delay\s*\{\s*seconds:\s*(\d+(?:\.\d+)?)", re.IGNORECASE),
+    re.compile(r"retry (?:in|after) (\d+(?:\.\d+)?)\s*s", re.IGNORECASE),
+    re.compile(r"try again in (\d+(?:\.\d+)?)\s*s", re.IGNORECASE),
+]
+
+
+def _response_headers(error: BaseException) -> Dict[str, str]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None)
+    try:
+        return {k.lower(): v for k, v in dict(headers or {}).items()}
+    except (TypeError, ValueError):
+        return {}
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Extracts the server-requested delay from a provider error, if there is one."""
+    headers = _response_headers(error)
+    for name in ("retry-after-ms", "retry-after"):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        return seconds / 1000 if name == "retry-after-ms" else seconds
+
+    retry_after = getattr(error, "retry_after", None)
+    if isinstance(retry_after, (int, float)):
+        return float(retry_after)
+
+    message = str(error)
+    for pattern in _RETRY_DELAY_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+# Exception classes of the providers' SDKs for rate limits, e.g. openai's and
+# anthropic's RateLimitError, google.api_core's ResourceExhausted (gRPC) and
+# TooManyRequests (HTTP).
+_RATE_LIMIT_ERROR_NAMES = ("ratelimiterror", "resourceexhausted", "toomanyrequests")
+# Error codes of quota or billing exhaustion, which waiting does not fix.
+_QUOTA_EXHAUSTED_CODES = ("insufficient_quota", "billing_hard_limit_reached")
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    for candidate in (error, getattr(error, "response", None)):
+        for attr in ("status_code", "code", "status"):
+            value = getattr(candidate, attr, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def _causes(error: BaseException) -> List[BaseException]:
+    # The error and the ones it was raised from, e.g. a provider's exception
+    # wrapped by its langchain integration.
+    chain = []
+    while error is not None and len(chain) < 5:
+        chain.append(error)
+        error = error.__cause__
+    return chain
+
+
+def _error_names(error: BaseException) -> List[str]:
+    return [cls.__name__.lower() for cls in type(error).__mro__]
+
+
+def _error_code(error: BaseException) -> Optional[str]:
+    code = getattr(error, "code", None)
+    if isinstance(code, str):
+        return code.lower()
+    body = getattr(error, "body", None)
+    if isinstance(body, dict):
+        if isinstance(body.get("error"), dict):
+            body = body["error"]
+        code = body.get("code")
+        if isinstance(code, str):
+            return code.lower()
+    return None
+
+
+def is_quota_exhausted(error: BaseException) -> bool:
+    """A 429 for an exhausted quota or billing limit rather than a rate limit."""
+    return any(_error_code(e) in _QUOTA_EXHAUSTED_CODES for e in _causes(error))
+
+
+def _is_rate_limit(error: BaseException) -> bool:
+    if _status_code(error) == 429:
+        return True
+    names = _error_names(error)
+    return any(marker in name for name in names for marker in _RATE_LIMIT_ERROR_NAMES)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """
+    A 429, or one of the providers' rate-limit exception classes. The message is
+    not looked at: "429" or "quota" in the text of an unrelated error is no sign.
+    """
+    if is_quota_exhausted(error):
+        return False
+    return any(_is_rate_limit(e) for e in _causes(error))
+
+
+# Statuses worth retrying: timeouts, rate limits and server-side failures.
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+_TRANSIENT_ERROR_NAMES = (
+    "timeout",
+    "connection",
+    "unavailable",
+    "internalservererror",
+    "deadlineexceeded",
+    "overloaded",
+)
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """
+    Rate limits and transient failures (timeouts, dropped connections, 5xx).
+    Other errors, e.g. invalid requests or unparsable answers, fail the same way
+    when repeated, so they are raised right away.
+    """
+    if is_quota_exhausted(error):
+        return False
+    return any(_is_transient(e) for e in _causes(error))
+
+
+def _is_transient(error: BaseException) -> bool:
+    if _is_rate_limit(error):
+        return True
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    names = _error_names(error)
+    return any(marker in name for name in names for marker in _TRANSIENT_ERROR_NAMES)
+
+
+def call_with_retry(
+    fn: Callable[[], R],
+    limiter: Optional[RateLimiter] = None,
+    max_retries: int = 5,
+    initial_retry_delay: float = 2,
+) -> R:
+    """
+    Calls `fn`, retrying rate limits and transient failures with exponential
+    backoff and jitter; other errors are raised at once. A Retry-After given by
+    the provider takes precedence over the backoff, and on rate-limit errors the
+    whole limiter is paused so concurrent callers wait too. `fn` is called at least
+    once, whatever `max_retries`.
+    """
+    retry_delay = initial_retry_delay
+    max_retries = max(1, max_retries)
+    for attempt in range(max_retries):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= max_retries - 1 or not is_retryable_error(e):
+                raise
+            wait = retry_after_seconds(e)
+            if wait is None:
+                wait = retry_delay * (1 + random.random() / 2)
+                retry_delay *= 2
+            if limiter is not None and is_rate_limit_error(e):
+                limiter.back_off(wait)
+            print(f"[Retry {attempt+1}/{max_retries}] Call failed: {e}")
+            print(f"Sleep {wait:.1f} seconds.")
+            with tracer.span(
+                "wait", "retry", attempt=attempt + 1, reason=type(e).__name__
+            ):
+                time.sleep(wait)
@@ -0,0 +1,73 @@
+import glob
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+__all__ = [
+    "Shard",
+    "parse_shard",
+    "shard_of",
+    "write_shard_result",
+    "load_shard_results",
+]
+
+SHARDS_FOLDER = "shards"
+
+
+@dataclass(frozen=True)
+class Shard:
+    index: int  # 1..count; 0 is the planning shard of the extract task
+    count: int
+
+    @property
+    def name(self) -> str:
+        return f"{self.index}-of-{self.count}"
+
+    def owns(self, key: str) -> bool:
+        return shard_of(key, self.count) == self.index
+
+
+def parse_shard(value: Optional[str]) -> Optional[Shard]:
+    """Parses --shard INDEX/COUNT; an empty value means the run is not sharded."""
+    if not value:
+        return None
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"--shard must be INDEX/COUNT, e.g. 3/20, not {value!r}")
+    if count < 1 or not 0 <= index <= count:
+        raise ValueError(f"--shard index must be within 0..{count}, not {index}")
+    return Shard(index, count)
+
+
+def shard_of(key: str, count: int) -> int:
+    """The shard (1..count) of `key`, the same on every machine and Python run."""
+    digest = hashlib.sha1(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def write_shard_result(out: str, task: str, shard: Shard, result: Dict[str, Any]):
+    """Writes the partial result of a shard to out/shards/<task>-<i>-of-<n>.json."""
+    folder = os.path.join(out, SHARDS_FOLDER)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{task}-{shard.name}.json")
+    with open(path, "w") as f:
+        json.dump(
+            {"task": task, "index": shard.index, "count": shard.count, **result},
+            f,
+            indent=2,
+        )
+    print(f"write_shard_result: {path}")
+
+
+def load_shard_results(out: str) -> Dict[str, List[Dict[str, Any]]]:
+    """The partial results found in out/shards (searched recursively), by task."""
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    pattern = os.path.join(out, SHARDS_FOLDER, "**", "*-of-*.json")
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        with open(path, "r") as f:
+            result = json.load(f)
+        results.setdefault(result["task"], []).append(result)
+    return results
@@ -0,0 +1,249 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from fcoverage.utils.llm_cache import CACHE_HIT_METADATA_KEY
+
+__all__ = [
+    "Tracer",
+    "TelemetryCallbackHandler",
+    "tracer",
+    "use_tracer",
+]
+
+TOKEN_FIELDS = ["input_tokens", "output_tokens", "cached_tokens"]
+
+
+class Tracer:
+    """
+    Records timed spans (name, category, thread, attributes such as tokens or cost)
+    from any thread. With `start(out)` each finished span is also appended to
+    out/trace.jsonl; `export()` writes out/trace.chrome.json, which chrome://tracing
+    and Perfetto open as a flame chart.
+    """
+
+    JSONL_FILENAME = "trace.jsonl"
+    CHROME_FILENAME = "trace.chrome.json"
+
+    def __init__(self):
+        self.spans: List[Dict[str, Any]] = []
+        self.out = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def start(self, out: str):
+        with self._lock:
+            self.out = out
+            os.makedirs(out, exist_ok=True)
+            self._file = open(os.path.join(out, self.JSONL_FILENAME), "w")
+
+    def now(self) -> float:
+        return time.perf_counter() - self._origin
+
+    def record(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        end: float,
+        thread: Optional[int] = None,
+        **attributes,
+    ):
+        span = {
+            "name": name,
+            "category": category,
+            "start": round(start, 6),
+            "duration": round(end - start, 6),
+            "thread": thread or threading.get_ident(),
+            **attributes,
+        }
+        with self._lock:
+            self.spans.append(span)
+            if self._file is not None:
+                self._file.write(json.dumps(span, default=str) + "\n")
+                self._file.flush()
+
+    @contextmanager
+    def span(self, name: str, category: str, **attributes):
+        """Times the block; attributes can be added to the yielded dict inside it."""
+        start = self.now()
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes["error"] = type(e).__name__
+            raise
+        finally:
+            self.record(name, category, start, self.now(), **attributes)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        rows = defaultdict(lambda: defaultdict(float))
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            row = rows[(span["category"], span["name"])]
+            row["count"] += 1
+            row["seconds"] += span["duration"]
+            row["errors"] += 1 if "error" in span else 0
+            for field in TOKEN_FIELDS + ["cost"]:
+                row[field] += span.get(field, 0)
+        return [
+            {"category": category, "name": name, **row}
+            for (category, name), row in sorted(
+                rows.items(), key=lambda item: -item[1]["seconds"]
+            )
+        ]
+
+    def format_summary(self) -> str:
+        header = f"{'category':<10} {'name':<32} {'count':>7} {'seconds':>10} {'errors':>6} {'in tok':>10} {'out tok':>9} {'cached':>9} {'cost $':>9}"
+        lines = [header, "-" * len(header)]
+        for row in self.summary():
+            lines.append(
+                f"{row['category']:<10} {row['name'][:32]:<32} {int(row['count']):>7} "
+                f"{row['seconds']:>10.2f} {int(row['errors']):>6} "
+                f"{int(row['input_tokens']):>10} {int(row['output_tokens']):>9} "
+                f"{int(row['cached_tokens']):>9} {row['cost']:>9.4f}"
+            )
+        return "\n".join(lines)
+
+    def export(self):
+        """Writes the chrome trace and closes the JSONL trace."""
+        with self._lock:
+            if self.out is None:
+                return
+            events = [
+                {
+                    "name": span["name"],
+                    "cat": span["category"],
+                    "ph": "X",
+                    "ts": span["start"] * 1e6,
+                    "dur": span["duration"] * 1e6,
+                    "pid": os.getpid(),
+                    "tid": span["thread"],
+                    "args": {
+                        k: v
+                        for k, v in span.items()
+                        if k not in ("name", "category", "start", "duration", "thread")
+                    },
+                }
+                for span in self.spans
+            ]
+            with open(os.path.join(self.out, self.CHROME_FILENAME), "w") as f:
+                json.dump({"traceEvents": events}, f, default=str)
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# The tracer of the current job (see `use_tracer`); None outside of jobs.
+current_tracer: contextvars.ContextVar[Optional[Tracer]] = contextvars.ContextVar(
+    "current_tracer", default=None
+)
+
+
+class _ActiveTracer:
+    """The tracer of the current job, or the process-wide one outside of jobs."""
+
+    def __init__(self, default: Tracer):
+        self.default = default
+
+    def __getattr__(self, name: str):
+        return getattr(current_tracer.get() or self.default, name)
+
+
+@contextmanager
+def use_tracer(job_tracer: Tracer):
+    """Makes `tracer` record to `job_tracer` in this context and the workers it starts."""
+    token = current_tracer.set(job_tracer)
+    try:
+        yield job_tracer
+    finally:
+        current_tracer.reset(token)
+
+
+# The tracer the tasks and helpers record to.
+tracer = _ActiveTracer(Tracer())
+
+
+class TelemetryCallbackHandler(BaseCallbackHandler):
+    """
+    Records a span per llm call (with input, output and cached tokens, and the cost
+    at the given USD prices per million tokens) and per tool call of a run.
+    Responses served from the LLM cache count as cached tokens and cost nothing.
+    """
+
+    def __init__(
+        self,
+        tracer: Tracer,
+        input_price: float = 0.0,
+        output_price: float = 0.0,
+    ):
+        self.tracer = tracer
+        self.input_price = input_price
+        self.output_price = output_price
+        self._runs: Dict[UUID, tuple] = {}
+
+    def _start(self, run_id: UUID, name: str):
+        self._runs[run_id] = (name, self.tracer.now(), threading.get_ident())
+
+    def _end(self, run_id: UUID, category: str, **attributes):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        name, start, thread = run
+        self.tracer.record(
+            name, category, start, self.tracer.now(), thread, **attributes
+        )
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._start(run_id, (serialized or {}).get("name") or "llm")
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        self._start(run_id, (serialized or {}).get("name") or "llm")
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs) -> None:
+        input_tokens = output_tokens = cached_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                metadata = getattr(message, "response_metadata", None) or {}
+                usage = getattr(message, "usage_metadata", None) or {}
+                if metadata.get(CACHE_HIT_METADATA_KEY):
+                    cached_tokens += usage.get("total_tokens", 0)
+                    continue
+                details = usage.get("input_token_details") or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+                cached_tokens += details.get("cache_read", 0)
+        cost = (
+            input_tokens * self.input_price + output_tokens * self.output_price
+        ) / 1e6
+        self._end(
+            run_id,
+            "llm",
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cached_tokens=cached_tokens,
+            cost=cost,
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id, **kwargs) -> None:
+        self._end(run_id, "llm", error=type(error).__name__)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs) -> None:
+        self._start(run_id, (serialized or {}).get("name") or "tool")
+
+    def on_tool_end(self, output, *, run_id, **kwargs) -> None:
+        self._end(run_id, "tool")
+
+    def on_tool_error(self, error: BaseException, *, run_id, **kwargs) -> None:
+        self._end(run_id, "tool", error=type(error).__name__)
@@ -1,13 +1,37 @@
 import os
+import multiprocessing
 import time
-from typing import List
-from langchain_chroma import Chroma
-from langchain.schema import Document
-from langchain_community.document_loaders.generic import GenericLoader
-from langchain_community.document_loaders.parsers import LanguageParser
+from collections import defaultdict, deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Callable, Dict, Iterable, Iterator, List, Set, Tuple
+from langchain_core.documents import Document
 from tqdm import tqdm
 import hashlib
 
+from fcoverage.utils.embeddings import CachedEmbeddings, EmbeddingCache, embed_queries
+from fcoverage.utils.manifest import IndexManifest
+from fcoverage.utils.telemetry import tracer
+from fcoverage.utils.ratelimit import (
+    RateLimitedEmbeddings,
+    estimate_tokens,
+    get_rate_limiter,
+)
+
+# Providers of init_embeddings whose clients retry failed requests themselves
+# unless given max_retries=0.
+CLIENT_RETRY_PROVIDERS = {
+    "openai",
+    "azure_openai",
+    "cohere",
+    "mistralai",
+    "google_vertexai",
+}
+
 
 class VectorDBHelper:
     def __init__(
@@ -16,6 +40,10 @@ class VectorDBHelper:
         collection_name: str,
         embedding_model: str,
         embedding_provider: str,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_retries: int = 5,
+        embedding_cache_path: str = None,
     ):
         self.persist_directory = persist_directory
         self.collection_name = collection_name
@@ -23,8 +51,27 @@ class VectorDBHelper:
         self.embedding_provider = embedding_provider
 
         self.init_embeddings()
+        self.rate_limiter = get_rate_limiter(
+            embedding_provider,
+            embedding_model,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+        )
+        self.embeddings = RateLimitedEmbeddings(
+            self.embeddings, self.rate_limiter, max_retries=max_retries
+        )
+        self.embedding_cache = None
+        if embedding_cache_path:
+            self.embedding_cache = EmbeddingCache(embedding_cache_path)
+            self.embeddings = CachedEmbeddings(
+                self.embeddings,
+                self.embedding_cache,
+                namespace=f"{embedding_provider}:{embedding_model}",
+            )
         os.makedirs(self.persist_directory, exist_ok=True)
 
+        from langchain_chroma import Chroma
+
         self.vectorstore = Chroma(
             collection_name=self.collection_name,
             embedding_function=self.embeddings,
@@ -34,14 +81,21 @@ class VectorDBHelper:
     def init_google_genai(self):
         from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
+        # Its client only retries 503s on its own, and offers no option to stop it.
         self.embeddings = GoogleGenerativeAIEmbeddings(model=self.embedding_model)
 
     def init_embeddings_generic(self):
         from langchain.embeddings.base import init_embeddings
 
+        kwargs = {}
+        if self.embedding_provider in CLIENT_RETRY_PROVIDERS:
+            # RateLimitedEmbeddings is the only retry layer; the client's own
+            # retries would multiply its attempts and hide 429s from the limiter.
+            kwargs["max_retries"] = 0
         self.embeddings = init_embeddings(
             model=self.embedding_model,
             provider=self.embedding_provider,
+            **kwargs,
         )
 
     def init_embeddings(self):
@@ -55,37 +109,246 @@ class VectorDBHelper:
         self.vectorstore.add_documents(documents)
 
     def search(self, query: str, k: int = 5) -> List[Document]:
-        return self.vectorstore.similarity_search(query, k=k)
+        with tracer.span("search", "vdb", queries=1):
+            return self.vectorstore.similarity_search(query, k=k)
+
+    def search_many(
+        self, queries: List[str], k: int = 5
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Embeds all queries in one batched request and looks them up in one Chroma
+        query. Returns, for each query, the k closest chunks with their distance
+        (lower is closer).
+        """
+        if not queries:
+            return []
+        with tracer.span("search", "vdb", queries=len(queries)):
+            query_embeddings = embed_queries(self.embeddings, queries)
+            results = self.vectorstore._collection.query(
+                query_embeddings=query_embeddings,
+                n_results=k,
+                include=["documents", "metadatas", "distances"],
+            )
+        output = []
+        for ids, texts, metadatas, distances in zip(
+            results["ids"],
+            results["documents"],
+            results["metadatas"],
+            results["distances"],
+        ):
+            output.append(
+                [
+                    (Document(id=id_, page_content=text, metadata=metadata or {}), d)
+                    for id_, text, metadata, d in zip(ids, texts, metadatas, distances)
+                ]
+            )
+        return output
+
+    def source_embeddings(self, sources: List[str]) -> Dict[str, List[float]]:
+        """
+        The mean embedding of each source file's indexed chunks, read back from Chroma
+        instead of embedding the file again. Sources without chunks are left out.
+        """
+        vectors: Dict[str, List[List[float]]] = defaultdict(list)
+        for i in range(0, len(sources), 500):
+            results = self.vectorstore._collection.get(
+                where={"source": {"$in": sources[i : i + 500]}},
+                include=["embeddings", "metadatas"],
+            )
+            for metadata, vector in zip(results["metadatas"], results["embeddings"]):
+                vectors[(metadata or {}).get("source")].append(list(vector))
+        return {
+            source: [sum(column) / len(rows) for column in zip(*rows)]
+            for source, rows in vectors.items()
+            if source is not None
+        }
 
     def get_retriever(self):
         return self.vectorstore.as_retriever()
 
-    def sync_documents(
-        self, documents: List[Document], batch_size=250, sleep_seconds=1
+    def signature(self) -> Dict[str, str]:
+        return {
+            "collection": self.collection_name,
+            "embedding_provider": self.embedding_provider,
+            "embedding_model": self.embedding_model,
+        }
+
+    def iter_ids(self, page_size=10000) -> Iterator[str]:
+        """Pages through the ids in the collection without loading documents."""
+        offset = 0
+        while True:
+            ids = self.vectorstore._collection.get(
+                include=[], limit=page_size, offset=offset
+            )["ids"]
+            yield from ids
+            if len(ids) < page_size:
+                return
+            offset += len(ids)
+
+    def existing_ids(self) -> Set[str]:
+        return set(self.iter_ids())
+
+    def embed_batch(self, batch: List[Document]) -> List[List[float]]:
+        texts = [doc.page_content for doc in batch]
+        with tracer.span(
+            "embed",
+            "vdb",
+            texts=len(texts),
+            input_tokens=sum(estimate_tokens(text) for text in texts),
+        ):
+            return self.embeddings.embed_documents(texts)
+
+    def upsert_embedded(self, batch: List[Document], vectors: List[List[float]]):
+        with tracer.span("add", "vdb", documents=len(batch)):
+            self.vectorstore._collection.upsert(
+                ids=[doc.id for doc in batch],
+                embeddings=vectors,
+                documents=[doc.page_content for doc in batch],
+                metadatas=[doc.metadata or None for doc in batch],
+            )
+
+    def delete_ids(self, ids: Iterable[str]):
+        ids = list(ids)
+        if ids:
+            with tracer.span("delete", "vdb", documents=len(ids)):
+                self.vectorstore.delete(ids=ids)
+
+    def apply_changes(
+        self,
+        docs_to_add: Iterable[Document],
+        ids_to_delete: Iterable[str],
+        batch_size=250,
+        max_batch_tokens=50000,
+        concurrency=4,
+        on_written: Callable[[List[Document]], None] = None,
     ):
-        current_doc_ids = {d.id for d in documents}
+        """
+        Deletes `ids_to_delete`, then embeds and upserts `docs_to_add` as a pipeline:
+        batches (capped by document count and estimated tokens) are embedded by up to
+        `concurrency` workers while this thread writes finished batches to Chroma,
+        calling `on_written(batch)` after each.
+        """
+        self.delete_ids(ids_to_delete)
 
-        # 1. Get all existing IDs from the DB
-        existing_ids = set(self.vectorstore.get()["ids"])
+        total = len(docs_to_add) if hasattr(docs_to_add, "__len__") else None
+        progress = tqdm(total=total, unit="chunk", desc="embed")
+        in_flight = set()
 
-        # 2. Identify what to delete and what to add
-        docs_to_add = [doc for doc in documents if doc.id not in existing_ids]
-        ids_to_delete = [id_ for id_ in existing_ids if id_ not in current_doc_ids]
+        def write_completed(return_when):
+            done, _ = wait(in_flight, return_when=return_when)
+            for future in done:
+                in_flight.remove(future)
+                batch, vectors = future.result()
+                self.upsert_embedded(batch, vectors)
+                progress.update(len(batch))
+                if on_written is not None:
+                    on_written(batch)
 
-        print(
-            f"sync_documents: documents={len(documents)} ids_to_add={len(docs_to_add)}, ids_to_delete={len(ids_to_delete)}"
-        )
+        try:
+            with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+                for batch in token_batches(docs_to_add, batch_size, max_batch_tokens):
+                    in_flight.add(
+                        executor.submit(lambda b: (b, self.embed_batch(b)), batch)
+                    )
+                    if len(in_flight) >= max(concurrency, 1) * 2:
+                        write_completed(FIRST_COMPLETED)
+                while in_flight:
+                    write_completed(FIRST_COMPLETED)
+        finally:
+            progress.close()
+
+
+def token_batches(
+    docs: Iterable[Document], batch_size=250, max_batch_tokens=50000
+) -> Iterator[List[Document]]:
+    """Greedily groups documents into batches within both a count and a token cap."""
+    batch, batch_tokens = [], 0
+    for doc in docs:
+        tokens = estimate_tokens(doc.page_content)
+        if batch and (
+            len(batch) >= batch_size or batch_tokens + tokens > max_batch_tokens
+        ):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(doc)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def best_by_source(
+    results: Iterable[List[Tuple[Document, float]]],
+) -> Dict[str, float]:
+    """
+    Merges `search_many` results into source file -> best (lowest) distance,
+    ordered from the closest source to the farthest.
+    """
+    best: Dict[str, float] = {}
+    for hits in results:
+        for doc, distance in hits:
+            source = doc.metadata.get("source")
+            if source is not None and distance < best.get(source, float("inf")):
+                best[source] = distance
+    return dict(sorted(best.items(), key=lambda item: item[1]))
+
+
+def find_files(project_folders, glob, suffixes) -> List[str]:
+    from langchain_community.document_loaders.blob_loaders import FileSystemBlobLoader
+
+    files = set()
+    for folder in project_folders:
+        if not os.path.isdir(folder):
+            continue
+        blob_loader = FileSystemBlobLoader(folder, glob=glob, suffixes=suffixes)
+        for blob in blob_loader.yield_blobs():
+            files.add(os.path.abspath(str(blob.source)))
+    return sorted(files)
+
+
+def load_file_documents(path: str) -> List[Document]:
+    from langchain_community.document_loaders.blob_loaders import Blob
+    from langchain_community.document_loaders.parsers import LanguageParser
+
+    docs = list(LanguageParser().lazy_parse(Blob.from_path(path)))
+    for doc in docs:
+        doc.id = hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+    return docs
+
+
+def load_files_documents(paths: List[str]) -> List[List[Document]]:
+    return [load_file_documents(path) for path in paths]
+
+
+# Below this many files per process, spawning workers costs more than it saves.
+MIN_FILES_PER_WORKER = 8
+MAX_FILES_PER_CHUNK = 32
 
-        # 3. Delete obsolete entries
-        if ids_to_delete:
-            self.vectorstore.delete(ids=ids_to_delete)
 
-        # 4. Add new entries
-        if docs_to_add:
-            for i in tqdm(range(0, len(docs_to_add), batch_size)):
-                batch = docs_to_add[i : i + batch_size]
-                self.add_documents(batch)
-                time.sleep(sleep_seconds)
+def parse_files(
+    paths: List[str], workers: int = 1
+) -> Iterator[Tuple[str, List[Document]]]:
+    """Parses files into chunks, fanning out over a process pool; yields in order."""
+    workers = min(workers, len(paths) // MIN_FILES_PER_WORKER)
+    if workers <= 1:
+        for path in paths:
+            yield path, load_file_documents(path)
+        return
+
+    # Unlike Executor.map, only a window of chunks is in flight, so parsed documents
+    # never pile up in memory while the consumer (embedding) is slower.
+    chunksize = max(1, min(MAX_FILES_PER_CHUNK, len(paths) // (workers * 8)))
+    chunks = [paths[i : i + chunksize] for i in range(0, len(paths), chunksize)]
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append((chunk, executor.submit(load_files_documents, chunk)))
+            if len(in_flight) >= workers * 2:
+                chunk, future = in_flight.popleft()
+                yield from zip(chunk, future.result())
+        while in_flight:
+            chunk, future = in_flight.popleft()
+            yield from zip(chunk, future.result())
 
 
 def index_all_project(
@@ -94,18 +357,102 @@ def index_all_project(
     glob,
     suffixes,
     batch_size=250,
-    sleep_seconds=1,
+    max_batch_tokens=50000,
+    concurrency=4,
+    workers=1,
+    checkpoint_interval=60.0,
 ):
-    docs = []
-    for folder in project_folders:
-        loader = GenericLoader.from_filesystem(
-            folder,
-            glob=glob,
-            suffixes=suffixes,
-            parser=LanguageParser(),
-        )
-        docs.extend(loader.load())
-    for doc in docs:
-        doc.id = hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+    """
+    Brings the vector database in line with the files under `project_folders`.
+    A manifest kept next to the database records each file's chunk ids, so only
+    added, changed or removed files are parsed, embedded or deleted. Without a
+    manifest, every file is parsed and compared against the ids in the database.
+    Files are parsed by `workers` processes.
+
+    While batches are written, the manifest is saved at most every
+    `checkpoint_interval` seconds, recording the files whose chunks are all written
+    by then, so an interrupted run is resumed from there by the next one.
+    """
+    manifest = IndexManifest.load(vdb.persist_directory, vdb.signature())
+    unchanged, changed, removed = manifest.diff(
+        find_files(project_folders, glob, suffixes)
+    )
+    if manifest.exists:
+        existing_ids = manifest.ids() | manifest.stale
+    else:
+        existing_ids = vdb.existing_ids()
+        # Until this run completes, ids of the database not in the manifest are
+        # remembered as stale so that an interrupted run does not orphan them.
+        manifest.stale = existing_ids - manifest.ids()
+
+    current_ids = manifest.ids(unchanged)
+    file_ids: Dict[str, List[str]] = {}
+    queued_ids: Set[str] = set()
+    # A file goes into the manifest once none of its chunks waits to be written.
+    written_ids: Set[str] = set()
+    pending: Dict[str, Set[str]] = {}
+    waiting_files: Dict[str, List[str]] = {}
+    completed: List[str] = []
+    last_checkpoint = time.monotonic()
+
+    def docs_to_add() -> Iterator[Document]:
+        # Chunks stream to the embedding pipeline as soon as their file is parsed.
+        for path, docs in parse_files(changed, workers):
+            file_ids[path] = [doc.id for doc in docs]
+            new_docs = []
+            for doc in docs:
+                current_ids.add(doc.id)
+                if doc.id not in existing_ids and doc.id not in queued_ids:
+                    queued_ids.add(doc.id)
+                    new_docs.append(doc)
+            pending[path] = {
+                doc_id
+                for doc_id in file_ids[path]
+                if doc_id in queued_ids and doc_id not in written_ids
+            }
+            for doc_id in pending[path]:
+                waiting_files.setdefault(doc_id, []).append(path)
+            if not pending[path]:
+                completed.append(path)
+            yield from new_docs
+
+    def checkpoint(batch: List[Document]):
+        nonlocal last_checkpoint
+        for doc in batch:
+            written_ids.add(doc.id)
+            for path in waiting_files.pop(doc.id, []):
+                pending[path].discard(doc.id)
+                if not pending[path]:
+                    completed.append(path)
+        # Saving rewrites the whole manifest, so it is done only once in a while.
+        if not completed or time.monotonic() - last_checkpoint < checkpoint_interval:
+            return
+        for path in completed:
+            manifest.update(path, file_ids[path])
+        completed.clear()
+        manifest.save()
+        last_checkpoint = time.monotonic()
+
+    vdb.apply_changes(
+        docs_to_add(),
+        [],
+        batch_size=batch_size,
+        max_batch_tokens=max_batch_tokens,
+        concurrency=concurrency,
+        on_written=checkpoint,
+    )
+    # Deleting after adding is safe: new ids are never in `existing_ids`.
+    ids_to_delete = existing_ids - current_ids
+    vdb.delete_ids(ids_to_delete)
+
+    print(
+        f"index_all_project: files={len(unchanged) + len(changed)} changed={len(changed)} removed={len(removed)} "
+        f"ids_added={len(queued_ids)}, ids_deleted={len(ids_to_delete)}"
+    )
 
-    vdb.sync_documents(docs, batch_size, sleep_seconds)
+    for path in removed:
+        manifest.remove(path)
+    for path in completed:
+        manifest.update(path, file_ids[path])
+    manifest.stale.clear()
+    manifest.save()
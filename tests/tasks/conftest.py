@@ -0,0 +1,33 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+
+
+class FakeToolCallingModel(FakeMessagesListChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+@pytest.fixture
+def make_task(tmp_path):
+    """
+    Builds a task of `cls` for a project in tmp_path, with `args` on top of the
+    required ones. Given `responses`, its llm replays them in order.
+    """
+
+    def make(cls, responses=None, **args):
+        task = cls(
+            {
+                "project_name": "project",
+                "project_description": "description",
+                "project": str(tmp_path),
+                "src_path": "src",
+                "test_path": "tests",
+                "out": str(tmp_path / "out"),
+                **args,
+            }
+        )
+        if responses is not None:
+            task.model = FakeToolCallingModel(responses=responses)
+        return task
+
+    return make
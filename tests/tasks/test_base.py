@@ -0,0 +1,162 @@
+import json
+
+import pytest
+
+from fcoverage.models import FeatureManifest
+from fcoverage.tasks.base import TasksBase
+
+
+def write_feature(folder, name):
+    path = folder / f"features-definition-{name.replace(' ', '_')}.json"
+    path.write_text(
+        json.dumps(
+            {
+                "name": name,
+                "description": "d",
+                "entry_point": "e",
+                "related_test_files": [],
+                "core_code_files": [],
+            }
+        )
+    )
+    return str(path)
+
+
+@pytest.fixture
+def features(tmp_path):
+    folder = tmp_path / "features"
+    folder.mkdir()
+    return [write_feature(folder, name) for name in ("Login", "Export data")]
+
+
+def test_feature_definition_accepts_file_folder_or_glob(tmp_path, features, make_task):
+    folder = str(tmp_path / "features")
+    single = make_task(TasksBase, feature_definition=features[0])
+    assert single.feature_definition_files() == [features[0]]
+    by_folder = make_task(TasksBase, feature_definition=folder)
+    assert by_folder.feature_definition_files() == sorted(features)
+    by_glob = make_task(TasksBase, feature_definition=f"{folder}/*Login.json")
+    assert [f.name for f in by_glob.load_feature_items()] == ["Login"]
+
+
+def test_feature_output_path_defaults_to_out_layout(tmp_path, features, make_task):
+    design = tmp_path / "design.md"
+    design.write_text("design")
+    task = make_task(TasksBase, feature_definition=features[0])
+    (item,) = task.load_feature_items()
+
+    assert task.feature_output_path(item, "feature_design", "design.md") == str(
+        tmp_path / "out" / "Login" / "design.md"
+    )
+    task.args["feature_design"] = str(design)
+    assert task.load_feature_implementation(item) == "design"
+    task.args["feature_design"] = str(tmp_path / "previous")
+    assert task.feature_output_path(item, "feature_design", "design.md") == str(
+        tmp_path / "previous" / "Login" / "design.md"
+    )
+
+
+def test_symbol_tools_resolve_names(tmp_path, make_task):
+    (tmp_path / "service.py").write_text(
+        "class Service:\n    def get(self):\n        return 1\n\n\ndef get():\n    pass\n"
+    )
+    task = make_task(TasksBase)
+
+    (found,) = task.find_symbol("Service.get")
+    assert (found["file"], found["start"], found["end"]) == ("service.py", 2, 3)
+    assert task.get_symbol_source("Service.get").endswith("        return 1\n")
+    assert "ambiguous" in task.get_symbol_source("get")
+    assert "error" in task.find_symbol("nothing_like_this")[0]
+
+
+def test_build_context_outlines_files_over_budget(tmp_path, make_task):
+    src = tmp_path / "src"
+    src.mkdir()
+    padding = "x = 1\n" * 100
+    (src / "export.py").write_text(f"def export_rows():\n    return 1\n{padding}")
+    (src / "other.py").write_text(f"def unrelated():\n    return 2\n{padding}")
+    task = make_task(TasksBase, context_token_budget=200)
+    text = task.build_context(
+        ["src/export.py", "src/other.py", "src/missing.py"],
+        "Export rows",
+        lambda label, content: f"File: {label}\n{content}",
+    )
+    assert text.startswith("File: src/export.py\n")
+    assert "File: src/other.py (outline only)\ndef unrelated():" in text
+
+
+def test_bulk_tools_share_memoized_results(tmp_path, make_task):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.py").write_text("def alpha():\n    return 1\n")
+    task = make_task(TasksBase)
+
+    sections = task.tool_load_file_section().invoke(
+        {
+            "sections": [
+                {"path": "src/a.py", "start": 1, "end": 1},
+                {"path": "src/a.py", "start": 2, "end": 2},
+            ]
+        }
+    )
+    assert [s["content"] for s in sections] == ["def alpha():\n", "    return 1\n"]
+
+    grep = task.tool_grep_string()
+    found = grep.invoke({"searches": ["alpha", "missing"]})
+    assert [r["line"] for r in found["alpha"]] == [1]
+    assert found["missing"] == []
+    grep.invoke({"searches": ["alpha"]})
+    assert task.tool_memo.stats()["hits"] == 1
+
+    listing = task.tool_list_directory().invoke({"paths": ["src", "src/"]})
+    assert [item["name"] for item in listing["src"]] == ["a.py"]
+
+
+def test_each_task_and_shard_has_its_own_journal(tmp_path, make_task):
+    extract = make_task(TasksBase, task="extract")
+    extract.load_journal()
+    extract.journal.record("features", [])
+    design = make_task(TasksBase, task="design", shard="2/3")
+    design.load_journal()
+    extract.close()
+    design.close()
+
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == [
+        "journal-design-2-of-3.jsonl",
+        "journal-extract.jsonl",
+    ]
+    assert (tmp_path / "out" / "journal-extract.jsonl").read_text() != ""
+
+
+def test_inputs_sha1_changes_with_the_core_files(tmp_path, make_task):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "login.py").write_text("def login(): pass\n")
+    task = make_task(TasksBase)
+    item = FeatureManifest(
+        name="Login",
+        description="d",
+        entry_point="e",
+        related_test_files=[],
+        core_code_files=["src/login.py"],
+    )
+    before = task.inputs_sha1(item, item.core_code_files)
+    assert task.inputs_sha1(item, item.core_code_files) == before
+
+    (tmp_path / "src" / "login.py").write_text("def login(user): pass\n")
+    assert task.inputs_sha1(item, item.core_code_files) != before
+    assert task.inputs_sha1(item, item.core_code_files, "design") != before
+
+
+def test_build_context_skips_or_raises_on_missing_files(tmp_path, capsys, make_task):
+    (tmp_path / "README.md").write_text("# project\n")
+    task = make_task(TasksBase)
+
+    def render(path, content):
+        return f"{path}: {content}"
+
+    assert task.build_context(["missing.md", "README.md"], "", render) == (
+        "README.md: # project\n"
+    )
+    assert "File not found: missing.md" in capsys.readouterr().out
+    with pytest.raises(FileNotFoundError, match="missing.md"):
+        task.build_context(["README.md", "missing.md"], "", render, required=True)
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from fcoverage.models import FeatureManifest
+from fcoverage.tasks.feature_coverage import FeatureCoverageTask
+
+
+def make_feature(name):
+    return FeatureManifest(
+        name=name,
+        description="d",
+        entry_point="e",
+        related_test_files=[],
+        core_code_files=[],
+    )
+
+
+def test_single_design_file_needs_a_single_feature(tmp_path, make_task):
+    features = tmp_path / "features"
+    features.mkdir()
+    for name in ("Login", "Export"):
+        (features / f"features-definition-{name}.json").write_text(
+            make_feature(name).model_dump_json()
+        )
+    design = tmp_path / "design.md"
+    design.write_text("design")
+    task = make_task(
+        FeatureCoverageTask,
+        feature_definition=str(features),
+        feature_design=str(design),
+    )
+
+    with pytest.raises(ValueError, match="--feature-design names the single file"):
+        task.prepare_inputs()
+
+
+def test_steps_share_one_conversation_replayed_on_resume(
+    tmp_path, monkeypatch, make_task
+):
+    task = make_task(FeatureCoverageTask, resume=True)
+    task.load_journal()
+    monkeypatch.setattr(task, "get_tool_calling_llm", lambda tools, prompt_template: 0)
+    histories = []
+
+    def invoke(executor, inputs):
+        histories.append([message.content for message in inputs["chat_history"]])
+        return {"output": f"answer {len(histories)}"}
+
+    monkeypatch.setattr(task, "invoke_with_retry", invoke)
+    item = make_feature("Login")
+
+    assert task.create_testing_report(item, "design", "cases") == "answer 3"
+    coverage, improvements, _ = (
+        task.load_prompt(f"feature_tests_{step}.txt")
+        for step in ["coverage", "improvements", "report"]
+    )
+    assert histories == [
+        [],
+        [coverage, "answer 1"],
+        [coverage, "answer 1", improvements, "answer 2"],
+    ]
+
+    # A resumed run replays the two journaled steps before asking the last one.
+    task.journal.close()
+    lines = (tmp_path / "out" / "journal-FeatureCoverageTask.jsonl").read_text()
+    last = json.loads(lines.splitlines()[-1])["unit"]
+    (tmp_path / "out" / "journal-FeatureCoverageTask.jsonl").write_text(
+        "".join(line + "\n" for line in lines.splitlines()[:2])
+    )
+    task.load_journal()
+    histories.clear()
+    assert task.create_testing_report(item, "design", "cases") == "answer 1"
+    assert histories == [[coverage, "answer 1", improvements, "answer 2"]]
+    assert last in task.journal
@@ -0,0 +1,36 @@
+from fcoverage.models import FeatureManifest
+from fcoverage.tasks.feature_design import FeatureDesignTask
+
+
+def test_test_cases_step_goes_through_invoke_with_retry(tmp_path, monkeypatch):
+    task = FeatureDesignTask(
+        {
+            "project_name": "project",
+            "project_description": "description",
+            "project": str(tmp_path),
+            "src_path": "src",
+            "test_path": "tests",
+            "out": str(tmp_path / "out"),
+        }
+    )
+    executor = object()
+    invoked = []
+    monkeypatch.setattr(task, "get_tool_calling_llm", lambda tools, prompt: executor)
+    monkeypatch.setattr(
+        task,
+        "invoke_with_retry",
+        lambda runnable, inputs: invoked.append((runnable, inputs))
+        or {"output": "test cases"},
+    )
+    item = FeatureManifest(
+        name="Login",
+        description="d",
+        entry_point="e",
+        related_test_files=[],
+        core_code_files=[],
+    )
+
+    assert task.identify_feature_testcases(item, "design") == "test cases"
+    ((runnable, inputs),) = invoked
+    assert runnable is executor
+    assert inputs["feature_implementation"] == "design"
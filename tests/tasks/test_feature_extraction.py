@@ -0,0 +1,223 @@
+from langchain_core.messages import AIMessage
+
+from fcoverage import models
+from fcoverage.tasks.feature_extraction import FeatureExtractionTask
+from fcoverage.utils.changes import ChangeSet
+from fcoverage.utils.code.coverage_index import CoverageIndex
+
+
+def final_answer(*features, **files):
+    args = {"related_features": list(features)}
+    if files:
+        args = {
+            "test_files": [
+                {"filename": filename, "related_features": related}
+                for filename, related in files.items()
+            ]
+        }
+    return AIMessage(
+        content="",
+        tool_calls=[{"name": "final_answer", "args": args, "id": "call-1"}],
+    )
+
+
+def test_relate_test_file_in_a_single_llm_call(tmp_path, make_task):
+    test_file = tmp_path / "test_login.py"
+    test_file.write_text("def test_login():\n    pass\n")
+    task = make_task(
+        FeatureExtractionTask, [final_answer("Login"), final_answer("Export")]
+    )
+    features = [{"name": "Login", "description": "d", "entry_point": "e"}]
+
+    result = task.realte_test_file_to_features(str(test_file), features)
+    assert result == models.TestToFeatures(related_features=["Login"])
+    executor = task.test_to_feature_executor("test_to_feature.txt", None)
+
+    # the next scripted response answers the next test file, not a parse call
+    result = task.realte_test_file_to_features(str(test_file), features)
+    assert result.related_features == ["Export"]
+    assert task.test_to_feature_executor("test_to_feature.txt", None) is executor
+
+
+def test_malformed_final_answer_is_answered_again(tmp_path, make_task):
+    test_file = tmp_path / "test_login.py"
+    test_file.write_text("def test_login():\n    pass\n")
+    malformed = AIMessage(
+        content="",
+        tool_calls=[
+            {"name": "final_answer", "args": {"features": "Login"}, "id": "call-0"}
+        ],
+    )
+    task = make_task(FeatureExtractionTask, [malformed, final_answer("Login")])
+    features = [{"name": "Login", "description": "d", "entry_point": "e"}]
+
+    result = task.realte_test_file_to_features(str(test_file), features)
+    assert result == models.TestToFeatures(related_features=["Login"])
+
+
+def write_tests(tmp_path, count):
+    tests = tmp_path / "tests"
+    tests.mkdir()
+    for i in range(count):
+        (tests / f"test_{i}.py").write_text(f"def test_{i}():\n    pass\n")
+    return sorted(str(path) for path in tests.iterdir())
+
+
+def make_features(*names):
+    return models.ProjectFeatures(
+        features=[
+            models.FeatureItem(
+                name=name, description="d", entry_point="e", keywords=[], queries=[]
+            )
+            for name in names
+        ]
+    )
+
+
+def test_pack_test_files_groups_up_to_the_budget(tmp_path, make_task):
+    paths = write_tests(tmp_path, 5)  # 6 estimated tokens each
+    task = make_task(FeatureExtractionTask, [])
+    assert task.pack_test_files(paths, 12) == [paths[0:2], paths[2:4], paths[4:]]
+    assert task.pack_test_files(paths, 1) == [[path] for path in paths]
+
+
+def test_packed_answer_with_fallback_for_missing_files(tmp_path, make_task):
+    write_tests(tmp_path, 3)
+    answers = [
+        # the packed call covers two of the three files ...
+        final_answer(**{"tests/test_0.py": ["Login"], "tests/test_1.py": []}),
+        # ... and the last one is related on its own
+        final_answer("Export"),
+    ]
+    task = make_task(FeatureExtractionTask, answers, pack_token_budget=1000)
+    feature_to_test = task.extract_test_files(make_features("Login", "Export"))
+    assert feature_to_test == {
+        "Login": ["tests/test_0.py"],
+        "Export": ["tests/test_2.py"],
+    }
+
+
+def test_invalid_packed_answer_falls_back_to_one_file_per_call(tmp_path, make_task):
+    write_tests(tmp_path, 2)
+    answers = [
+        AIMessage(content="test_0 is about Login"),
+        final_answer("Login"),
+        final_answer(),
+    ]
+    task = make_task(FeatureExtractionTask, answers, pack_token_budget=1000)
+    feature_to_test = task.extract_test_files(make_features("Login"))
+    assert feature_to_test == {"Login": ["tests/test_0.py"]}
+
+
+def test_incremental_run_relates_only_changed_test_files(
+    tmp_path, monkeypatch, make_task
+):
+    write_tests(tmp_path, 4)
+    (tmp_path / "tests" / "test_2.py").unlink()
+    out = tmp_path / "out"
+    out.mkdir()
+    features = make_features("Login", "Export")
+    (out / "features-list.json").write_text(
+        models.FeaturesList(
+            features=features.features,
+            code_files={"Login": ["src/login.py", "src/gone.py"], "Export": []},
+        ).model_dump_json()
+    )
+    task = make_task(FeatureExtractionTask, [], since="main")
+    task.write_manifests(
+        features,
+        {"Login": [], "Export": []},
+        {
+            "Login": ["tests/test_0.py", "tests/test_1.py", "tests/test_2.py"],
+            "Export": ["tests/test_0.py"],
+        },
+    )
+    task.changes = ChangeSet(
+        "main",
+        modified={"tests/test_1.py", "tests/test_3.py"},
+        deleted={"tests/test_2.py", "src/gone.py"},
+    )
+    related = []
+    monkeypatch.setattr(
+        task,
+        "realte_test_file_to_features",
+        lambda path, features: related.append(path)
+        or models.TestToFeatures(related_features=["Export"]),
+    )
+
+    assert task.run()
+    assert sorted(related) == [
+        str(tmp_path / "tests" / "test_1.py"),
+        str(tmp_path / "tests" / "test_3.py"),
+    ]
+    manifests = {item.name: item for item in task.load_feature_items(str(out))}
+    assert manifests["Login"].related_test_files == ["tests/test_0.py"]
+    assert manifests["Login"].core_code_files == ["src/login.py"]
+    assert manifests["Export"].related_test_files == [
+        "tests/test_0.py",
+        "tests/test_1.py",
+        "tests/test_3.py",
+    ]
+
+
+def test_coverage_contexts_relate_tests_without_the_llm(
+    tmp_path, monkeypatch, make_task
+):
+    write_tests(tmp_path, 4)
+    index = tmp_path / "coverage-index.json"
+    CoverageIndex(
+        {
+            "tests/test_0.py": {"src/login.py": [1, 2], "src/util.py": [3]},
+            "tests/test_1.py": {"src/util.py": [3]},
+            "tests/test_3.py": {"src/login.py": [1], "src/a.py": [1], "src/b.py": [1]},
+        }
+    ).save(str(index))
+    task = make_task(FeatureExtractionTask, [], coverage_contexts=str(index))
+    asked = []
+    monkeypatch.setattr(
+        task,
+        "realte_test_file_to_features",
+        lambda path, features: asked.append(path.rsplit("/", 1)[1])
+        or models.TestToFeatures(related_features=[]),
+    )
+
+    feature_to_test = task.extract_test_files(
+        make_features("Login", "A", "B"),
+        {"Login": ["src/login.py"], "A": ["src/a.py"], "B": ["./src/b.py"]},
+    )
+    assert feature_to_test == {"Login": ["tests/test_0.py"], "A": [], "B": []}
+    # no core file executed, not measured, or spread over three features
+    assert sorted(asked) == ["test_1.py", "test_2.py", "test_3.py"]
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[1.0, 0.0] for _ in texts]
+
+
+class FakeVectorDB:
+    embeddings = FakeEmbeddings()
+
+    def source_embeddings(self, paths):
+        return {path: [1.0, 0.0] for path in paths}
+
+
+def test_shortlist_matches_unnormalized_core_file_paths(tmp_path, make_task):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "login.py").write_text("def login(user):\n    return user\n")
+    (tmp_path / "src" / "export.py").write_text("def to_csv(rows):\n    return rows\n")
+    (tmp_path / "tests").mkdir()
+    test_file = tmp_path / "tests" / "test_login.py"
+    test_file.write_text("from login import login\n\ndef test_login():\n    login(1)\n")
+    task = make_task(
+        FeatureExtractionTask, [], shortlist_size=1, shortlist_confidence=0.9
+    )
+    task.vdb = FakeVectorDB()
+
+    shortlists = task.shortlist_features(
+        [str(test_file)],
+        make_features("Export", "Login"),
+        {"Export": ["src/export.py"], "Login": ["./src/../src/login.py"]},
+    )
+    assert shortlists[str(test_file)].features == ["Login"]
+    assert shortlists[str(test_file)].confident == ["Login"]
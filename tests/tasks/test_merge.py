@@ -0,0 +1,98 @@
+import json
+import os
+
+from fcoverage import models
+from fcoverage.tasks.feature_extraction import FeatureExtractionTask
+from fcoverage.tasks.merge import MergeTask
+
+
+def make_args(tmp_path, **args):
+    return {
+        "project_name": "project",
+        "project_description": "description",
+        "project": str(tmp_path),
+        "src_path": "src",
+        "test_path": "tests",
+        "out": str(tmp_path / "out"),
+        "shortlist_size": 0,
+        **args,
+    }
+
+
+def related(test_path, features):
+    # test_<i>.py is about Login when i is even, and Export otherwise
+    i = int(test_path.rsplit("_", 1)[1].split(".")[0])
+    return models.TestToFeatures(related_features=["Login" if i % 2 == 0 else "Export"])
+
+
+def run_extract(tmp_path, monkeypatch, **args):
+    monkeypatch.setattr(
+        FeatureExtractionTask,
+        "realte_test_file_to_features",
+        lambda self, path, features: related(path, features),
+    )
+    task = FeatureExtractionTask(make_args(tmp_path, **args))
+    os.makedirs(task.args["out"], exist_ok=True)
+    assert task.run()
+
+
+def read_manifests(out):
+    return {
+        path.name: json.loads(path.read_text())
+        for path in sorted(out.glob("features-definition-*.json"))
+    }
+
+
+def test_merged_shards_match_a_single_run(tmp_path, monkeypatch):
+    tests = tmp_path / "tests"
+    tests.mkdir()
+    for i in range(12):
+        (tests / f"test_{i}.py").write_text(f"def test_{i}():\n    pass\n")
+    features = models.FeaturesList(
+        features=[
+            models.FeatureItem(
+                name=name, description="d", entry_point="e", keywords=[], queries=[]
+            )
+            for name in ("Login", "Export")
+        ],
+        code_files={"Login": ["src/login.py"], "Export": []},
+    )
+    features_list = tmp_path / "features-list.json"
+    features_list.write_text(features.model_dump_json())
+
+    run_extract(tmp_path, monkeypatch, features_list=str(features_list))
+    single = read_manifests(tmp_path / "out")
+    assert single["features-definition-Login.json"]["related_test_files"] == [
+        f"tests/test_{i}.py" for i in (0, 10, 2, 4, 6, 8)
+    ]
+
+    sharded = tmp_path / "sharded"
+    for index in (1, 2, 3):
+        run_extract(
+            tmp_path,
+            monkeypatch,
+            features_list=str(features_list),
+            shard=f"{index}/3",
+            out=str(sharded / f"runner-{index}"),
+        )
+        assert not read_manifests(sharded / f"runner-{index}")
+        # each runner uploads its out/shards, the merge job downloads them together
+        (sharded / "shards").mkdir(exist_ok=True)
+        (sharded / f"runner-{index}" / "shards").rename(
+            sharded / "shards" / f"runner-{index}"
+        )
+
+    merge = MergeTask(
+        make_args(tmp_path, out=str(sharded), features_list=str(features_list))
+    )
+    assert merge.run()
+    assert read_manifests(sharded) == single
+
+
+def test_merge_fails_on_missing_shards(tmp_path):
+    shards = tmp_path / "out" / "shards"
+    shards.mkdir(parents=True)
+    (shards / "design-1-of-2.json").write_text(
+        json.dumps({"task": "design", "index": 1, "count": 2, "features": ["Login"]})
+    )
+    assert not MergeTask(make_args(tmp_path)).run()
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+from fcoverage import main
+
+
+def test_importing_the_cli_does_not_load_langchain():
+    code = (
+        "import sys, fcoverage.main; "
+        "print(sorted(m for m in sys.modules if m.split('.')[0] in "
+        "('langchain', 'langchain_core', 'chromadb', 'langgraph')))"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_task_registry_loads_task_classes():
+    assert main.load_task("design").__name__ == "FeatureDesignTask"
+    from fcoverage.tasks import FeatureCoverageTask
+
+    assert main.load_task("coverage") is FeatureCoverageTask
+
+
+def test_path_args_name_parser_options():
+    args = main.build_parser().parse_args(
+        ["--project-name", "p", "--project-description", "d", "--project", "."]
+        + ["--task", "extract"]
+    )
+    assert set(main.PATH_ARGS) <= set(vars(args))
@@ -0,0 +1,107 @@
+import io
+import json
+import sys
+import threading
+
+import pytest
+
+from fcoverage import client
+from fcoverage.server import JobOutput, JobServer, make_http_server
+from fcoverage.tasks.base import TasksBase
+from fcoverage.utils.concurrency import bounded_map
+
+
+class EchoTask(TasksBase):
+    def run(self):
+        bounded_map(print, ["a", "b"], max_workers=2)
+        print(f"symbols {len(self.symbol_index.find('greet'))}")
+        return self.args["succeed"]
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / "app.py").write_text("def greet():\n    pass\n")
+    args = {
+        "project_name": "project",
+        "project_description": "description",
+        "project": str(tmp_path),
+        "src_path": ".",
+        "test_path": ".",
+        "out": str(tmp_path / "out"),
+        "max_jobs": 2,
+        "succeed": True,
+    }
+    jobs = JobServer(args, load_task={"echo": EchoTask}.__getitem__)
+    jobs.runtime = TasksBase(args)
+    http_server = make_http_server(jobs, "127.0.0.1", 0)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    host, port = http_server.server_address[:2]
+    yield jobs, f"http://{host}:{port}"
+    http_server.shutdown()
+    jobs.shutdown()
+
+
+def test_jobs_share_the_runtime_and_stream_their_output(server, tmp_path, monkeypatch):
+    jobs, url = server
+    output = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", JobOutput(output))
+    first = client.submit(url, "echo", {"out": str(tmp_path / "a")})
+    second = client.submit(url, "echo", {"out": str(tmp_path / "b"), "succeed": 0})
+
+    events = list(client.stream_events(url, first["id"]))
+    logs = [e["line"] for e in events if e["type"] == "log"]
+    assert {"load_journal", "a", "b", "symbols 1"} <= set(logs)
+    assert events[-1] == {"type": "status", "job": first["id"], "status": "succeeded"}
+    statuses = [
+        e["status"]
+        for e in client.stream_events(url, second["id"])
+        if e["type"] == "status"
+    ]
+    assert statuses == ["queued", "running", "failed"]
+    # Both jobs searched through the index the server built once.
+    assert jobs.runtime._search_index is not None
+    assert (tmp_path / "a" / "journal-echo.jsonl").exists()
+    # Each job traces to its own --out.
+    (trace,) = [
+        json.loads(line)
+        for line in (tmp_path / "a" / "trace.jsonl").read_text().splitlines()
+    ]
+    assert trace["name"] == "run" and trace["job"] == first["id"]
+    assert f"[{first['id']}] symbols 1" in output.getvalue()
+
+
+def test_submit_rejects_unknown_tasks_and_other_projects(server, tmp_path):
+    _, url = server
+    with pytest.raises(ValueError, match="unknown task"):
+        client.submit(url, "nope", {})
+    with pytest.raises(ValueError, match="the server runs on"):
+        client.submit(url, "echo", {"project": str(tmp_path / "elsewhere")})
+
+
+def test_client_resolves_every_path_option(tmp_path, monkeypatch):
+    (tmp_path / "project").mkdir()
+    (tmp_path / "project" / "README.md").write_text("# project\n")
+    (tmp_path / "notes.md").write_text("# notes\n")
+    monkeypatch.chdir(tmp_path)
+    args = {
+        "project": "project",
+        "out": "out",
+        "features_list": "out/features-list.json",
+        "coverage_contexts": "run",
+        "docs": "README.md, notes.md",
+        "feature_design": "",
+        "since": "origin/main",
+    }
+
+    resolved = client.resolve_paths(args)
+    assert resolved["project"] == str(tmp_path / "project")
+    assert resolved["out"] == str(tmp_path / "out")
+    assert resolved["features_list"] == str(tmp_path / "out" / "features-list.json")
+    assert resolved["coverage_contexts"] == "run"
+    assert resolved["docs"] == f"README.md,{tmp_path / 'notes.md'}"
+    assert resolved["feature_design"] == ""
+    assert resolved["since"] == "origin/main"
+    assert client.resolve_paths({**args, "coverage_contexts": "c.json"})[
+        "coverage_contexts"
+    ] == str(tmp_path / "c.json")
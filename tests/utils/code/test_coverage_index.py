@@ -0,0 +1,46 @@
+import pytest
+
+from fcoverage.utils.code.coverage_index import CoverageIndex, run_test_coverage
+
+
+def write_project(root):
+    (root / "src").mkdir()
+    (root / "src" / "login.py").write_text("def login():\n    return True\n")
+    (root / "src" / "export.py").write_text("def export():\n    return []\n")
+    (root / "tests").mkdir()
+    (root / "tests" / "test_login.py").write_text(
+        "from login import login\n\n\ndef test_login():\n    assert login()\n"
+    )
+    (root / "tests" / "test_both.py").write_text(
+        "from login import login\nfrom export import export\n\n\n"
+        "def test_both():\n    login()\n    assert export() == []\n"
+    )
+    (root / "pytest.ini").write_text("[pytest]\npythonpath = src\n")
+
+
+def test_index_from_a_real_test_run(tmp_path):
+    pytest.importorskip("pytest_cov")
+    project = tmp_path / "project"
+    project.mkdir()
+    write_project(project)
+
+    data_file = run_test_coverage(
+        str(project), "tests", "src", str(tmp_path / ".coverage")
+    )
+    index = CoverageIndex.from_coverage_data(data_file, str(project))
+
+    # only the lines run by a test count, not the ones run while importing
+    assert index.tests["tests/test_login.py"] == {"src/login.py": [2]}
+    assert index.tests["tests/test_both.py"] == {
+        "src/export.py": [2],
+        "src/login.py": [2],
+    }
+    index.save(str(tmp_path / "index.json"))
+    assert CoverageIndex.load(str(tmp_path / "index.json")).tests == index.tests
+
+
+def test_features_of_a_test_file():
+    index = CoverageIndex({"tests/test_a.py": {"src/a.py": [1, 2], "src/c.py": [5]}})
+    core_files = {"A": {"src/a.py"}, "B": {"src/b.py"}, "C": {"src/c.py"}}
+    assert index.features_of("tests/./test_a.py", core_files) == {"A": 2, "C": 1}
+    assert index.features_of("tests/test_other.py", core_files) is None
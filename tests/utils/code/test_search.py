@@ -0,0 +1,41 @@
+from fcoverage.utils.code.search import CodeSearchIndex, find_source_files
+
+
+def make_project(root):
+    (root / "pkg").mkdir()
+    (root / "pkg" / "core.py").write_text(
+        "def load_config(path):\n    return read(path)\n\n\ndef reload_config():\n    pass\n"
+    )
+    (root / "pkg" / "util.py").write_text("import os\nCONFIG = 'x'\n")
+    (root / ".venv" / "lib").mkdir(parents=True)
+    (root / ".venv" / "lib" / "dep.py").write_text("def load_config(): pass\n")
+    (root / "notes.txt").write_text("load_config\n")
+    return root
+
+
+def test_find_source_files_skips_virtualenvs(tmp_path):
+    files = find_source_files(str(make_project(tmp_path)))
+    assert files == [
+        str(tmp_path / "pkg" / "core.py"),
+        str(tmp_path / "pkg" / "util.py"),
+    ]
+
+
+def test_literal_search_and_pagination(tmp_path):
+    index = CodeSearchIndex(str(make_project(tmp_path)))
+    result = index.search("load_config")
+    assert [(r["line"], r["text"]) for r in result] == [
+        (1, "def load_config(path):"),
+        (5, "def reload_config():"),
+    ]
+    assert index.search("load_config", page_size=1, page=2)[0]["line"] == 5
+    assert index.search("load_config", page_size=1, page=3) == []
+    assert index.search("does_not_exist") == []
+
+
+def test_whole_word_and_regex_search(tmp_path):
+    index = CodeSearchIndex(str(make_project(tmp_path)))
+    assert [r["line"] for r in index.search("load_config", whole_word=True)] == [1]
+    result = index.search(r"^import \w+", regex=True)
+    assert result[0]["file"].endswith("util.py")
+    assert index.search("(", regex=True)[0]["line"] == -1
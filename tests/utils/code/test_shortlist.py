@@ -0,0 +1,62 @@
+import numpy as np
+
+from fcoverage.utils.code.shortlist import (
+    cosine_similarity,
+    find_test_references,
+    rank_features,
+    static_scores,
+)
+from fcoverage.utils.code.symbols import SymbolIndex
+
+
+def make_project(tmp_path):
+    package = tmp_path / "app"
+    package.mkdir()
+    files = {
+        package / "__init__.py": "",
+        package / "auth.py": "def login(user):\n    return user\n",
+        package / "export.py": "def to_csv(rows):\n    return rows\n",
+        package / "shared.py": "def helper():\n    pass\n",
+        tmp_path
+        / "test_auth.py": (
+            "from app.auth import login\n"
+            "from app import shared\n\n"
+            "def test_login():\n"
+            "    assert login('a')\n"
+            "    shared.helper()\n"
+        ),
+    }
+    for path, content in files.items():
+        path.write_text(content)
+    index = SymbolIndex((str(path), content) for path, content in files.items())
+    return index, {name: str(package / f"{name}.py") for name in ("auth", "export")}
+
+
+def test_find_test_references_resolves_imports_and_calls(tmp_path):
+    index, paths = make_project(tmp_path)
+    references = find_test_references(str(tmp_path / "test_auth.py"), index)
+    assert references.files == {paths["auth"], str(tmp_path / "app" / "shared.py")}
+    assert references.symbols["login"] == paths["auth"]
+    assert find_test_references(str(tmp_path / "missing.py"), index) is None
+
+
+def test_static_scores_share_of_references_per_feature(tmp_path):
+    index, paths = make_project(tmp_path)
+    references = find_test_references(str(tmp_path / "test_auth.py"), index)
+    scores = static_scores(references, [{paths["auth"]}, {paths["export"]}, set()])
+    # imports of auth.py and shared.py, calls to login and helper
+    assert scores.tolist() == [0.5, 0.0, 0.0]
+
+
+def test_rank_features_blends_scores_and_picks_confident():
+    names = ["a", "b", "c"]
+    similarity = cosine_similarity(np.array([[1.0, 0.0]]), np.eye(3, 2))[0]
+    assert similarity.tolist() == [1.0, 0.0, 0.0]
+
+    shortlist = rank_features(names, np.array([0, 1.0, 0]), similarity, 2, 0.9)
+    assert shortlist.features == ["b", "a"]
+    assert shortlist.confident == ["b"]
+
+    # confident about every feature is no evidence at all
+    shortlist = rank_features(names, np.ones(3), similarity, 2, 0.9)
+    assert shortlist.confident == []
@@ -0,0 +1,68 @@
+from fcoverage.utils.code.symbols import SymbolIndex, module_name
+
+SOURCE = '''"""Module docstring."""
+from . import helpers
+from .models import User
+
+
+class Service(Base):
+    """Handles users.
+
+    More details.
+    """
+
+    @cached
+    def get(self, user_id: int) -> User:
+        return helpers.load(user_id)
+
+
+async def main(argv=None):
+    pass
+'''
+
+
+def make_index(tmp_path):
+    package = tmp_path / "app"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    path = package / "service.py"
+    path.write_text(SOURCE)
+    return SymbolIndex([(str(path), SOURCE)]), str(path)
+
+
+def test_module_name_walks_up_packages(tmp_path):
+    _, path = make_index(tmp_path)
+    assert module_name(path) == "app.service"
+    assert module_name(str(tmp_path / "app" / "__init__.py")) == "app"
+
+
+def test_symbols_have_lines_signatures_and_docstrings(tmp_path):
+    index, path = make_index(tmp_path)
+    module = index.modules[path]
+    assert module.imports == ["app.helpers", "app.models.User"]
+    service, get, main = module.symbols
+    assert (service.name, service.kind, service.docstring) == (
+        "Service",
+        "class",
+        "Handles users.",
+    )
+    assert (get.name, get.kind, get.start, get.end) == ("Service.get", "method", 12, 14)
+    assert get.signature == "def get(self, user_id: int) -> User"
+    assert main.signature == "async def main(argv=None)"
+
+
+def test_find_by_bare_qualified_and_module_name(tmp_path):
+    index, _ = make_index(tmp_path)
+    assert [s.full_name for s in index.find("get")] == ["app.service.Service.get"]
+    assert index.find("Service.get") == index.find("app.service.Service.get")
+    assert [s.name for s in index.find("SERVICE.G")] == ["Service.get"]
+    assert index.find("missing") == []
+
+
+def test_source_and_outline(tmp_path):
+    index, path = make_index(tmp_path)
+    (get,) = index.find("Service.get")
+    assert index.source(get).splitlines()[0].strip() == "@cached"
+    outline = index.outline(path)
+    assert "class Service(Base):  # lines 6-14" in outline
+    assert "    def get(self, user_id: int) -> User:  # lines 12-14" in outline
@@ -0,0 +1,57 @@
+import subprocess
+
+import pytest
+
+from fcoverage.models import FeatureManifest
+from fcoverage.utils.changes import ChangeSet, changed_files, impacted_features
+
+
+def feature(name, code, tests):
+    return FeatureManifest(
+        name=name,
+        description="d",
+        entry_point="e",
+        core_code_files=code,
+        related_test_files=tests,
+    )
+
+
+def test_impacted_features_by_code_or_test_files():
+    features = [
+        feature("Login", ["src/login.py"], ["tests/test_login.py"]),
+        feature("Export", ["src/export.py"], ["tests/test_export.py"]),
+        feature("Search", ["src/search.py"], []),
+    ]
+    changes = ChangeSet(
+        "main", modified={"tests/test_export.py"}, deleted={"src/login.py"}
+    )
+    assert impacted_features(features, changes) == {
+        "Login": ["src/login.py"],
+        "Export": ["tests/test_export.py"],
+    }
+
+
+def git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def test_changed_files_since_a_ref(tmp_path):
+    pytest.importorskip("git")
+    project = tmp_path / "project"
+    (project / "src").mkdir(parents=True)
+    for name in ("a.py", "b.py", "c.py"):
+        (project / "src" / name).write_text(f"# {name}\n")
+    (tmp_path / "outside.py").write_text("")
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "add", ".")
+    git(tmp_path, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "base")
+
+    (project / "src" / "a.py").write_text("# changed\n")
+    git(tmp_path, "mv", "project/src/b.py", "project/src/renamed.py")
+    (project / "src" / "c.py").unlink()
+    (project / "src" / "new.py").write_text("")
+    (tmp_path / "outside.py").write_text("# changed\n")
+
+    changes = changed_files(str(project), "HEAD")
+    assert changes.modified == {"src/a.py", "src/renamed.py", "src/new.py"}
+    assert changes.deleted == {"src/b.py", "src/c.py"}
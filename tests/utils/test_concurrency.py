@@ -0,0 +1,28 @@
+import time
+
+import pytest
+
+from fcoverage.utils.concurrency import bounded_map
+
+
+def test_bounded_map_keeps_input_order():
+    def slow_identity(x):
+        time.sleep(0.01 * (5 - x))
+        return x * 2
+
+    assert bounded_map(slow_identity, range(5), max_workers=3) == [0, 2, 4, 6, 8]
+
+
+def test_bounded_map_serial_matches_concurrent():
+    items = ["a", "bb", "ccc"]
+    assert bounded_map(len, items, max_workers=1) == bounded_map(
+        len, items, max_workers=4
+    )
+
+
+def test_bounded_map_raises_worker_error():
+    def fail(x):
+        raise ValueError(x)
+
+    with pytest.raises(ValueError):
+        bounded_map(fail, [1, 2], max_workers=2)
@@ -0,0 +1,56 @@
+from fcoverage.utils.code.symbols import SymbolIndex
+from fcoverage.utils.context import (
+    ContextItem,
+    count_tokens,
+    fit_to_budget,
+    markdown_outline,
+    relevant_symbols,
+)
+
+
+def render(label, text):
+    return f"{label}\n{text}"
+
+
+def test_count_tokens_without_encoding_files_still_counts():
+    assert count_tokens("") >= 0
+    assert count_tokens("word " * 400) > count_tokens("word " * 10)
+
+
+def test_fit_to_budget_keeps_everything_under_budget_in_order():
+    items = [ContextItem("a", "alpha", score=0.1), ContextItem("b", "beta", score=1)]
+    assert fit_to_budget(items, render, 0) == "a\nalpha\nb\nbeta"
+    assert fit_to_budget(items, render, 1000) == "a\nalpha\nb\nbeta"
+
+
+def test_fit_to_budget_cuts_lowest_ranked_first():
+    big = "x = 1\n" * 200
+    items = [
+        ContextItem("low", big, score=0.1, symbols="def f(): ...", outline="f"),
+        ContextItem("high", big, score=0.9, outline="g"),
+        ContextItem("last", big, score=0.0),
+    ]
+    budget = count_tokens(render("high", big)) + 20
+    text = fit_to_budget(items, render, budget)
+    assert text == f"low (relevant symbols only)\ndef f(): ...\nhigh\n{big}"
+
+
+def test_relevant_symbols_match_name_words(tmp_path):
+    source = (
+        "class ReportExporter:\n"
+        "    def export_csv(self):\n"
+        "        pass\n\n"
+        "def login():\n"
+        "    pass\n\n"
+        "def write_csv():\n"
+        "    pass\n"
+    )
+    path = str(tmp_path / "report.py")
+    module = SymbolIndex([(path, source)]).modules[path]
+    symbols = relevant_symbols(module.symbols, "Export reports as CSV")
+    # the method is inside the class that is already included
+    assert [s.name for s in symbols] == ["ReportExporter", "write_csv"]
+
+
+def test_markdown_outline_lists_headings():
+    assert markdown_outline("# Title\ntext\n## Usage\n#!not\n") == "# Title\n## Usage"
@@ -0,0 +1,49 @@
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from fcoverage.utils.embeddings import CachedEmbeddings, EmbeddingCache
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    calls: list = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def counting():
+    embeddings = CountingEmbeddings(size=8)
+    embeddings.calls.clear()
+    return embeddings
+
+
+def test_only_unseen_texts_are_embedded(tmp_path, counting):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    cached = CachedEmbeddings(counting, cache, namespace="fake:model")
+
+    first = cached.embed_documents(["a", "b", "a"])
+    second = cached.embed_documents(["b", "c"])
+
+    assert counting.calls == [["a", "b"], ["c"]]
+    assert first[1] == pytest.approx(second[0], rel=1e-6)
+    assert cache.stats()["entries"] == 3
+
+
+def test_cache_is_shared_by_namespace_only(tmp_path, counting):
+    path = str(tmp_path / "embeddings.sqlite")
+    CachedEmbeddings(counting, EmbeddingCache(path), "fake:a").embed_documents(["x"])
+    CachedEmbeddings(counting, EmbeddingCache(path), "fake:a").embed_documents(["x"])
+    CachedEmbeddings(counting, EmbeddingCache(path), "fake:b").embed_documents(["x"])
+    assert counting.calls == [["x"], ["x"]]
+
+
+def test_queries_are_cached_separately_from_documents(tmp_path, counting):
+    cached = CachedEmbeddings(
+        counting, EmbeddingCache(str(tmp_path / "e.sqlite")), "fake:model"
+    )
+    cached.embed_documents(["q"])
+    vector = cached.embed_query("q")
+    assert cached.embed_queries(["q"]) == [vector]
+    assert cached.cache.stats()["entries"] == 2
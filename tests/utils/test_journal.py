@@ -0,0 +1,32 @@
+from fcoverage.utils.journal import RunJournal
+
+
+def test_resume_skips_recorded_units(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = RunJournal(path)
+    journal.record("features", {"features": []})
+    journal.record("test-to-features:tests/test_a.py:abc", ["Login"])
+    journal.close()
+
+    resumed = RunJournal(path, resume=True)
+    assert "features" in resumed
+    assert resumed.get("test-to-features:tests/test_a.py:abc") == ["Login"]
+    assert resumed.get("missing", "default") == "default"
+
+
+def test_fresh_run_discards_previous_journal(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    RunJournal(path).record("features", [])
+    assert "features" not in RunJournal(path)
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text('{"unit": "a", "value": 1}\n{"unit": "b", "val')
+
+    journal = RunJournal(str(path), resume=True)
+    assert "a" in journal and "b" not in journal
+    journal.record("c", 3)
+    journal.close()
+
+    assert RunJournal(str(path), resume=True).get("c") == 3
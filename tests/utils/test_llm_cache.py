@@ -0,0 +1,59 @@
+import time
+
+from langchain_core.language_models import FakeListChatModel
+
+from fcoverage.utils.llm_cache import CACHE_HIT_METADATA_KEY, LLMResponseCache
+
+
+def test_repeated_prompt_is_served_from_cache(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"), namespace="fake:model")
+    model = FakeListChatModel(responses=["first", "second"], cache=cache)
+
+    assert model.invoke("hello").content == "first"
+    cached = model.invoke("hello")
+    assert cached.content == "first"
+    assert cached.response_metadata[CACHE_HIT_METADATA_KEY]
+    assert model.invoke("other prompt").content == "second"
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["entries"] == 2
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    model = FakeListChatModel(responses=["answer"], cache=LLMResponseCache(path))
+    model.invoke("question")
+
+    reopened = LLMResponseCache(path)
+    model = FakeListChatModel(responses=["answer"], cache=reopened)
+    model.invoke("question")
+    assert reopened.stats()["hits"] == 1
+
+
+def test_namespace_separates_models(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    LLMResponseCache(path, namespace="a").update("p", "llm", [])
+    assert LLMResponseCache(path, namespace="b").lookup("p", "llm") is None
+
+
+def test_evicts_least_recently_used_above_size_cap(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"), max_size_mb=0)
+    model = FakeListChatModel(responses=["a" * 100, "b" * 100], cache=cache)
+    model.invoke("old")
+    time.sleep(0.01)
+    model.invoke("new")
+
+    cache.max_size_bytes = cache.stats()["size_bytes"] - 1
+    cache.evict()
+    assert cache.stats()["entries"] == 1
+    assert model.invoke("new").content == "b" * 100
+
+
+def test_evicts_expired_entries(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite"))
+    FakeListChatModel(responses=["c"], cache=cache).invoke("stale")
+    cache.max_age_seconds = 1e-9
+    cache.evict()
+    assert cache.stats()["entries"] == 0
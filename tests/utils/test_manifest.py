@@ -0,0 +1,51 @@
+import os
+
+from fcoverage.utils.manifest import IndexManifest
+
+SIGNATURE = {"collection": "c", "embedding_model": "m"}
+
+
+def write(path, content):
+    path.write_text(content)
+    return str(path)
+
+
+def test_diff_detects_added_changed_and_removed_files(tmp_path):
+    a = write(tmp_path / "a.py", "a = 1\n")
+    b = write(tmp_path / "b.py", "b = 1\n")
+    manifest = IndexManifest.load(str(tmp_path), SIGNATURE)
+    assert not manifest.exists
+    manifest.update(a, ["id-a"])
+    manifest.update(b, ["id-b"])
+    manifest.save()
+
+    write(tmp_path / "b.py", "b = 2\n")
+    c = write(tmp_path / "c.py", "c = 1\n")
+    os.remove(a)
+
+    manifest = IndexManifest.load(str(tmp_path), SIGNATURE)
+    assert manifest.exists
+    unchanged, changed, removed = manifest.diff([b, c])
+    assert unchanged == []
+    assert changed == [b, c]
+    assert removed == [a]
+
+
+def test_touched_file_with_same_content_is_unchanged(tmp_path):
+    a = write(tmp_path / "a.py", "a = 1\n")
+    manifest = IndexManifest.load(str(tmp_path), SIGNATURE)
+    manifest.update(a, ["id-a"])
+    os.utime(a, ns=(0, 0))
+
+    assert manifest.diff([a]) == ([a], [], [])
+    assert manifest.ids([a]) == {"id-a"}
+
+
+def test_manifest_for_other_signature_is_ignored(tmp_path):
+    manifest = IndexManifest.load(str(tmp_path), SIGNATURE)
+    manifest.update(write(tmp_path / "a.py", "a = 1\n"), ["id-a"])
+    manifest.save()
+
+    other = IndexManifest.load(str(tmp_path), {**SIGNATURE, "embedding_model": "x"})
+    assert not other.exists
+    assert other.ids() == set()
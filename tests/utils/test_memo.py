@@ -0,0 +1,67 @@
+from fcoverage.utils.memo import ToolMemo
+
+
+def test_bulk_calls_compute_only_missing_items():
+    memo = ToolMemo()
+    calls = []
+
+    def compute(args):
+        calls.append(list(args))
+        return [arg.upper() for arg in args]
+
+    assert memo.get_many("t", ["a", "b"], compute) == ["A", "B"]
+    assert memo.get_many("t", ["b", "c", "c"], compute) == ["B", "C", "C"]
+    assert calls == [["a", "b"], ["c"]]
+    assert memo.get_many("other", ["a"], compute) == ["A"]
+    assert memo.stats()["hits"] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    memo = ToolMemo(max_entries=2)
+    calls = []
+
+    def compute(key):
+        calls.append(key)
+        return key
+
+    for key in ["a", "b", "a", "c", "a", "b"]:
+        memo.get("t", key, lambda: compute(key))
+    # "b" was evicted by "c" and computed again; "a" stayed in use
+    assert calls == ["a", "b", "c", "b"]
+
+
+def test_changed_fingerprint_clears_memo_on_refresh():
+    state = {"version": 1, "changes": 0, "checks": 0}
+
+    def fingerprint():
+        state["checks"] += 1
+        return state["version"]
+
+    memo = ToolMemo(
+        fingerprint=fingerprint,
+        on_change=lambda: state.update(changes=state["changes"] + 1),
+    )
+    memo.refresh()
+    memo.get("t", "a", lambda: 1)
+    state["version"] = 2
+    # Tool calls do not fingerprint the project.
+    assert memo.get("t", "a", lambda: 2) == 1
+    assert state["checks"] == 1
+    memo.refresh()
+    assert memo.get("t", "a", lambda: 3) == 3
+    assert state["changes"] == 1
+
+
+def test_fingerprint_is_checked_at_most_once_per_interval(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("fcoverage.utils.memo.time.monotonic", lambda: now[0])
+    checks = []
+    memo = ToolMemo(fingerprint=lambda: checks.append(now[0]), check_interval=2.0)
+
+    memo.refresh()
+    now[0] += 1.0
+    memo.refresh()
+    assert checks == [100.0]
+    now[0] += 1.5
+    memo.refresh()
+    assert checks == [100.0, 102.5]
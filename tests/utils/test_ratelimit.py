@@ -0,0 +1,150 @@
+import pytest
+
+from fcoverage.utils.ratelimit import (
+    RateLimiter,
+    TokenBucket,
+    call_with_retry,
+    is_quota_exhausted,
+    is_rate_limit_error,
+    is_retryable_error,
+    retry_after_seconds,
+)
+
+
+class FakeResponse:
+    status_code = 429
+
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class RateLimitError(Exception):
+    def __init__(self, message, headers=None):
+        super().__init__(message)
+        self.response = FakeResponse(headers or {})
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(per_minute=60)
+    bucket.consume(60, now=bucket.updated)
+    assert bucket.wait_time(1, now=bucket.updated) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now=bucket.updated + 1) == 0
+
+
+def test_token_bucket_unlimited():
+    bucket = TokenBucket(per_minute=0)
+    bucket.consume(10**9, now=0)
+    assert bucket.wait_time(10**9, now=0) == 0
+
+
+def test_rate_limiter_non_blocking_acquire():
+    limiter = RateLimiter(requests_per_minute=2)
+    assert limiter.acquire(blocking=False)
+    assert limiter.acquire(blocking=False)
+    assert not limiter.acquire(blocking=False)
+
+
+def test_rate_limiter_token_debt_blocks_requests():
+    limiter = RateLimiter(tokens_per_minute=100)
+    assert limiter.acquire(blocking=False)
+    limiter.record_tokens(150)
+    assert not limiter.acquire(blocking=False)
+
+
+def test_retry_after_header_and_message():
+    assert retry_after_seconds(RateLimitError("x", {"Retry-After": "7"})) == 7
+    assert retry_after_seconds(RateLimitError("x", {"retry-after-ms": "500"})) == 0.5
+    assert retry_after_seconds(Exception("retry_delay { seconds: 12 }")) == 12
+    assert retry_after_seconds(Exception("boom")) is None
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+class QuotaError(Exception):
+    status_code = 429
+    code = "insufficient_quota"
+
+
+def test_is_rate_limit_error():
+    assert is_rate_limit_error(RateLimitError("slow down"))
+    assert is_rate_limit_error(ResourceExhausted("429 RESOURCE_EXHAUSTED"))
+    assert not is_rate_limit_error(ValueError("bad input"))
+    # the message alone is no sign of a rate limit
+    assert not is_rate_limit_error(ValueError("unexpected token at line 429"))
+    assert not is_retryable_error(ValueError("quota of the form exceeded"))
+
+
+def test_wrapped_provider_errors_are_classified_by_their_cause():
+    try:
+        try:
+            raise ResourceExhausted("per minute")
+        except ResourceExhausted as e:
+            raise RuntimeError("Error embedding content") from e
+    except RuntimeError as wrapped:
+        assert is_rate_limit_error(wrapped)
+        assert is_retryable_error(wrapped)
+
+
+def test_exhausted_quota_is_not_retried():
+    assert is_quota_exhausted(QuotaError("You exceeded your current quota"))
+    assert not is_rate_limit_error(QuotaError("You exceeded your current quota"))
+    limiter = RateLimiter()
+    calls = []
+
+    def out_of_quota():
+        calls.append(1)
+        raise QuotaError("You exceeded your current quota")
+
+    with pytest.raises(QuotaError):
+        call_with_retry(out_of_quota, limiter, max_retries=5)
+    assert len(calls) == 1 and limiter.paused_until == 0
+
+
+def test_call_with_retry_honors_retry_after(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("fcoverage.utils.ratelimit.time.sleep", sleeps.append)
+    limiter = RateLimiter()
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RateLimitError("too many requests", {"Retry-After": "3"})
+        return "ok"
+
+    assert call_with_retry(flaky, limiter, max_retries=5) == "ok"
+    assert sleeps == [3, 3]
+    assert limiter.paused_until > 0
+
+
+def test_call_with_retry_gives_up():
+    def broken():
+        raise RateLimitError("slow down")
+
+    with pytest.raises(RateLimitError):
+        call_with_retry(broken, max_retries=1)
+    with pytest.raises(RateLimitError):
+        call_with_retry(broken, max_retries=0)
+    assert call_with_retry(lambda: "ok", max_retries=0) == "ok"
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+def test_only_rate_limits_and_transient_errors_are_retried(monkeypatch):
+    monkeypatch.setattr("fcoverage.utils.ratelimit.time.sleep", lambda _: None)
+    assert is_retryable_error(ServerError("unavailable"))
+    assert is_retryable_error(TimeoutError())
+    assert not is_retryable_error(ValueError("invalid answer"))
+    calls = []
+
+    def invalid():
+        calls.append(1)
+        raise ValueError("invalid answer")
+
+    with pytest.raises(ValueError):
+        call_with_retry(invalid, max_retries=5)
+    assert len(calls) == 1
@@ -0,0 +1,22 @@
+import pytest
+
+from fcoverage.utils.shard import Shard, parse_shard, shard_of
+
+
+def test_parse_shard():
+    assert parse_shard("") is None
+    assert parse_shard("3/20") == Shard(3, 20)
+    assert parse_shard("0/4").name == "0-of-4"
+    for value in ["3", "a/b", "5/4", "1/0"]:
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+
+def test_every_key_belongs_to_exactly_one_stable_shard():
+    keys = [f"tests/test_{i}.py" for i in range(200)]
+    shards = [Shard(index, 4) for index in range(1, 5)]
+    owners = [[shard.index for shard in shards if shard.owns(key)] for key in keys]
+    assert all(len(owner) == 1 for owner in owners)
+    assert {owner[0] for owner in owners} == {1, 2, 3, 4}
+    # the hash does not depend on PYTHONHASHSEED
+    assert shard_of("tests/test_0.py", 4) == 2
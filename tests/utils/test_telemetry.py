@@ -0,0 +1,53 @@
+import json
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+from fcoverage.utils.telemetry import TelemetryCallbackHandler, Tracer
+
+
+def test_spans_are_summarized_and_exported(tmp_path):
+    tracer = Tracer()
+    tracer.start(str(tmp_path))
+    with tracer.span("embed", "vdb", input_tokens=10):
+        pass
+    with pytest.raises(ValueError):
+        with tracer.span("embed", "vdb", input_tokens=5):
+            raise ValueError("boom")
+    tracer.export()
+
+    (row,) = tracer.summary()
+    assert (row["name"], row["count"], row["errors"]) == ("embed", 2, 1)
+    assert row["input_tokens"] == 15
+    assert "embed" in tracer.format_summary()
+
+    lines = (tmp_path / Tracer.JSONL_FILENAME).read_text().splitlines()
+    assert [json.loads(line)["input_tokens"] for line in lines] == [10, 5]
+    chrome = json.loads((tmp_path / Tracer.CHROME_FILENAME).read_text())
+    assert [e["ph"] for e in chrome["traceEvents"]] == ["X", "X"]
+    assert chrome["traceEvents"][1]["args"]["error"] == "ValueError"
+
+
+def test_handler_records_llm_tokens_cost_and_tool_calls():
+    tracer = Tracer()
+    handler = TelemetryCallbackHandler(tracer, input_price=1.0, output_price=2.0)
+    usage = {"input_tokens": 1000, "output_tokens": 500, "total_tokens": 1500}
+    model = FakeMessagesListChatModel(
+        responses=[AIMessage(content="answer", usage_metadata=usage)]
+    )
+
+    @tool
+    def lookup(query: str) -> str:
+        """Looks something up."""
+        return query
+
+    model.invoke("question", config={"callbacks": [handler]})
+    lookup.invoke({"query": "q"}, config={"callbacks": [handler]})
+
+    llm, tool_span = tracer.spans
+    assert llm["category"] == "llm"
+    assert (llm["input_tokens"], llm["output_tokens"]) == (1000, 500)
+    assert llm["cost"] == pytest.approx((1000 * 1.0 + 500 * 2.0) / 1e6)
+    assert (tool_span["category"], tool_span["name"]) == ("tool", "lookup")
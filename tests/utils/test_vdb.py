@@ -0,0 +1,212 @@
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+import fcoverage.utils.vdb as vdb_module
+from fcoverage.utils.manifest import IndexManifest
+from fcoverage.utils.vdb import (
+    VectorDBHelper,
+    best_by_source,
+    index_all_project,
+    token_batches,
+)
+
+
+@pytest.fixture
+def vdb(tmp_path, monkeypatch):
+    def init_fake_embeddings(self):
+        self.embeddings = DeterministicFakeEmbedding(size=16)
+
+    monkeypatch.setattr(VectorDBHelper, "init_embeddings", init_fake_embeddings)
+    return VectorDBHelper(
+        persist_directory=str(tmp_path / "vector-db"),
+        collection_name="test",
+        embedding_model="fake",
+        embedding_provider="fake",
+    )
+
+
+@pytest.fixture
+def project(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "a.py").write_text("def a():\n    return 1\n")
+    (src / "b.py").write_text("def b():\n    return 2\n")
+    return src
+
+
+def index(vdb, project):
+    index_all_project(vdb, [str(project)], "**/*.py", [".py"])
+
+
+def test_index_all_project_only_touches_changed_files(vdb, project, monkeypatch):
+    index(vdb, project)
+    initial_ids = vdb.existing_ids()
+    assert initial_ids
+
+    parsed = []
+    original = vdb_module.load_file_documents
+    monkeypatch.setattr(
+        vdb_module,
+        "load_file_documents",
+        lambda path: parsed.append(path) or original(path),
+    )
+    monkeypatch.setattr(
+        vdb, "existing_ids", lambda: pytest.fail("manifest should be used")
+    )
+    index(vdb, project)
+    assert parsed == []
+
+    (project / "b.py").write_text("def b():\n    return 3\n")
+    (project / "a.py").unlink()
+    index(vdb, project)
+    assert parsed == [str(project / "b.py")]
+
+    monkeypatch.undo()
+    ids = vdb.existing_ids()
+    docs = vdb.vectorstore.get(ids=list(ids))["documents"]
+    assert any("return 3" in doc for doc in docs)
+    assert not any("return 1" in doc or "return 2" in doc for doc in docs)
+
+
+def test_index_all_project_without_manifest_reconciles_database(vdb, project):
+    index(vdb, project)
+    ids = vdb.existing_ids()
+    (project.parent / "vector-db" / "index-manifest.json").unlink()
+
+    index(vdb, project)
+    assert vdb.existing_ids() == ids
+
+
+def test_interrupted_index_resumes_from_the_written_batches(vdb, project, monkeypatch):
+    for i in range(4):
+        (project / f"m{i}.py").write_text(f"def m{i}():\n    return {i}\n")
+    written = []
+    upsert_embedded = vdb.upsert_embedded
+
+    def failing_upsert(batch, vectors):
+        if len(written) == 2:
+            raise RuntimeError("interrupted")
+        upsert_embedded(batch, vectors)
+        written.extend(doc.metadata["source"] for doc in batch)
+
+    vdb.upsert_embedded = failing_upsert
+    with pytest.raises(RuntimeError, match="interrupted"):
+        index_all_project(
+            vdb,
+            [str(project)],
+            "**/*.py",
+            [".py"],
+            batch_size=1,
+            concurrency=1,
+            checkpoint_interval=0,
+        )
+    saved = IndexManifest.load(vdb.persist_directory, vdb.signature())
+    # only the files whose chunks were all written
+    assert saved.files and set(saved.files) <= set(written)
+
+    del vdb.upsert_embedded
+    parsed = []
+    original = vdb_module.load_file_documents
+    monkeypatch.setattr(
+        vdb_module,
+        "load_file_documents",
+        lambda path: parsed.append(path) or original(path),
+    )
+    index(vdb, project)
+    assert len(parsed) == 6 - len(saved.files)
+    manifest = IndexManifest.load(vdb.persist_directory, vdb.signature())
+    assert len(manifest.files) == 6 and not manifest.stale
+    assert vdb.existing_ids() == manifest.ids()
+
+
+def test_manifest_checkpoints_are_throttled(vdb, project, monkeypatch):
+    saves = []
+    save = IndexManifest.save
+    monkeypatch.setattr(
+        IndexManifest, "save", lambda self: saves.append(1) or save(self)
+    )
+    index_all_project(vdb, [str(project)], "**/*.py", [".py"], batch_size=1)
+    # no checkpoint within the interval, only the final save
+    assert len(saves) == 1
+
+
+@pytest.mark.parametrize("provider, max_retries", [("openai", 0), ("ollama", None)])
+def test_embedding_clients_leave_retries_to_the_limiter(
+    provider, max_retries, monkeypatch
+):
+    import langchain.embeddings.base
+
+    calls = []
+    monkeypatch.setattr(
+        langchain.embeddings.base,
+        "init_embeddings",
+        lambda **kwargs: calls.append(kwargs),
+    )
+    helper = VectorDBHelper.__new__(VectorDBHelper)
+    helper.embedding_model, helper.embedding_provider = "model", provider
+    helper.init_embeddings_generic()
+    assert calls[0].get("max_retries") == max_retries
+
+
+def test_search_many_matches_single_searches(vdb, project):
+    index(vdb, project)
+    queries = ["def a():\n    return 1", "def b():\n    return 2"]
+    results = vdb.search_many(queries, k=1)
+    assert len(results) == 2
+    for query, hits in zip(queries, results):
+        assert hits[0][0].page_content == vdb.search(query, k=1)[0].page_content
+
+    best = best_by_source(results)
+    assert set(best) == {str(project / "a.py"), str(project / "b.py")}
+    assert list(best.values()) == sorted(best.values())
+    assert vdb.search_many([]) == []
+
+
+def test_token_batches_respect_count_and_token_caps():
+    docs = [Document(page_content="x" * 400) for _ in range(5)]
+    assert [len(b) for b in token_batches(docs, batch_size=2)] == [2, 2, 1]
+    assert [len(b) for b in token_batches(docs, max_batch_tokens=250)] == [2, 2, 1]
+    assert list(token_batches([])) == []
+
+
+def test_apply_changes_embeds_concurrently_and_upserts(vdb):
+    docs = [Document(id=f"id-{i}", page_content=f"chunk {i}") for i in range(7)]
+    vdb.apply_changes(docs, [], batch_size=2, concurrency=3)
+    assert vdb.existing_ids() == {doc.id for doc in docs}
+
+    vdb.apply_changes(docs[:1], ["id-6"], batch_size=2)
+    assert len(vdb.existing_ids()) == 6
+
+
+def test_parse_files_in_processes_matches_serial(tmp_path):
+    paths = []
+    for i in range(2 * vdb_module.MIN_FILES_PER_WORKER):
+        path = tmp_path / f"m{i}.py"
+        path.write_text(f"def f{i}():\n    return {i}\n")
+        paths.append(str(path))
+
+    serial = list(vdb_module.parse_files(paths, workers=1))
+    parallel = list(vdb_module.parse_files(paths, workers=2))
+    assert [(p, [d.id for d in docs]) for p, docs in parallel] == [
+        (p, [d.id for d in docs]) for p, docs in serial
+    ]
+
+
+def test_iter_ids_pages_through_collection(vdb):
+    docs = [Document(id=f"id-{i}", page_content=f"chunk {i}") for i in range(5)]
+    vdb.apply_changes(docs, [])
+    assert sorted(vdb.iter_ids(page_size=2)) == sorted(doc.id for doc in docs)
+
+
+def test_source_embeddings_average_indexed_chunks(vdb):
+    docs = [
+        Document(id=f"id-{i}", page_content=f"chunk {i}", metadata={"source": "a.py"})
+        for i in range(2)
+    ]
+    vdb.apply_changes(docs, [])
+    vectors = vdb.embeddings.embed_documents(["chunk 0", "chunk 1"])
+    result = vdb.source_embeddings(["a.py", "missing.py"])
+    assert list(result) == ["a.py"]
+    expected = [(x + y) / 2 for x, y in zip(*vectors)]
+    assert result["a.py"] == pytest.approx(expected, rel=1e-5)